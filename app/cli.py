@@ -0,0 +1,514 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import signal
+import sys
+from dataclasses import fields
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from app.core.attachment_plan import build_attachment_limits, format_bytes, format_duration
+from app.core.discord_client import DiscordAPIError, DiscordClient
+from app.core.logging_setup import setup_logging
+from app.core.message_filters import HAS_VALUES, MessageSearchFilter, compile_message_filter
+from app.core.metrics import format_performance_summary
+from app.core.models import ExportOptions, ExportResult
+from app.core.paths import ensure_writable_directory, resolve_default_paths
+from app.core.utils import local_tzinfo
+from app.workers.batch_pipeline import BatchExportTarget, run_batch_export
+from app.workers.export_pipeline import ExportCancelled, execute_export
+from app.workers.sync_daemon import (
+    DEFAULT_MAX_INTERVAL_SECONDS,
+    DEFAULT_MIN_INTERVAL_SECONDS,
+    WATCHLIST_FILE_NAME,
+    SyncDaemon,
+    WatchedChannel,
+    WatchList,
+    default_mirror_root,
+)
+from app.workers.timeline_pipeline import run_timeline_export
+
+
+TOKEN_ENV = "ARCHIVECORD_TOKEN"
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_CANCELLED = 130
+
+_OPTION_FIELDS = {item.name for item in fields(ExportOptions)}
+_SEARCH_KEYS = {"author_ids", "mention_ids", "has", "contains"}
+_ATTACHMENT_KEYS = {"max_attachment_size", "max_attachment_total", "attachment_types"}
+
+
+class CliError(RuntimeError):
+    pass
+
+
+class _CancelFlag:
+    def __init__(self) -> None:
+        self.requested = False
+
+    def __call__(self) -> bool:
+        return self.requested
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError as exc:
+        raise CliError(f"Invalid date/time '{value}'. Use ISO 8601, e.g. 2026-01-31 or 2026-01-31T18:30") from exc
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=local_tzinfo())
+    return parsed
+
+
+def _target_label(options: ExportOptions) -> str:
+    if options.target_kind == "dm":
+        return options.dm_name or f"DM {options.channel_id}"
+    return f"{options.guild_name or 'Server'} #{options.channel_name or options.channel_id}"
+
+
+def build_options(values: dict, *, output_root: str) -> ExportOptions:
+    values = dict(values)
+    unknown = set(values) - _OPTION_FIELDS - _SEARCH_KEYS - _ATTACHMENT_KEYS - {"after", "before", "label", "stable_id"}
+    if unknown:
+        raise CliError(f"Unknown export option(s): {', '.join(sorted(unknown))}")
+    channel_id = str(values.get("channel_id") or "").strip()
+    if not channel_id:
+        raise CliError("Each target needs a channel_id")
+
+    before_dt = values.get("before_dt") or parse_datetime(values.get("before"))
+    after_dt = values.get("after_dt") or parse_datetime(values.get("after"))
+    export_json = bool(values.get("export_json", False))
+    attachment_plan_only = bool(values.get("attachment_plan_only", False))
+    export_attachments = bool(values.get("export_attachments", False)) or attachment_plan_only
+    export_txt = bool(values.get("export_txt", not export_json and not export_attachments))
+    target_kind = values.get("target_kind") or ("guild" if values.get("guild_id") else "dm")
+
+    def _opt(name: str) -> Optional[str]:
+        value = values.get(name)
+        return str(value) if value not in (None, "") else None
+
+    search = values.get("search")
+    if search is None and any(values.get(key) for key in _SEARCH_KEYS):
+        has = values.get("has") or ()
+        try:
+            search = MessageSearchFilter.create(
+                author_ids=values.get("author_ids"),
+                mention_ids=values.get("mention_ids"),
+                has=[has] if isinstance(has, str) else has,
+                content=values.get("contains"),
+            )
+        except ValueError as exc:
+            raise CliError(str(exc)) from exc
+    message_filter = _opt("message_filter")
+    if message_filter:
+        try:
+            compile_message_filter(message_filter)
+        except ValueError as exc:
+            raise CliError(f"Invalid --filter expression: {exc}") from exc
+    attachment_limits = values.get("attachment_limits")
+    if attachment_limits is None:
+        try:
+            attachment_limits = build_attachment_limits(
+                max_file_size=values.get("max_attachment_size"),
+                max_total_size=values.get("max_attachment_total"),
+                allowed_types=values.get("attachment_types"),
+            )
+        except ValueError as exc:
+            raise CliError(f"Invalid attachment limit: {exc}") from exc
+
+    return ExportOptions(
+        channel_id=channel_id,
+        before_dt=before_dt,
+        after_dt=after_dt,
+        export_json=export_json,
+        export_txt=export_txt,
+        export_attachments=export_attachments,
+        include_edits=bool(values.get("include_edits", True)),
+        include_pins=bool(values.get("include_pins", True)),
+        include_replies=bool(values.get("include_replies", True)),
+        output_root=os.path.abspath(values.get("output_root") or output_root),
+        target_kind=target_kind,
+        dm_name=_opt("dm_name"),
+        guild_id=_opt("guild_id"),
+        guild_name=_opt("guild_name"),
+        category_id=_opt("category_id"),
+        category_name=_opt("category_name"),
+        channel_name=_opt("channel_name"),
+        export_label=str(values.get("label") or values.get("export_label") or ""),
+        search=search,
+        message_filter=message_filter,
+        attachment_limits=attachment_limits,
+        attachment_plan_only=attachment_plan_only,
+    )
+
+
+def load_job(path: str, *, output_root: Optional[str] = None) -> list[BatchExportTarget]:
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            job = json.load(handle)
+    except (OSError, ValueError) as exc:
+        raise CliError(f"Could not read job file '{path}': {exc}") from exc
+    if not isinstance(job, dict) or not isinstance(job.get("targets"), list) or not job["targets"]:
+        raise CliError("Job file must be a JSON object with a non-empty 'targets' list")
+
+    root = output_root or job.get("output_root") or resolve_default_paths().export_root
+    defaults = job.get("defaults") or {}
+    targets: list[BatchExportTarget] = []
+    for entry in job["targets"]:
+        if not isinstance(entry, dict):
+            raise CliError("Each job target must be a JSON object")
+        options = build_options({**defaults, **entry}, output_root=root)
+        targets.append(
+            BatchExportTarget(
+                stable_id=str(entry.get("stable_id") or f"{options.target_kind}:{options.channel_id}"),
+                label=str(entry.get("label") or _target_label(options)),
+                options=options,
+            )
+        )
+    return targets
+
+
+def targets_from_args(args: argparse.Namespace) -> list[BatchExportTarget]:
+    root = args.output or resolve_default_paths().export_root
+    values: dict[str, Any] = {
+        "after": args.after,
+        "before": args.before,
+        "export_json": args.json,
+        "export_txt": args.txt,
+        "export_attachments": args.attachments,
+        "include_edits": not args.no_edits,
+        "include_pins": not args.no_pins,
+        "include_replies": not args.no_replies,
+        "target_kind": args.kind,
+        "dm_name": args.dm_name,
+        "guild_id": args.guild_id,
+        "guild_name": args.guild_name,
+        "category_id": args.category_id,
+        "category_name": args.category_name,
+        "channel_name": args.channel_name,
+        "label": args.label,
+        "author_ids": args.author,
+        "mention_ids": args.mentions,
+        "has": args.has,
+        "contains": args.contains,
+        "message_filter": args.filter,
+        "max_attachment_size": args.max_attachment_size,
+        "max_attachment_total": args.max_attachment_total,
+        "attachment_types": args.attachment_type,
+        "attachment_plan_only": args.plan_attachments,
+    }
+    if not (args.json or args.txt or args.attachments or args.plan_attachments):
+        values["export_txt"] = True
+    targets = []
+    for channel_id in args.channel:
+        options = build_options({**values, "channel_id": channel_id}, output_root=root)
+        targets.append(
+            BatchExportTarget(
+                stable_id=f"{options.target_kind}:{options.channel_id}",
+                label=_target_label(options),
+                options=options,
+            )
+        )
+    return targets
+
+
+def resolve_token(env_name: str = TOKEN_ENV) -> str:
+    token = (os.environ.get(env_name) or "").strip()
+    if token:
+        return token
+    # Imported lazily: keyring backends are slow to load and unnecessary when the env var is set.
+    from app.core.token_store import TokenStoreError, load_token
+
+    try:
+        token = (load_token() or "").strip()
+    except TokenStoreError as exc:
+        raise CliError(f"No token in ${env_name} and keyring unavailable: {exc}") from exc
+    if not token:
+        raise CliError(f"No token found. Set ${env_name} or save a token from the desktop app.")
+    return token
+
+
+def _print(message: str) -> None:
+    print(message, flush=True)
+
+
+def _print_result(result: ExportResult) -> None:
+    _print(f"Export dir: {result.export_dir}")
+    if result.attachment_plan:
+        plan = result.attachment_plan
+        planned = f"{plan['files']} files, {format_bytes(plan['bytes'])}, about {format_duration(plan['estimated_seconds'])}"
+        if result.attachments_dir:
+            _print(f"Attachments: saved {result.attachments_saved} of {planned}")
+        else:
+            _print(f"Attachments: planned {planned}; nothing downloaded")
+    if result.performance:
+        _print(f"Performance: {format_performance_summary(result.performance)}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli",
+        description="Export Discord conversations without starting the desktop UI.",
+    )
+    parser.add_argument("--log-dir", help="Directory for archivecord.log (defaults to the app logs folder).")
+    parser.add_argument("--token-env", default=TOKEN_ENV, help=f"Environment variable holding the token (default {TOKEN_ENV}).")
+    parser.add_argument("--quiet", action="store_true", help="Only print errors and the final summary.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Export one or more channels.")
+    export.add_argument("--channel", action="append", required=True, help="Channel ID; repeat for a batch.")
+    export.add_argument("--output", help="Export root folder (defaults to Documents/ArchiveCord/exports).")
+    export.add_argument("--kind", choices=("dm", "guild"), help="Target kind (default: guild if --guild-id is set).")
+    export.add_argument("--dm-name")
+    export.add_argument("--guild-id")
+    export.add_argument("--guild-name")
+    export.add_argument("--category-id")
+    export.add_argument("--category-name")
+    export.add_argument("--channel-name")
+    export.add_argument("--after", help="Only messages at or after this ISO date/time (local time if no offset).")
+    export.add_argument("--before", help="Only messages at or before this ISO date/time (local time if no offset).")
+    export.add_argument("--json", action="store_true", help="Write messages.json.")
+    export.add_argument("--txt", action="store_true", help="Write messages.txt (default when no format is given).")
+    export.add_argument("--attachments", action="store_true", help="Download attachments.")
+    export.add_argument("--max-attachment-size", help="Skip attachments larger than this, e.g. 25MB.")
+    export.add_argument(
+        "--max-attachment-total",
+        help="Stop queueing attachments past this many bytes, e.g. 10GB (default 2GB; 0 or none for unlimited).",
+    )
+    export.add_argument(
+        "--attachment-type", action="append", help="Only attachments of this MIME type, e.g. image/* or video/mp4; repeatable."
+    )
+    export.add_argument(
+        "--plan-attachments",
+        action="store_true",
+        help="Print the attachment count, bytes and estimated download time without downloading.",
+    )
+    export.add_argument("--no-edits", action="store_true", help="Omit edited timestamps.")
+    export.add_argument("--no-pins", action="store_true", help="Omit [PINNED] markers.")
+    export.add_argument("--no-replies", action="store_true", help="Omit reply references.")
+    export.add_argument("--label", help="Export label appended to the package folder name.")
+    export.add_argument(
+        "--timeline",
+        action="store_true",
+        help="Merge all channels into one chronological timeline (TXT, plus JSONL with --json).",
+    )
+    export.add_argument("--author", action="append", help="Only messages by this user ID; repeatable.")
+    export.add_argument("--mentions", action="append", help="Only messages mentioning this user ID; repeatable.")
+    export.add_argument("--has", action="append", choices=HAS_VALUES, help="Only messages with this; repeatable.")
+    export.add_argument("--contains", help="Only messages containing all of these words.")
+    export.add_argument(
+        "--filter",
+        help='Filter expression applied while fetching, e.g. \'author:123 (has:attachment or reactions:>=3) -is:edited\'.',
+    )
+
+    job = sub.add_parser("job", help="Run the targets listed in a JSON job file.")
+    job.add_argument("path", help="Job file path.")
+    job.add_argument("--output", help="Override the job's output_root.")
+    job.add_argument("--timeline", action="store_true", help="Merge the job's targets into one timeline.")
+    sync = sub.add_parser("sync", help="Mirror a watch list of channels incrementally.")
+    sync.add_argument("--output", help="Export root; the mirror lives in <output>/Mirror.")
+    sync.add_argument("--state", help=f"Watch list file (default <output>/Mirror/{WATCHLIST_FILE_NAME}).")
+    sync_sub = sync.add_subparsers(dest="sync_command", required=True)
+
+    sync_add = sync_sub.add_parser("add", help="Add or update a watched channel.")
+    sync_add.add_argument("--channel", required=True)
+    sync_add.add_argument("--kind", choices=("dm", "guild"))
+    sync_add.add_argument("--dm-name")
+    sync_add.add_argument("--guild-id")
+    sync_add.add_argument("--guild-name")
+    sync_add.add_argument("--category-id")
+    sync_add.add_argument("--category-name")
+    sync_add.add_argument("--channel-name")
+
+    sync_remove = sync_sub.add_parser("remove", help="Stop watching a channel.")
+    sync_remove.add_argument("--channel", required=True)
+
+    sync_sub.add_parser("list", help="Show the watch list and sync progress.")
+
+    sync_run = sync_sub.add_parser("run", help="Poll watched channels and append new messages.")
+    sync_run.add_argument("--once", action="store_true", help="Poll every channel once and exit.")
+    sync_run.add_argument("--backfill", action="store_true", help="Mirror full history for newly added channels.")
+    sync_run.add_argument("--min-interval", type=float, default=DEFAULT_MIN_INTERVAL_SECONDS)
+    sync_run.add_argument("--max-interval", type=float, default=DEFAULT_MAX_INTERVAL_SECONDS)
+    return parser
+
+
+def run_sync(args: argparse.Namespace) -> int:
+    mirror_root = default_mirror_root(os.path.abspath(args.output or resolve_default_paths().export_root))
+    state_path = args.state or os.path.join(mirror_root, WATCHLIST_FILE_NAME)
+    try:
+        watch_list = WatchList.load(state_path)
+    except (OSError, ValueError, TypeError) as exc:
+        raise CliError(f"Could not read watch list '{state_path}': {exc}") from exc
+
+    if args.sync_command == "add":
+        entry = WatchedChannel(
+            channel_id=args.channel,
+            target_kind=args.kind or ("guild" if args.guild_id else "dm"),
+            dm_name=args.dm_name,
+            guild_id=args.guild_id,
+            guild_name=args.guild_name,
+            category_id=args.category_id,
+            category_name=args.category_name,
+            channel_name=args.channel_name,
+        )
+        watch_list.add(entry)
+        watch_list.save(state_path)
+        _print(f"Watching {entry.label} ({len(watch_list.channels)} channels)")
+        return EXIT_OK
+    if args.sync_command == "remove":
+        if not watch_list.remove(args.channel):
+            raise CliError(f"Channel {args.channel} is not on the watch list")
+        watch_list.save(state_path)
+        _print(f"Removed {args.channel}")
+        return EXIT_OK
+    if args.sync_command == "list":
+        for entry in watch_list.channels.values():
+            _print(
+                f"{entry.channel_id}  {entry.label}  high_water={entry.high_water_id or '-'}  "
+                f"mirrored={entry.messages_mirrored}  interval={entry.interval_seconds:.0f}s"
+                + (f"  error={entry.last_error}" if entry.last_error else "")
+            )
+        return EXIT_OK
+
+    if not watch_list.channels:
+        raise CliError("Watch list is empty. Add channels with 'sync add --channel ID'.")
+    ok, error = ensure_writable_directory(mirror_root)
+    if not ok:
+        raise CliError(error or f"Mirror folder is not writable: {mirror_root}")
+    client = DiscordClient(resolve_token(args.token_env))
+    stop = _CancelFlag()
+    previous_handler = signal.signal(signal.SIGINT, lambda _signum, _frame: setattr(stop, "requested", True))
+    try:
+        daemon = SyncDaemon(
+            client,
+            watch_list,
+            state_path=state_path,
+            mirror_root=mirror_root,
+            min_interval=args.min_interval,
+            max_interval=args.max_interval,
+            backfill=args.backfill,
+            status_callback=None if args.quiet else _print,
+        )
+        if args.once:
+            _print(f"Mirrored {daemon.run_once()} new messages")
+        else:
+            daemon.run_forever(stop)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+        client.close()
+    failed = [entry for entry in watch_list.channels.values() if entry.last_error]
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def _run_timeline(token: str, targets: list[BatchExportTarget], *, status, cancel: _CancelFlag) -> int:
+    first = targets[0].options
+    if any(target.options.export_attachments for target in targets):
+        _print("Note: attachments are not downloaded for merged timelines; export without --timeline to get them.")
+    try:
+        result = run_timeline_export(
+            token,
+            targets,
+            output_root=first.output_root,
+            label=first.export_label,
+            write_txt=any(target.options.export_txt for target in targets),
+            write_jsonl=any(target.options.export_json for target in targets),
+            status_callback=status,
+            cancel_check=cancel,
+        )
+    except ExportCancelled as exc:
+        _print(str(exc))
+        return EXIT_CANCELLED
+    except DiscordAPIError as exc:
+        _print(f"Timeline export failed: {exc}")
+        return EXIT_FAILED
+    except ValueError as exc:
+        raise CliError(str(exc)) from exc
+    for label, count in result.channel_counts.items():
+        _print(f"{count:>8}  {label}")
+    _print(f"Timeline dir: {result.export_dir}")
+    if result.performance:
+        _print(f"Performance: {format_performance_summary(result.performance)}")
+    return EXIT_OK
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.command == "sync":
+        return run_sync(args)
+    targets = load_job(args.path, output_root=args.output) if args.command == "job" else targets_from_args(args)
+    for root in sorted({target.options.output_root for target in targets}):
+        ok, error = ensure_writable_directory(root)
+        if not ok:
+            raise CliError(error or f"Output folder is not writable: {root}")
+    token = resolve_token(args.token_env)
+
+    status = (lambda _msg: None) if args.quiet else _print
+    cancel = _CancelFlag()
+
+    def _on_sigint(_signum, _frame) -> None:
+        if cancel.requested:
+            raise KeyboardInterrupt
+        cancel.requested = True
+        _print("Cancellation requested. Press Ctrl+C again to abort immediately.")
+
+    previous_handler = signal.signal(signal.SIGINT, _on_sigint)
+    try:
+        if args.timeline:
+            return _run_timeline(token, targets, status=status, cancel=cancel)
+        if len(targets) == 1:
+            try:
+                result = execute_export(token, targets[0].options, status_callback=status, cancel_check=cancel)
+            except ExportCancelled as exc:
+                _print(str(exc))
+                return EXIT_CANCELLED
+            except DiscordAPIError as exc:
+                _print(f"Export failed: {exc}")
+                return EXIT_FAILED
+            _print_result(result)
+            return EXIT_OK
+
+        batch = run_batch_export(token, targets, status_callback=status, cancel_check=cancel)
+    finally:
+        signal.signal(signal.SIGINT, previous_handler)
+
+    for item in batch.items:
+        if item.success and item.result:
+            _print(f"OK     {item.label}: {item.result.export_dir}")
+        else:
+            _print(f"FAILED {item.label}: {item.error}")
+    if batch.cancelled:
+        return EXIT_CANCELLED
+    return EXIT_FAILED if batch.failed else EXIT_OK
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    controller = setup_logging(log_dir=args.log_dir or resolve_default_paths().logs_dir)
+    try:
+        return run(args)
+    except CliError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return EXIT_USAGE
+    except KeyboardInterrupt:
+        print("Aborted.", file=sys.stderr)
+        return EXIT_CANCELLED
+    except Exception:  # pragma: no cover - defensive
+        logging.getLogger("discordsorter.cli").exception("Unexpected CLI error.")
+        print("error: unexpected failure, see archivecord.log", file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        if controller:
+            controller.stop()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
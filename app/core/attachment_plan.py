@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import mimetypes
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Optional, Sequence
+
+# Unless asked otherwise, a media-heavy channel stops queueing downloads past this many bytes.
+DEFAULT_MAX_TOTAL_BYTES = 2 * 1024 * 1024 * 1024
+# Rough CDN throughput and per-file overhead (request plus file create) used for the time estimate.
+ESTIMATE_BYTES_PER_SECOND = 8 * 1024 * 1024
+ESTIMATE_SECONDS_PER_FILE = 0.1
+
+SKIP_NO_URL = "no_url"
+SKIP_TOO_LARGE = "too_large"
+SKIP_TYPE = "type"
+SKIP_BUDGET = "budget"
+_SKIP_LABELS = {
+    SKIP_NO_URL: "no URL",
+    SKIP_TOO_LARGE: "over size limit",
+    SKIP_TYPE: "type not allowed",
+    SKIP_BUDGET: "over total budget",
+}
+
+_UNITS = {"": 1, "b": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?\s*$", re.IGNORECASE)
+
+
+def parse_byte_size(value: Optional[str]) -> Optional[int]:
+    # "25MB", "1.5g", "500k" or plain bytes; empty, "0" and "none" mean unlimited.
+    if value is None:
+        return None
+    text = str(value).strip()
+    if not text or text.lower() in ("none", "unlimited"):
+        return None
+    match = _SIZE_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid size '{value}'. Use e.g. 25MB, 1.5GB or 500KB")
+    size = int(float(match.group(1)) * _UNITS[match.group(2).lower()])
+    return size or None
+
+
+def parse_content_types(value: Optional[Iterable[str] | str]) -> tuple[str, ...]:
+    if not value:
+        return ()
+    items = value.split(",") if isinstance(value, str) else [part for item in value for part in str(item).split(",")]
+    types = []
+    for item in items:
+        item = item.strip().lower()
+        if not item:
+            continue
+        if "/" not in item:
+            item = f"{item}/*"
+        if item not in types:
+            types.append(item)
+    return tuple(types)
+
+
+def format_bytes(count: int) -> str:
+    if count < 1024:
+        return f"{count} B"
+    size = count / 1024
+    unit = "KB"
+    for next_unit in ("MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+        unit = next_unit
+    return f"{size:.1f} {unit}"
+
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m {seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m"
+
+
+@dataclass(frozen=True)
+class AttachmentLimits:
+    max_file_bytes: Optional[int] = None
+    max_total_bytes: Optional[int] = None
+    # MIME patterns such as "image/*" or "video/mp4"; empty allows every type.
+    allowed_types: tuple[str, ...] = ()
+
+    def allows_type(self, content_type: str) -> bool:
+        if not self.allowed_types:
+            return True
+        if not content_type:
+            return False
+        major = content_type.split("/", 1)[0]
+        return any(pattern == content_type or pattern == f"{major}/*" for pattern in self.allowed_types)
+
+    def as_dict(self) -> dict:
+        return {
+            "max_file_bytes": self.max_file_bytes,
+            "max_total_bytes": self.max_total_bytes,
+            "allowed_types": list(self.allowed_types),
+        }
+
+
+DEFAULT_ATTACHMENT_LIMITS = AttachmentLimits(max_total_bytes=DEFAULT_MAX_TOTAL_BYTES)
+
+
+@dataclass(frozen=True)
+class PlannedAttachment:
+    message_id: str
+    attachment_id: str
+    filename: str
+    url: str
+    size: Optional[int]
+    content_type: str
+
+
+@dataclass
+class AttachmentPlan:
+    limits: AttachmentLimits
+    selected: list[PlannedAttachment] = field(default_factory=list)
+    skipped: dict[str, int] = field(default_factory=dict)
+    skipped_bytes: int = 0
+    total_bytes: int = 0
+    unknown_sizes: int = 0
+
+    @property
+    def file_count(self) -> int:
+        return len(self.selected)
+
+    def estimated_seconds(
+        self, *, bytes_per_second: float = ESTIMATE_BYTES_PER_SECOND, seconds_per_file: float = ESTIMATE_SECONDS_PER_FILE
+    ) -> float:
+        return self.total_bytes / bytes_per_second + self.file_count * seconds_per_file
+
+    def summary(self) -> str:
+        text = f"{self.file_count} files, {format_bytes(self.total_bytes)}, about {format_duration(self.estimated_seconds())}"
+        if self.unknown_sizes:
+            text += f" (+{self.unknown_sizes} of unknown size)"
+        if self.skipped:
+            reasons = ", ".join(f"{count} {_SKIP_LABELS.get(reason, reason)}" for reason, count in sorted(self.skipped.items()))
+            text += f"; skipped {sum(self.skipped.values())} ({format_bytes(self.skipped_bytes)}): {reasons}"
+        return text
+
+    def as_dict(self) -> dict:
+        return {
+            "files": self.file_count,
+            "bytes": self.total_bytes,
+            "unknown_sizes": self.unknown_sizes,
+            "estimated_seconds": round(self.estimated_seconds(), 1),
+            "skipped": dict(sorted(self.skipped.items())),
+            "skipped_bytes": self.skipped_bytes,
+            "limits": self.limits.as_dict(),
+        }
+
+
+def _content_type(attachment: dict) -> str:
+    content_type = (attachment.get("content_type") or "").split(";", 1)[0].strip().lower()
+    if not content_type:
+        # Older messages lack content_type; the filename extension is the next best hint.
+        content_type = (mimetypes.guess_type(attachment.get("filename") or "")[0] or "").lower()
+    return content_type
+
+
+def _size(attachment: dict) -> Optional[int]:
+    try:
+        size = int(attachment.get("size"))
+    except (TypeError, ValueError):
+        return None
+    return size if size >= 0 else None
+
+
+def plan_attachments(messages: Iterable[dict], limits: AttachmentLimits = AttachmentLimits()) -> AttachmentPlan:
+    # Uses only the metadata already in the fetched messages; nothing is requested.
+    plan = AttachmentPlan(limits=limits)
+
+    def _skip(reason: str, size: Optional[int]) -> None:
+        plan.skipped[reason] = plan.skipped.get(reason, 0) + 1
+        plan.skipped_bytes += size or 0
+
+    for message in messages:
+        for attachment in message.get("attachments") or []:
+            size = _size(attachment)
+            content_type = _content_type(attachment)
+            url = attachment.get("url")
+            if not url:
+                _skip(SKIP_NO_URL, size)
+                continue
+            if not limits.allows_type(content_type):
+                _skip(SKIP_TYPE, size)
+                continue
+            if size is not None and limits.max_file_bytes is not None and size > limits.max_file_bytes:
+                _skip(SKIP_TOO_LARGE, size)
+                continue
+            # Greedy in message order: later files that still fit are kept after one overflows.
+            if size is not None and limits.max_total_bytes is not None and plan.total_bytes + size > limits.max_total_bytes:
+                _skip(SKIP_BUDGET, size)
+                continue
+            plan.selected.append(
+                PlannedAttachment(
+                    message_id=str(message.get("id")),
+                    attachment_id=str(attachment.get("id") or "attachment"),
+                    filename=attachment.get("filename") or "attachment",
+                    url=url,
+                    size=size,
+                    content_type=content_type,
+                )
+            )
+            if size is None:
+                plan.unknown_sizes += 1
+            else:
+                plan.total_bytes += size
+    return plan
+
+
+def build_attachment_limits(
+    *,
+    max_file_size: Optional[str] = None,
+    max_total_size: Optional[str] = None,
+    allowed_types: Optional[Sequence[str] | str] = None,
+    default_total_bytes: Optional[int] = DEFAULT_MAX_TOTAL_BYTES,
+) -> AttachmentLimits:
+    # A blank total keeps the default budget; "0" or "none" lifts it.
+    total = default_total_bytes if max_total_size is None or not str(max_total_size).strip() else parse_byte_size(max_total_size)
+    return AttachmentLimits(
+        max_file_bytes=parse_byte_size(max_file_size),
+        max_total_bytes=total,
+        allowed_types=parse_content_types(allowed_types),
+    )
@@ -1,12 +1,24 @@
 ﻿from __future__ import annotations
 
 import logging
+import os
 import time
 from typing import Any, Optional
 
 import requests
 
+from app.core import tracing
+from app.core.logging_setup import HotPathSampler
+from app.core.metrics import RequestStats
+
 BASE_URL = "https://discord.com/api/v9"
+BASE_URL_ENV = "ARCHIVECORD_API_BASE_URL"
+SERVER_ERROR_RETRIES = 3
+SERVER_ERROR_BACKOFF_SECONDS = 0.5
+# Search answers 202 with retry_after while the guild index is being built.
+SEARCH_INDEX_MAX_WAITS = 5
+
+_request_log = HotPathSampler("discordsorter.api")
 
 
 class DiscordAPIError(RuntimeError):
@@ -16,11 +28,15 @@ class DiscordAPIError(RuntimeError):
 
 
 class DiscordClient:
-    def __init__(self, token: str, timeout: int = 30):
+    def __init__(self, token: str, timeout: int = 30, *, base_url: Optional[str] = None):
         if not token:
             raise DiscordAPIError("Token is empty")
         self._token = token
         self._timeout = timeout
+        self._base_url = (base_url or os.environ.get(BASE_URL_ENV) or BASE_URL).rstrip("/")
+        self.stats = RequestStats()
+        # Route -> monotonic deadline, from X-RateLimit-Remaining: 0 responses.
+        self._route_reset_at: dict[str, float] = {}
         self._session = requests.Session()
         self._session.headers.update(
             {
@@ -34,19 +50,27 @@ class DiscordClient:
         self._session.close()
 
     def _request(self, method: str, path: str, params: Optional[dict] = None) -> Any:
-        url = f"{BASE_URL}{path}"
+        url = f"{self._base_url}{path}"
         logger = logging.getLogger("discordsorter.api")
-        logger.debug("API request %s %s", method, path)
+        _request_log.debug("API request %s %s", method, path)
+        server_error_attempts = 0
         while True:
-            try:
-                response = self._session.request(
-                    method,
-                    url,
-                    params=params,
-                    timeout=self._timeout,
-                )
-            except requests.RequestException as exc:
-                raise DiscordAPIError(f"Network error: {exc}") from exc
+            self._wait_for_route(path)
+            with tracing.span(f"{method} {path}", "api") as span_args:
+                try:
+                    response = self._session.request(
+                        method,
+                        url,
+                        params=params,
+                        timeout=self._timeout,
+                    )
+                except requests.RequestException as exc:
+                    span_args["error"] = exc.__class__.__name__
+                    raise DiscordAPIError(f"Network error: {exc}") from exc
+                span_args["status"] = response.status_code
+            self.stats.api_calls += 1
+            self.stats.bytes_received += len(response.content or b"")
+            self._track_rate_limit(path, response.headers)
             if response.status_code == 429:
                 try:
                     payload = response.json()
@@ -54,7 +78,24 @@ class DiscordClient:
                 except Exception:
                     retry_after = 1.0
                 logger.warning("Rate limited. Retrying in %ss.", retry_after)
-                time.sleep(retry_after)
+                self.stats.rate_limit_waits += 1
+                self.stats.rate_limit_sleep_seconds += retry_after
+                with tracing.span("rate_limit_sleep", "api", retry_after=retry_after, path=path):
+                    time.sleep(retry_after)
+                continue
+            if response.status_code >= 500 and server_error_attempts < SERVER_ERROR_RETRIES:
+                delay = SERVER_ERROR_BACKOFF_SECONDS * (2**server_error_attempts)
+                server_error_attempts += 1
+                logger.warning(
+                    "Discord API error %s on %s. Retry %s/%s in %ss.",
+                    response.status_code,
+                    path,
+                    server_error_attempts,
+                    SERVER_ERROR_RETRIES,
+                    delay,
+                )
+                self.stats.server_error_retries += 1
+                time.sleep(delay)
                 continue
             if response.status_code == 204:
                 return None
@@ -70,6 +111,28 @@ class DiscordClient:
                 f"Discord API error {response.status_code}: {detail}", response.status_code
             )
 
+    def _track_rate_limit(self, path: str, headers) -> None:
+        if headers.get("X-RateLimit-Remaining") != "0":
+            self._route_reset_at.pop(path, None)
+            return
+        try:
+            reset_after = float(headers.get("X-RateLimit-Reset-After", "0"))
+        except ValueError:
+            return
+        if reset_after > 0:
+            self._route_reset_at[path] = time.monotonic() + reset_after
+
+    def _wait_for_route(self, path: str) -> None:
+        deadline = self._route_reset_at.pop(path, None)
+        if deadline is None:
+            return
+        delay = deadline - time.monotonic()
+        if delay <= 0:
+            return
+        self.stats.rate_limit_sleep_seconds += delay
+        with tracing.span("rate_limit_throttle", "api", delay=delay, path=path):
+            time.sleep(delay)
+
     def validate_token(self) -> dict:
         return self._request("GET", "/users/@me")
 
@@ -82,8 +145,28 @@ class DiscordClient:
     def get_guild_channels(self, guild_id: str) -> list[dict]:
         return self._request("GET", f"/guilds/{guild_id}/channels")
 
-    def get_channel_messages(self, channel_id: str, before_id: Optional[str] = None, limit: int = 100) -> list[dict]:
+    def get_channel_messages(
+        self,
+        channel_id: str,
+        before_id: Optional[str] = None,
+        limit: int = 100,
+        *,
+        after_id: Optional[str] = None,
+    ) -> list[dict]:
         params: dict[str, Any] = {"limit": limit}
         if before_id:
             params["before"] = before_id
-        return self._request("GET", f"/channels/{channel_id}/messages", params=params)
+        if after_id:
+            params["after"] = after_id
+        return self._request("GET", f"/channels/{channel_id}/messages", params=params)
+
+    def search_guild_messages(self, guild_id: str, params: dict) -> dict:
+        logger = logging.getLogger("discordsorter.api")
+        for _ in range(SEARCH_INDEX_MAX_WAITS):
+            payload = self._request("GET", f"/guilds/{guild_id}/messages/search", params=params) or {}
+            if "messages" in payload or payload.get("retry_after") is None:
+                return payload
+            retry_after = float(payload.get("retry_after") or 1.0)
+            logger.info("Search index not ready for guild %s. Retrying in %ss.", guild_id, retry_after)
+            time.sleep(retry_after)
+        raise DiscordAPIError(f"Search index for guild {guild_id} is not available yet", 202)
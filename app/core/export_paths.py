@@ -105,3 +105,24 @@ def build_export_paths(options: ExportOptions, *, export_started_at: datetime) -
         metadata_path=os.path.join(export_dir, "metadata.json"),
         attachments_dir=os.path.join(export_dir, "attachments"),
     )
+
+
+@dataclass(frozen=True)
+class TimelinePaths:
+    export_dir: str
+    txt_path: str
+    jsonl_path: str
+    metadata_path: str
+
+
+def build_timeline_paths(output_root: str, *, export_started_at: datetime, label: str = "") -> TimelinePaths:
+    export_dir_name = f"timeline_{export_started_at.strftime('%Y%m%d_%H%M%S_%f')}"
+    if label.strip():
+        export_dir_name = f"{export_dir_name}_{_slugify_label(label)}"
+    export_dir = os.path.join(output_root, "Timelines", export_dir_name)
+    return TimelinePaths(
+        export_dir=export_dir,
+        txt_path=os.path.join(export_dir, "timeline.txt"),
+        jsonl_path=os.path.join(export_dir, "timeline.jsonl"),
+        metadata_path=os.path.join(export_dir, "metadata.json"),
+    )
@@ -2,11 +2,14 @@
 
 import json
 import os
-from typing import Any, Iterable
+from typing import Any, Iterable, Optional
 
 import logging
 import requests
 
+from . import tracing
+from .attachment_plan import AttachmentLimits, AttachmentPlan, plan_attachments
+from .metrics import ExportMetrics
 from .utils import ensure_dir, safe_filename
 
 
@@ -24,33 +27,41 @@ def save_txt(text: str, path: str) -> str:
     return path
 
 
-def export_attachments(messages: Iterable[dict], folder: str) -> int:
+def export_attachments(
+    messages: Iterable[dict],
+    folder: str,
+    *,
+    metrics: Optional[ExportMetrics] = None,
+    plan: Optional[AttachmentPlan] = None,
+) -> int:
     ensure_dir(folder)
     logger = logging.getLogger("discordsorter.exporter")
+    if plan is None:
+        plan = plan_attachments(messages, AttachmentLimits())
     saved = 0
     session = requests.Session()
-    for message in messages:
-        attachments = message.get("attachments") or []
-        for attachment in attachments:
-            url = attachment.get("url")
-            if not url:
-                continue
-            filename = safe_filename(attachment.get("filename") or "attachment")
-            attachment_id = attachment.get("id") or "attachment"
-            target = os.path.join(folder, f"{message.get('id')}_{attachment_id}_{filename}")
-            if os.path.exists(target):
-                continue
-            try:
-                with session.get(url, stream=True, timeout=30) as resp:
-                    if resp.status_code != 200:
-                        logger.warning("Attachment download failed (%s): %s", resp.status_code, url)
-                        continue
-                    with open(target, "wb") as handle:
-                        for chunk in resp.iter_content(chunk_size=8192):
-                            if chunk:
-                                handle.write(chunk)
-                saved += 1
-            except Exception:
-                logger.exception("Attachment download error: %s", url)
-                continue
+    for attachment in plan.selected:
+        url = attachment.url
+        filename = safe_filename(attachment.filename)
+        target = os.path.join(folder, f"{attachment.message_id}_{attachment.attachment_id}_{filename}")
+        if os.path.exists(target):
+            continue
+        try:
+            with tracing.span("attachment", "attachments", filename=filename) as span_args, session.get(
+                url, stream=True, timeout=30
+            ) as resp:
+                span_args["status"] = resp.status_code
+                if resp.status_code != 200:
+                    logger.warning("Attachment download failed (%s): %s", resp.status_code, url)
+                    continue
+                with open(target, "wb") as handle:
+                    for chunk in resp.iter_content(chunk_size=8192):
+                        if chunk:
+                            handle.write(chunk)
+                            if metrics:
+                                metrics.add_attachment_bytes(len(chunk))
+            saved += 1
+        except Exception:
+            logger.exception("Attachment download error: %s", url)
+            continue
     return saved
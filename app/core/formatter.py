@@ -1,7 +1,7 @@
 ﻿from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Tuple
+from typing import Any, Dict, Optional, Tuple
 
 from .utils import format_timestamp, parse_discord_timestamp
 
@@ -32,6 +32,21 @@ def _message_content(message: Dict[str, Any]) -> str:
     return "[No content]"
 
 
+def reply_lookup_entry(
+    message: Dict[str, Any], labels: Optional[Dict[Tuple[str, Optional[str]], str]] = None
+) -> Tuple[str, str]:
+    # What a reply shows for its parent when the payload carries no referenced_message.
+    author = message.get("author") or {}
+    if labels is None:
+        return _author_label(author), _message_content(message)
+    # Long exports repeat a few authors, so callers may share one label per (username, discriminator).
+    memo_key = (author.get("username", "Unknown"), author.get("discriminator"))
+    label = labels.get(memo_key)
+    if label is None:
+        label = labels[memo_key] = _author_label(author)
+    return label, _message_content(message)
+
+
 def format_message(
     message: Dict[str, Any],
     lookup: Dict[str, Tuple[str, str]],
@@ -71,4 +86,4 @@ def format_message(
         lines.append(f"(Replying to {ref_author}: {ref_content})")
 
     lines.append(_message_content(message))
-    return "\n".join(lines)
+    return "\n".join(lines)
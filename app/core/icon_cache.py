@@ -1,23 +1,85 @@
 from __future__ import annotations
 
-import hashlib
+import heapq
 import logging
+import math
 import os
-import time
+import struct
+import threading
 from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Sequence
 
 import requests
+from requests.adapters import HTTPAdapter
 from platformdirs import user_cache_dir
-from PySide6.QtCore import QObject, QRunnable, QThreadPool, Qt, Signal
-from PySide6.QtGui import QColor, QFont, QIcon, QPainter, QPen, QPixmap
+from PySide6.QtCore import QBuffer, QByteArray, QCoreApplication, QIODevice, QObject, QRectF, QRunnable, QThreadPool, Qt, Signal
+from PySide6.QtGui import QColor, QFont, QGuiApplication, QIcon, QImage, QPainter, QPen, QPixmap
 
+from app.core import tracing
+from app.core.icon_store import DEFAULT_MAX_BYTES, DEFAULT_TTL_SECONDS, IconCacheEntry, IconDiskCache
 from app.core.paths import APP_NAME
 
 
 CDN_BASE = "https://cdn.discordapp.com"
 DEFAULT_ICON_SIZE = 18
+# The CDN only serves power-of-two sizes in this range.
+CDN_MIN_SIZE = 16
+CDN_MAX_SIZE = 4096
+# Cached payloads holding several pre-scaled PNGs start with this tag; older entries are a single PNG.
+VARIANTS_MAGIC = b"ACIV"
 DOWNLOAD_TIMEOUT_SECONDS = 8
-RETRY_COOLDOWN_SECONDS = 300
+# Only these say the icon is gone for good; everything else is retried with backoff.
+PERMANENT_FAILURE_STATUSES = frozenset({404, 410})
+ICON_USER_AGENT = "ArchiveCord/1.0 (+https://discord.com)"
+# Cached icons are read and decoded in chunks so a full tree costs a handful of pool tasks.
+DISK_BATCH_SIZE = 64
+DISK_TASK_PRIORITY = 1
+# Downloads for keys outside the viewport queue behind every on-screen rank.
+PRIORITY_BACKGROUND = 1 << 30
+
+
+def cdn_request_size(pixels: int) -> int:
+    size = CDN_MIN_SIZE
+    while size < pixels and size < CDN_MAX_SIZE:
+        size *= 2
+    return size
+
+
+def screen_pixel_ratios() -> tuple[float, ...]:
+    ratios = {1.0}
+    if QGuiApplication.instance() is not None:
+        ratios.update(screen.devicePixelRatio() for screen in QGuiApplication.screens())
+    return tuple(sorted(ratios))
+
+
+# Placeholders are requested per row, so the screen ratios are read once and refreshed only on screen changes.
+_screen_ratios: tuple[float, ...] | None = None
+_watched_app: QGuiApplication | None = None
+
+
+def _forget_screen_ratios(*_args) -> None:
+    global _screen_ratios
+    _screen_ratios = None
+
+
+def cached_screen_pixel_ratios() -> tuple[float, ...]:
+    global _screen_ratios, _watched_app
+    app = QGuiApplication.instance()
+    if app is None:
+        return screen_pixel_ratios()
+    if app is not _watched_app:
+        _watched_app = app
+        _screen_ratios = None
+        app.screenAdded.connect(_forget_screen_ratios)
+        app.screenRemoved.connect(_forget_screen_ratios)
+    if _screen_ratios is None:
+        _screen_ratios = screen_pixel_ratios()
+    return _screen_ratios
+
+
+def icon_pixel_sizes(logical_size: int = DEFAULT_ICON_SIZE, ratios: Iterable[float] = (1.0,)) -> tuple[int, ...]:
+    return tuple(sorted({logical_size} | {math.ceil(logical_size * ratio) for ratio in ratios if ratio >= 1.0}))
 
 
 def build_dm_avatar_url(user_id: str, avatar_hash: str, *, size: int = 64) -> str:
@@ -47,110 +109,365 @@ def build_default_avatar_url(index: int, *, size: int = 64) -> str:
     return f"{CDN_BASE}/embed/avatars/{normalized}.png?size={size}"
 
 
-def _create_round_placeholder(bg_hex: str, text: str, *, size: int = DEFAULT_ICON_SIZE) -> QIcon:
-    pix = QPixmap(size, size)
-    pix.fill(QColor(0, 0, 0, 0))
-
-    painter = QPainter(pix)
-    painter.setRenderHint(QPainter.Antialiasing, True)
-    painter.setPen(Qt.NoPen)
-    painter.setBrush(QColor(bg_hex))
-    painter.drawEllipse(0, 0, size, size)
-
-    font = QFont("Segoe UI", max(7, size // 2))
-    font.setBold(True)
-    painter.setFont(font)
-    painter.setPen(QPen(QColor("#f9fafb")))
-    painter.drawText(pix.rect(), Qt.AlignCenter | Qt.TextSingleLine, text)
-    painter.end()
-
-    return QIcon(pix)
+PLACEHOLDER_STYLES = {
+    "dm": ("round", "#2563eb", "D"),
+    "guild": ("square", "#7c3aed", "S"),
+    "channel": ("square", "#334155", "#"),
+    "category": ("square", "#475569", "C"),
+}
+# Placeholders are identical for every row, so each (kind, size, ratios) is painted once per process.
+_placeholder_icons: dict[tuple[str, int, tuple[float, ...]], QIcon] = {}
 
 
-def _create_square_placeholder(bg_hex: str, text: str, *, size: int = DEFAULT_ICON_SIZE) -> QIcon:
-    pix = QPixmap(size, size)
+def _paint_placeholder(shape: str, bg_hex: str, text: str, size: int, ratio: float) -> QPixmap:
+    pix = QPixmap(math.ceil(size * ratio), math.ceil(size * ratio))
+    pix.setDevicePixelRatio(ratio)
     pix.fill(QColor(0, 0, 0, 0))
 
     painter = QPainter(pix)
     painter.setRenderHint(QPainter.Antialiasing, True)
     painter.setPen(Qt.NoPen)
     painter.setBrush(QColor(bg_hex))
-    painter.drawRoundedRect(0, 0, size, size, 4, 4)
+    if shape == "round":
+        painter.drawEllipse(0, 0, size, size)
+    else:
+        painter.drawRoundedRect(0, 0, size, size, 4, 4)
 
     font = QFont("Segoe UI", max(7, size // 2))
     font.setBold(True)
     painter.setFont(font)
     painter.setPen(QPen(QColor("#f9fafb")))
-    painter.drawText(pix.rect(), Qt.AlignCenter | Qt.TextSingleLine, text)
+    painter.drawText(QRectF(0, 0, size, size), Qt.AlignCenter | Qt.TextSingleLine, text)
     painter.end()
+    return pix
+
 
-    return QIcon(pix)
+def placeholder_icon(kind: str, size: int = DEFAULT_ICON_SIZE, ratios: Iterable[float] | None = None) -> QIcon:
+    ratios = cached_screen_pixel_ratios() if ratios is None else tuple(sorted(set(ratios) | {1.0}))
+    memo_key = (kind, size, ratios)
+    icon = _placeholder_icons.get(memo_key)
+    if icon is None:
+        shape, bg_hex, text = PLACEHOLDER_STYLES[kind]
+        icon = QIcon()
+        for ratio in ratios:
+            icon.addPixmap(_paint_placeholder(shape, bg_hex, text, size, ratio))
+        _placeholder_icons[memo_key] = icon
+    return icon
 
 
 def placeholder_dm_icon(size: int = DEFAULT_ICON_SIZE) -> QIcon:
-    return _create_round_placeholder("#2563eb", "D", size=size)
+    return placeholder_icon("dm", size)
 
 
 def placeholder_guild_icon(size: int = DEFAULT_ICON_SIZE) -> QIcon:
-    return _create_square_placeholder("#7c3aed", "S", size=size)
+    return placeholder_icon("guild", size)
 
 
 def placeholder_channel_icon(size: int = DEFAULT_ICON_SIZE) -> QIcon:
-    return _create_square_placeholder("#334155", "#", size=size)
+    return placeholder_icon("channel", size)
 
 
 def placeholder_category_icon(size: int = DEFAULT_ICON_SIZE) -> QIcon:
-    return _create_square_placeholder("#475569", "C", size=size)
+    return placeholder_icon("category", size)
+
+
+def _premultiplied(image: QImage, pixels: int) -> QImage:
+    if max(image.width(), image.height()) != pixels:
+        image = image.scaled(pixels, pixels, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    # Premultiplied ARGB converts to a pixmap without another pass on the GUI thread.
+    return image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+
+
+def decode_icon_variants(payload: bytes, sizes: Sequence[int] = (DEFAULT_ICON_SIZE,)) -> list[QImage] | None:
+    # QImage is safe to build off the GUI thread, unlike QPixmap.
+    with tracing.span("icon_decode", "icons", bytes=len(payload), variants=len(sizes)):
+        image = QImage()
+        if not payload or not image.loadFromData(payload):
+            return None
+        return [_premultiplied(image, pixels) for pixels in sizes]
+
+
+def decode_icon_image(payload: bytes, size: int = DEFAULT_ICON_SIZE) -> QImage | None:
+    variants = decode_icon_variants(payload, (size,))
+    return variants[0] if variants else None
+
+
+def encode_icon_image(image: QImage) -> bytes:
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return bytes(data)
+
+
+def encode_icon_variants(images: Sequence[QImage]) -> bytes:
+    # Only the pre-scaled variants are persisted, never the full CDN payload.
+    parts = [VARIANTS_MAGIC, struct.pack(">B", len(images))]
+    for image in images:
+        png = encode_icon_image(image)
+        parts.append(struct.pack(">I", len(png)))
+        parts.append(png)
+    return b"".join(parts)
+
+
+def decode_cached_variants(payload: bytes) -> list[QImage] | None:
+    if not payload.startswith(VARIANTS_MAGIC):
+        image = decode_icon_image(payload)
+        return [image] if image is not None else None
+    images: list[QImage] = []
+    try:
+        count = payload[len(VARIANTS_MAGIC)]
+        offset = len(VARIANTS_MAGIC) + 1
+        for _ in range(count):
+            (length,) = struct.unpack_from(">I", payload, offset)
+            offset += 4
+            image = QImage()
+            if not image.loadFromData(payload[offset : offset + length]):
+                return None
+            images.append(image.convertToFormat(QImage.Format_ARGB32_Premultiplied))
+            offset += length
+    except (IndexError, struct.error):
+        return None
+    return images or None
+
+
+def icon_from_variants(images: Sequence[QImage], logical_size: int = DEFAULT_ICON_SIZE) -> QIcon:
+    icon = QIcon()
+    for image in images:
+        pixmap = QPixmap.fromImage(image)
+        # Tag each variant with its pixel ratio so Qt picks the sharp one per screen.
+        pixmap.setDevicePixelRatio(max(1.0, max(image.width(), image.height()) / logical_size))
+        icon.addPixmap(pixmap)
+    return icon
+
+
+class _DiskBatchSignals(QObject):
+    # (loaded [(key, url, images, entry, complete)], misses [(key, url)], download) in one queued event per batch.
+    completed = Signal(object, object, bool)
+
+
+class _IconDiskBatchTask(QRunnable):
+    def __init__(self, requests_: list[tuple[str, str | None]], store: IconDiskCache, download: bool, sizes: Sequence[int]):
+        super().__init__()
+        self._requests = requests_
+        self._store = store
+        self._download = download
+        self._largest = max(sizes)
+        self.signals = _DiskBatchSignals()
+
+    def run(self) -> None:  # pragma: no cover - thread scheduling
+        loaded: list[tuple[str, str | None, list[QImage], IconCacheEntry, bool]] = []
+        misses: list[tuple[str, str | None]] = []
+        try:
+            with tracing.span("icon_disk_read", "icons", count=len(self._requests)):
+                cached = self._store.read_many(key for key, _ in self._requests)
+            for key, url in self._requests:
+                hit = cached.get(key)
+                images = decode_cached_variants(hit[0]) if hit else None
+                if images:
+                    # Entries cached for a lower-DPI screen lack the sharp variant this one needs.
+                    complete = max(max(image.width(), image.height()) for image in images) >= self._largest
+                    loaded.append((key, url, images, hit[1], complete))
+                    continue
+                if hit:
+                    self._store.remove(key)
+                misses.append((key, url))
+        finally:
+            self.signals.completed.emit(loaded, misses, self._download)
+
+
+@dataclass
+class IconFetchStats:
+    downloads: int = 0
+    coalesced: int = 0
+    cancelled: int = 0
+    not_modified: int = 0
+    # Downloads skipped because the URL is still backing off from an earlier failure.
+    avoided: int = 0
+
+
+# (ETag, Last-Modified) of the cached copy, sent back as If-None-Match / If-Modified-Since.
+Validators = tuple[str, str]
+
+
+class _UrlFetch:
+    # One download per URL; every key waiting on it shares the result.
+    def __init__(self, url: str, priority: int, validators: Validators | None = None):
+        self.url = url
+        self.priority = priority
+        self.validators = validators
+        self.started = False
+        self._keys: list[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def keys(self) -> list[str]:
+        with self._lock:
+            return list(self._keys)
+
+    def add_key(self, key: str) -> None:
+        with self._lock:
+            if key not in self._keys:
+                self._keys.append(key)
+
+
+class IconHttpSessions:
+    # requests.Session is not thread-safe, so each pool thread keeps its own keep-alive session.
+    # Keyed by thread id: Qt pool threads drop their Python thread state between tasks, and threading.local with it.
+    def __init__(self, *, connections_per_host: int = 2):
+        self._connections_per_host = connections_per_host
+        self._sessions: dict[int, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    def get(self) -> requests.Session:
+        ident = threading.get_ident()
+        with self._lock:
+            session = self._sessions.get(ident)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._connections_per_host)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = ICON_USER_AGENT
+                self._sessions[ident] = session
+        return session
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
 
 
 class _DownloadSignals(QObject):
-    succeeded = Signal(str, bytes)
+    loaded = Signal(str, object)
+    not_modified = Signal(str)
     failed = Signal(str, str)
+    finished = Signal(str)
 
 
 class _IconDownloadTask(QRunnable):
-    def __init__(self, key: str, url: str):
+    def __init__(self, fetch: _UrlFetch, store: IconDiskCache, sessions: IconHttpSessions, sizes: Sequence[int]):
         super().__init__()
-        self._key = key
-        self._url = url
+        self._fetch = fetch
+        self._url = fetch.url
+        self._store = store
+        self._sessions = sessions
+        self._sizes = sizes
         self.signals = _DownloadSignals()
 
     def run(self) -> None:  # pragma: no cover - thread scheduling
         try:
-            response = requests.get(
-                self._url,
-                timeout=DOWNLOAD_TIMEOUT_SECONDS,
-                headers={"User-Agent": "ArchiveCord/1.0 (+https://discord.com)"},
-            )
-            if response.status_code != 200:
-                self.signals.failed.emit(self._key, f"HTTP {response.status_code}")
-                return
-            payload = response.content or b""
-            if not payload:
-                self.signals.failed.emit(self._key, "empty response body")
-                return
-            self.signals.succeeded.emit(self._key, payload)
+            self._download()
+        finally:
+            self.signals.finished.emit(self._url)
+
+    def _download(self) -> None:
+        headers = {}
+        if self._fetch.validators:
+            etag, last_modified = self._fetch.validators
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+        try:
+            with tracing.span("icon_download", "icons", url=self._url, conditional=bool(headers)) as span_args:
+                response = self._sessions.get().get(self._url, timeout=DOWNLOAD_TIMEOUT_SECONDS, headers=headers)
+                span_args["status"] = response.status_code
         except requests.RequestException as exc:
-            self.signals.failed.emit(self._key, exc.__class__.__name__)
+            self._fail(exc.__class__.__name__)
+            return
+        etag = response.headers.get("ETag", "")
+        last_modified = response.headers.get("Last-Modified", "")
+        if response.status_code == 304 and headers:
+            self._store.touch_fetched_many(self._fetch.keys, url=self._url, etag=etag, last_modified=last_modified)
+            self._store.clear_failure(self._url)
+            self.signals.not_modified.emit(self._url)
+            return
+        if response.status_code != 200:
+            self._fail(f"HTTP {response.status_code}", permanent=response.status_code in PERMANENT_FAILURE_STATUSES)
+            return
+        payload = response.content or b""
+        if not payload:
+            self._fail("empty response body")
+            return
+        images = decode_icon_variants(payload, self._sizes)
+        if images is None:
+            self._fail("invalid image")
+            return
+        try:
+            self._store.put_many(self._fetch.keys, self._url, encode_icon_variants(images), etag=etag, last_modified=last_modified)
+        except OSError:
+            pass
+        self._store.clear_failure(self._url)
+        self.signals.loaded.emit(self._url, images)
+
+    def _fail(self, reason: str, *, permanent: bool = False) -> None:
+        # Recorded here so the backoff survives restarts without touching SQLite on the GUI thread.
+        self._store.record_failure(self._url, permanent=permanent, reason=reason)
+        self.signals.failed.emit(self._url, reason)
 
 
 class IconCache(QObject):
     icon_ready = Signal(str, object)
 
-    def __init__(self, *, max_items: int = 256, max_workers: int = 4):
+    def __init__(
+        self,
+        *,
+        max_items: int = 256,
+        max_workers: int = 4,
+        cache_dir: str | None = None,
+        max_disk_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        icon_size: int = DEFAULT_ICON_SIZE,
+        pixel_ratios: Iterable[float] | None = None,
+    ):
         super().__init__()
+        self._icon_size = icon_size
+        self._pixel_sizes = icon_pixel_sizes(icon_size, screen_pixel_ratios() if pixel_ratios is None else pixel_ratios)
         self._logger = logging.getLogger("discordsorter.icons")
         self._memory: OrderedDict[str, QIcon] = OrderedDict()
         self._max_items = max_items
         self._in_flight: set[str] = set()
-        self._failed_until: dict[str, float] = {}
-
-        cache_root = user_cache_dir(APP_NAME, appauthor=False)
-        self._disk_dir = os.path.join(cache_root, "icons")
-        os.makedirs(self._disk_dir, exist_ok=True)
+        # Keys whose disk read was queued without downloads, and the URLs a later visible request wants for them.
+        self._preloading: set[str] = set()
+        self._upgraded: dict[str, str] = {}
+        self._fetches: dict[str, _UrlFetch] = {}
+        self._queue: list[tuple[int, int, str]] = []
+        self._sequence = 0
+        self._visible_rank: dict[str, int] = {}
+        self._revalidate: dict[str, tuple[str, str, str]] = {}
+        self._active_downloads = 0
+        self._max_downloads = max_workers
+        self.stats = IconFetchStats()
+
+        if cache_dir is None:
+            cache_dir = os.path.join(user_cache_dir(APP_NAME, appauthor=False), "icons")
+        self._disk = IconDiskCache(cache_dir, max_bytes=max_disk_bytes, ttl_seconds=ttl_seconds)
 
         self._pool = QThreadPool()
-        self._pool.setMaxThreadCount(max_workers)
+        # One spare thread keeps disk batches moving while every download slot is busy.
+        self._pool.setMaxThreadCount(max_workers + 1)
+        # Idle threads stay alive so their sessions keep CDN connections warm between scrolls.
+        self._pool.setExpiryTimeout(-1)
+        self._sessions = IconHttpSessions()
+        app = QCoreApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.close)
+
+    @property
+    def disk_cache(self) -> IconDiskCache:
+        return self._disk
+
+    @property
+    def pixel_sizes(self) -> tuple[int, ...]:
+        return self._pixel_sizes
+
+    @property
+    def request_size(self) -> int:
+        # Ask the CDN for the smallest size covering the sharpest variant we draw.
+        return cdn_request_size(self._pixel_sizes[-1])
 
     def get_icon(self, key: str) -> QIcon | None:
         icon = self._memory.get(key)
@@ -160,50 +477,189 @@ class IconCache(QObject):
         return icon
 
     def request_icon(self, key: str, url: str | None) -> None:
-        if not key:
-            return
-        if key in self._memory:
-            return
-        if key in self._in_flight:
-            return
-
-        failed_until = self._failed_until.get(key)
-        if failed_until and failed_until > time.time():
-            return
-
-        icon = self._load_from_disk(key)
-        if icon:
-            self._remember(key, icon)
-            self.icon_ready.emit(key, icon)
-            return
+        self.request_icons([(key, url)])
+
+    def request_icons(self, requests_: Iterable[tuple[str, str | None]], *, download: bool = True) -> None:
+        batch: list[tuple[str, str | None]] = []
+        for key, url in requests_:
+            if not key:
+                continue
+            if key in self._in_flight:
+                if download and url and key in self._preloading:
+                    # The preload's disk read is still running; let its result download for this request.
+                    self._upgraded[key] = url
+                continue
+            if key in self._memory:
+                # Icons shown from an expired cache entry revalidate once they are actually wanted.
+                stale = self._revalidate.get(key)
+                if stale and download and url:
+                    if self._disk.is_blocked(url):
+                        self.stats.avoided += 1
+                        continue
+                    del self._revalidate[key]
+                    self._in_flight.add(key)
+                    entry_url, etag, last_modified = stale
+                    self._enqueue_download(key, url, (etag, last_modified) if entry_url == url else None)
+                continue
+            if download and key not in self._disk and self._disk.is_blocked(url):
+                # Nothing on disk and the URL is backing off: no point spending a pool task on it.
+                self.stats.avoided += 1
+                continue
+            self._in_flight.add(key)
+            if not download:
+                self._preloading.add(key)
+            batch.append((key, url))
+
+        # Disk reads, downloads and decoding all run in the pool; the GUI thread only wraps the result.
+        for start in range(0, len(batch), DISK_BATCH_SIZE):
+            task = _IconDiskBatchTask(batch[start : start + DISK_BATCH_SIZE], self._disk, download, self._pixel_sizes)
+            task.signals.completed.connect(self._on_disk_batch_completed)
+            self._pool.start(task, DISK_TASK_PRIORITY)
+        self._pump_downloads()
+
+    def update_viewport(self, requests_: list[tuple[str, str | None]]) -> None:
+        # Rank by on-screen order; queued downloads nobody can see any more are dropped.
+        self._visible_rank = {key: rank for rank, (key, _) in enumerate(requests_) if key}
+        for url, fetch in list(self._fetches.items()):
+            if fetch.started:
+                continue
+            keys = fetch.keys
+            ranks = [self._visible_rank[key] for key in keys if key in self._visible_rank]
+            if not ranks:
+                del self._fetches[url]
+                self._in_flight.difference_update(keys)
+                self.stats.cancelled += len(keys)
+                continue
+            if min(ranks) != fetch.priority:
+                fetch.priority = min(ranks)
+                self._push(fetch)
+        self.request_icons(requests_)
+        self._pump_downloads()
+
+    def pending_downloads(self) -> int:
+        return sum(1 for fetch in self._fetches.values() if not fetch.started)
+
+    def wait_for_pending(self, timeout_ms: int = -1) -> bool:
+        return self._pool.waitForDone(timeout_ms)
+
+    def close(self) -> None:
+        self._queue.clear()
+        self._fetches = {url: fetch for url, fetch in self._fetches.items() if fetch.started}
+        self._pool.waitForDone(DOWNLOAD_TIMEOUT_SECONDS * 1000)
+        self._sessions.close()
+        self._disk.close()
+        stats = self.stats
+        self._logger.info(
+            "Icon fetch stats: downloads=%s coalesced=%s cancelled=%s not_modified=%s avoided=%s",
+            stats.downloads,
+            stats.coalesced,
+            stats.cancelled,
+            stats.not_modified,
+            stats.avoided,
+        )
 
-        if not url:
+    def _on_disk_batch_completed(self, loaded: object, misses: object, download: bool) -> None:
+        for key, url, images, entry, complete in loaded:
+            key_download, url = self._batch_download(key, url, download)
+            self._on_icon_loaded(key, images)
+            # Only an up-to-date entry with every variant can skip the network.
+            reusable = complete and entry.url == url
+            if not (self._disk.is_stale(entry) or (url and not reusable)):
+                self._in_flight.discard(key)
+            elif key_download and url and not self._avoid(key, url):
+                self._enqueue_download(key, url, (entry.etag, entry.last_modified) if reusable else None)
+            else:
+                self._in_flight.discard(key)
+                self._revalidate[key] = (entry.url if complete else "", entry.etag, entry.last_modified)
+        for key, url in misses:
+            key_download, url = self._batch_download(key, url, download)
+            if key_download and url and not self._avoid(key, url):
+                self._enqueue_download(key, url, None)
+            else:
+                self._in_flight.discard(key)
+        self._pump_downloads()
+
+    def _batch_download(self, key: str, url: str | None, download: bool) -> tuple[bool, str | None]:
+        self._preloading.discard(key)
+        wanted = self._upgraded.pop(key, None)
+        return (True, wanted) if wanted else (download, url)
+
+    def _avoid(self, key: str, url: str) -> bool:
+        if not self._disk.is_blocked(url):
+            return False
+        self.stats.avoided += 1
+        self._logger.debug("Skipping icon download for key=%s; %s is backing off", key, url)
+        return True
+
+    def _enqueue_download(self, key: str, url: str, validators: Validators | None) -> None:
+        priority = self._visible_rank.get(key, PRIORITY_BACKGROUND)
+        fetch = self._fetches.get(url)
+        if fetch is not None:
+            fetch.add_key(key)
+            self.stats.coalesced += 1
+            if not fetch.started:
+                if validators is None:
+                    # Someone without a cached copy needs the body, so the request cannot be conditional.
+                    fetch.validators = None
+                if priority < fetch.priority:
+                    fetch.priority = priority
+                    self._push(fetch)
             return
-
-        self._in_flight.add(key)
-        task = _IconDownloadTask(key, url)
-        task.signals.succeeded.connect(self._on_download_succeeded)
-        task.signals.failed.connect(self._on_download_failed)
-        self._pool.start(task)
-
-    def _on_download_succeeded(self, key: str, payload: bytes) -> None:
-        self._in_flight.discard(key)
-        icon = self._icon_from_bytes(payload)
-        if not icon:
-            self._mark_failed(key, "invalid image")
+        fetch = _UrlFetch(url, priority, validators if validators and any(validators) else None)
+        fetch.add_key(key)
+        self._fetches[url] = fetch
+        self._push(fetch)
+
+    def _push(self, fetch: _UrlFetch) -> None:
+        self._sequence += 1
+        heapq.heappush(self._queue, (fetch.priority, self._sequence, fetch.url))
+
+    def _pump_downloads(self) -> None:
+        while self._active_downloads < self._max_downloads and self._queue:
+            priority, _, url = heapq.heappop(self._queue)
+            fetch = self._fetches.get(url)
+            # Entries are invalidated lazily: skip cancelled, started or re-ranked ones.
+            if fetch is None or fetch.started or fetch.priority != priority:
+                continue
+            fetch.started = True
+            self._active_downloads += 1
+            self.stats.downloads += 1
+            task = _IconDownloadTask(fetch, self._disk, self._sessions, self._pixel_sizes)
+            task.signals.loaded.connect(self._on_download_loaded)
+            task.signals.not_modified.connect(self._on_download_not_modified)
+            task.signals.failed.connect(self._on_download_failed)
+            task.signals.finished.connect(self._on_download_finished)
+            self._pool.start(task)
+
+    def _on_download_loaded(self, url: str, images: object) -> None:
+        fetch = self._fetches.get(url)
+        for key in fetch.keys if fetch else []:
+            self._on_icon_loaded(key, images)
+
+    def _on_download_not_modified(self, url: str) -> None:
+        self.stats.not_modified += 1
+
+    def _on_download_failed(self, url: str, reason: str) -> None:
+        fetch = self._fetches.get(url)
+        for key in fetch.keys if fetch else []:
+            self._mark_failed(key, reason)
+
+    def _on_download_finished(self, url: str) -> None:
+        fetch = self._fetches.pop(url, None)
+        if fetch is not None:
+            self._in_flight.difference_update(fetch.keys)
+        self._active_downloads = max(0, self._active_downloads - 1)
+        self._pump_downloads()
+
+    def _on_icon_loaded(self, key: str, images: object) -> None:
+        if not images or any(image.isNull() for image in images):
             return
 
+        icon = icon_from_variants(images, self._icon_size)
         self._remember(key, icon)
-        self._store_to_disk(key, payload)
-        self._failed_until.pop(key, None)
         self.icon_ready.emit(key, icon)
 
-    def _on_download_failed(self, key: str, reason: str) -> None:
-        self._in_flight.discard(key)
-        self._mark_failed(key, reason)
-
     def _mark_failed(self, key: str, reason: str) -> None:
-        self._failed_until[key] = time.time() + RETRY_COOLDOWN_SECONDS
         self._logger.debug("Icon fetch failed for key=%s (%s)", key, reason)
 
     def _remember(self, key: str, icon: QIcon) -> None:
@@ -211,44 +667,3 @@ class IconCache(QObject):
         self._memory.move_to_end(key)
         while len(self._memory) > self._max_items:
             self._memory.popitem(last=False)
-
-    def _cache_path(self, key: str) -> str:
-        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
-        return os.path.join(self._disk_dir, f"{digest}.img")
-
-    def _store_to_disk(self, key: str, payload: bytes) -> None:
-        path = self._cache_path(key)
-        tmp = f"{path}.tmp"
-        try:
-            with open(tmp, "wb") as handle:
-                handle.write(payload)
-            os.replace(tmp, path)
-        except OSError:
-            try:
-                if os.path.exists(tmp):
-                    os.remove(tmp)
-            except OSError:
-                pass
-
-    def _load_from_disk(self, key: str) -> QIcon | None:
-        path = self._cache_path(key)
-        if not os.path.isfile(path):
-            return None
-        try:
-            with open(path, "rb") as handle:
-                payload = handle.read()
-        except OSError:
-            return None
-        return self._icon_from_bytes(payload)
-
-    def _icon_from_bytes(self, payload: bytes) -> QIcon | None:
-        pix = QPixmap()
-        if not pix.loadFromData(payload):
-            return None
-        scaled = pix.scaled(
-            DEFAULT_ICON_SIZE,
-            DEFAULT_ICON_SIZE,
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation,
-        )
-        return QIcon(scaled)
@@ -0,0 +1,421 @@
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+INDEX_FILE_NAME = "index.sqlite3"
+PACK_FILE_NAME = "icons.pack"
+SCHEMA_VERSION = 3
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+# Access times are batched so cache hits never write to SQLite one by one.
+ACCESS_FLUSH_THRESHOLD = 64
+# Rewrite the pack once dead bytes outweigh live ones and exceed this floor.
+COMPACT_MIN_DEAD_BYTES = 1024 * 1024
+# Transient failures (timeouts, 5xx, 429) back off exponentially between these bounds.
+FAILURE_BACKOFF_BASE_SECONDS = 60
+FAILURE_BACKOFF_MAX_SECONDS = 6 * 60 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL DEFAULT '',
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    etag TEXT NOT NULL DEFAULT '',
+    last_modified TEXT NOT NULL DEFAULT ''
+)
+"""
+_COLUMNS = "key, url, offset, size, fetched_at, last_access, etag, last_modified"
+# Added alongside entries rather than bumping the schema, so upgrading keeps the pack.
+_FAILURES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS failures (
+    url TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    failed_at REAL NOT NULL,
+    retry_at REAL NOT NULL,
+    permanent INTEGER NOT NULL DEFAULT 0,
+    reason TEXT NOT NULL DEFAULT ''
+)
+"""
+_FAILURE_COLUMNS = "url, attempts, failed_at, retry_at, permanent, reason"
+
+
+@dataclass
+class IconCacheEntry:
+    key: str
+    url: str
+    offset: int
+    size: int
+    fetched_at: float
+    last_access: float
+    etag: str = ""
+    last_modified: str = ""
+
+    def is_stale(self, now: float, ttl_seconds: float) -> bool:
+        return now - self.fetched_at >= ttl_seconds
+
+
+@dataclass
+class IconFetchFailure:
+    url: str
+    attempts: int
+    failed_at: float
+    retry_at: float
+    permanent: bool = False
+    reason: str = ""
+
+    def blocks(self, now: float) -> bool:
+        return now < self.retry_at
+
+
+def failure_backoff(attempts: int, *, permanent: bool, permanent_seconds: float) -> float:
+    transient = min(FAILURE_BACKOFF_MAX_SECONDS, FAILURE_BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    # Hashed CDN URLs never come back once gone, but a removed record still gets one retry per TTL.
+    return max(transient, permanent_seconds) if permanent else transient
+
+
+class IconDiskCache:
+    def __init__(
+        self,
+        directory: str,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._logger = logging.getLogger("discordsorter.icons")
+        self._lock = threading.Lock()
+        self._closed = False
+        self._dirty_access: Dict[str, float] = {}
+        self._pack_path = os.path.join(directory, PACK_FILE_NAME)
+        self._map: Optional[mmap.mmap] = None
+        os.makedirs(directory, exist_ok=True)
+
+        # Workers share one connection; every use is serialized by the lock.
+        self._db = sqlite3.connect(os.path.join(directory, INDEX_FILE_NAME), check_same_thread=False)
+        if self._db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            # Older layouts are a disposable cache; start over rather than migrate.
+            self._db.execute("DROP TABLE IF EXISTS entries")
+            self._db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._truncate_pack()
+        self._db.execute(_SCHEMA)
+        self._db.execute(_FAILURES_SCHEMA)
+        self._db.commit()
+
+        self._pack = open(self._pack_path, "ab")
+        self._pack_size = self._pack.seek(0, os.SEEK_END)
+        self._entries: Dict[str, IconCacheEntry] = {}
+        self._failures: Dict[str, IconFetchFailure] = {}
+        self._total_bytes = 0
+        with self._lock:
+            # Records whose retry window lapsed a whole TTL ago carry no useful backoff history.
+            self._db.execute("DELETE FROM failures WHERE retry_at < ?", (self._clock() - self.ttl_seconds,))
+            for row in self._db.execute(f"SELECT {_FAILURE_COLUMNS} FROM failures"):
+                failure = IconFetchFailure(row[0], row[1], row[2], row[3], bool(row[4]), row[5])
+                self._failures[failure.url] = failure
+            self._db.commit()
+            for row in self._db.execute(f"SELECT {_COLUMNS} FROM entries"):
+                entry = IconCacheEntry(*row)
+                self._entries[entry.key] = entry
+                self._total_bytes += entry.size
+            # Entries past the end of the pack were indexed by a write that never landed.
+            for entry in [entry for entry in self._entries.values() if entry.offset + entry.size > self._pack_size]:
+                self._drop(entry.key)
+            self._remove_legacy_files()
+            self._evict()
+            self._remap()
+            if self._should_compact():
+                self._compact()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    @property
+    def pack_bytes(self) -> int:
+        return self._pack_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def lookup(self, key: str) -> Optional[IconCacheEntry]:
+        return self._entries.get(key)
+
+    def is_stale(self, entry: IconCacheEntry) -> bool:
+        return entry.is_stale(self._clock(), self.ttl_seconds)
+
+    def failure(self, url: str) -> Optional[IconFetchFailure]:
+        return self._failures.get(url)
+
+    def is_blocked(self, url: Optional[str]) -> bool:
+        failure = self._failures.get(url) if url else None
+        return failure is not None and failure.blocks(self._clock())
+
+    def record_failure(self, url: str, *, permanent: bool = False, reason: str = "") -> Optional[IconFetchFailure]:
+        with self._lock:
+            if self._closed or not url:
+                return None
+            now = self._clock()
+            previous = self._failures.get(url)
+            attempts = previous.attempts + 1 if previous is not None else 1
+            failure = IconFetchFailure(
+                url=url,
+                attempts=attempts,
+                failed_at=now,
+                retry_at=now + failure_backoff(attempts, permanent=permanent, permanent_seconds=self.ttl_seconds),
+                permanent=permanent,
+                reason=reason or "",
+            )
+            self._failures[url] = failure
+            self._db.execute(
+                f"INSERT OR REPLACE INTO failures ({_FAILURE_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                (failure.url, failure.attempts, failure.failed_at, failure.retry_at, int(failure.permanent), failure.reason),
+            )
+            self._db.commit()
+        return failure
+
+    def clear_failure(self, url: str) -> bool:
+        with self._lock:
+            if self._closed or self._failures.pop(url, None) is None:
+                return False
+            self._db.execute("DELETE FROM failures WHERE url = ?", (url,))
+            self._db.commit()
+        return True
+
+    def read(self, key: str) -> Optional[Tuple[bytes, IconCacheEntry]]:
+        return self.read_many([key]).get(key)
+
+    def read_many(self, keys: Iterable[str]) -> Dict[str, Tuple[bytes, IconCacheEntry]]:
+        # Hits are slices of the mapped pack: no open/read per icon.
+        found: Dict[str, Tuple[bytes, IconCacheEntry]] = {}
+        with self._lock:
+            if self._closed:
+                return found
+            now = self._clock()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                self._ensure_mapped(entry.offset + entry.size)
+                if self._map is None:
+                    continue
+                found[key] = (self._map[entry.offset : entry.offset + entry.size], entry)
+                entry.last_access = now
+                self._dirty_access[key] = now
+            if len(self._dirty_access) >= ACCESS_FLUSH_THRESHOLD:
+                self._flush_access()
+        return found
+
+    def put(self, key: str, url: str, payload: bytes, *, etag: str = "", last_modified: str = "") -> IconCacheEntry:
+        return self.put_many([key], url, payload, etag=etag, last_modified=last_modified)[0]
+
+    def put_many(
+        self, keys: Iterable[str], url: str, payload: bytes, *, etag: str = "", last_modified: str = ""
+    ) -> List[IconCacheEntry]:
+        # Keys sharing one URL (default avatars) point at a single copy in the pack.
+        with self._lock:
+            if self._closed:
+                raise OSError("icon cache is closed")
+            offset = self._pack_size
+            self._pack.write(payload)
+            self._pack.flush()
+            self._pack_size += len(payload)
+
+            now = self._clock()
+            stored: List[IconCacheEntry] = []
+            for key in keys:
+                entry = IconCacheEntry(
+                    key=key,
+                    url=url or "",
+                    offset=offset,
+                    size=len(payload),
+                    fetched_at=now,
+                    last_access=now,
+                    etag=etag or "",
+                    last_modified=last_modified or "",
+                )
+                previous = self._entries.get(key)
+                if previous is not None:
+                    self._total_bytes -= previous.size
+                self._entries[key] = entry
+                self._total_bytes += entry.size
+                self._dirty_access.pop(key, None)
+                stored.append(entry)
+            self._db.executemany(
+                f"INSERT OR REPLACE INTO entries ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (entry.key, entry.url, entry.offset, entry.size, entry.fetched_at, entry.last_access, entry.etag, entry.last_modified)
+                    for entry in stored
+                ],
+            )
+            self._evict()
+            self._flush_access()
+            if self._should_compact():
+                self._compact()
+        return stored
+
+    def touch_fetched(self, key: str) -> None:
+        self.touch_fetched_many([key])
+
+    def touch_fetched_many(
+        self, keys: Iterable[str], *, url: Optional[str] = None, etag: Optional[str] = None, last_modified: Optional[str] = None
+    ) -> int:
+        # A 304 restarts the TTL; servers may also rotate validators on it.
+        touched = 0
+        with self._lock:
+            if self._closed:
+                return touched
+            now = self._clock()
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or (url is not None and entry.url != url):
+                    continue
+                entry.fetched_at = now
+                if etag:
+                    entry.etag = etag
+                if last_modified:
+                    entry.last_modified = last_modified
+                self._db.execute(
+                    "UPDATE entries SET fetched_at = ?, etag = ?, last_modified = ? WHERE key = ?",
+                    (entry.fetched_at, entry.etag, entry.last_modified, key),
+                )
+                touched += 1
+            self._db.commit()
+        return touched
+
+    def remove(self, key: str) -> bool:
+        with self._lock:
+            removed = self._drop(key)
+            self._db.commit()
+        return removed
+
+    def compact(self) -> None:
+        with self._lock:
+            self._compact()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_access()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_access()
+            if self._should_compact():
+                self._compact()
+            self._unmap()
+            self._pack.close()
+            self._db.close()
+            self._closed = True
+
+    def _flush_access(self) -> None:
+        if self._dirty_access:
+            self._db.executemany(
+                "UPDATE entries SET last_access = ? WHERE key = ?",
+                [(stamp, key) for key, stamp in self._dirty_access.items()],
+            )
+            self._dirty_access.clear()
+        self._db.commit()
+
+    def _drop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        self._dirty_access.pop(key, None)
+        if entry is None:
+            return False
+        # The bytes stay in the pack until the next compaction.
+        self._total_bytes -= entry.size
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        return True
+
+    def _evict(self) -> None:
+        if self._total_bytes <= self.max_bytes:
+            return
+        victims: List[IconCacheEntry] = sorted(self._entries.values(), key=lambda entry: entry.last_access)
+        evicted = 0
+        for entry in victims:
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._drop(entry.key)
+            evicted += 1
+        self._db.commit()
+        self._logger.debug("Evicted %s icons; cache now %s bytes", evicted, self._total_bytes)
+
+    def _should_compact(self) -> bool:
+        dead = self._pack_size - self._total_bytes
+        return dead >= COMPACT_MIN_DEAD_BYTES and dead > self._total_bytes
+
+    def _compact(self) -> None:
+        self._ensure_mapped(self._pack_size)
+        tmp = f"{self._pack_path}.tmp"
+        entries = sorted(self._entries.values(), key=lambda entry: entry.offset)
+        moved: Dict[int, int] = {}
+        offset = 0
+        with open(tmp, "wb") as handle:
+            for entry in entries:
+                if entry.offset not in moved:
+                    handle.write(self._map[entry.offset : entry.offset + entry.size])
+                    moved[entry.offset] = offset
+                    offset += entry.size
+                entry.offset = moved[entry.offset]
+        # Windows refuses to replace a file that is still mapped or open.
+        self._unmap()
+        self._pack.close()
+        os.replace(tmp, self._pack_path)
+        self._pack = open(self._pack_path, "ab")
+        reclaimed = self._pack_size - offset
+        self._pack_size = offset
+        self._db.executemany("UPDATE entries SET offset = ? WHERE key = ?", [(entry.offset, entry.key) for entry in entries])
+        self._db.commit()
+        self._remap()
+        self._logger.debug("Compacted icon pack; reclaimed %s bytes", reclaimed)
+
+    def _ensure_mapped(self, end: int) -> None:
+        # Writes only append, so the map is refreshed lazily once a read runs past its end, not on every put.
+        if self._map is None or end > len(self._map):
+            self._remap()
+
+    def _remap(self) -> None:
+        self._unmap()
+        if self._pack_size:
+            with open(self._pack_path, "rb") as handle:
+                self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _unmap(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _truncate_pack(self) -> None:
+        with open(self._pack_path, "wb"):
+            pass
+
+    def _remove_legacy_files(self) -> None:
+        # Per-icon files from the previous layout are never served again.
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith((".img", ".img.tmp", ".pack.tmp")):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
@@ -1,10 +1,15 @@
 ﻿from __future__ import annotations
 
+import itertools
+import json
 import logging
 import logging.handlers
 import os
 import queue
-from typing import Optional
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Mapping, Optional
 
 from app.core.paths import resolve_default_paths
 from app.core.utils import ensure_dir
@@ -12,17 +17,160 @@ from app.core.utils import ensure_dir
 LOG_FORMAT = "[%(asctime)s] [%(levelname)s] %(message)s"
 LOG_DATE_FORMAT = "%d-%m-%Y %H:%M:%S"
 
+LOG_LEVELS_ENV = "ARCHIVECORD_LOG_LEVELS"
+LOG_JSON_ENV = "ARCHIVECORD_LOG_JSON"
+LOG_SAMPLE_ENV = "ARCHIVECORD_LOG_SAMPLE_EVERY"
+
+DEFAULT_HOT_PATH_SAMPLE_EVERY = 10
+
+SUBSYSTEM_LOGGERS: dict[str, tuple[str, ...]] = {
+    "api": ("discordsorter.api",),
+    "export": ("discordsorter.export", "discordsorter.exporter", "discordsorter.formatter"),
+    "icons": ("discordsorter.icons",),
+    "batch": ("discordsorter.batch",),
+    "conversations": ("discordsorter.conversations",),
+    "ui": ("discordsorter.ui",),
+}
+
+_STANDARD_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_sample_every = DEFAULT_HOT_PATH_SAMPLE_EVERY
+_samplers: list["HotPathSampler"] = []
+
 
 class LoggingController:
-    def __init__(self, listener: logging.handlers.QueueListener):
+    def __init__(self, listener: logging.handlers.QueueListener, queue_handler: Optional["_MeteredQueueHandler"] = None):
         self._listener = listener
+        self._queue_handler = queue_handler
+
+    def stats(self) -> dict:
+        records = self._queue_handler.records if self._queue_handler else 0
+        seconds = self._queue_handler.seconds if self._queue_handler else 0.0
+        return {
+            "records": records,
+            "emit_seconds": round(seconds, 6),
+            "avg_emit_us": round((seconds / records) * 1_000_000, 2) if records else 0.0,
+            "sampled_out": sampled_out_count(),
+        }
 
     def stop(self) -> None:
+        if self._queue_handler:
+            logging.getLogger("discordsorter.logging").info("Logging stats: %s", self.stats())
         if self._listener:
             self._listener.stop()
 
 
-def setup_logging(log_dir: str | None = None) -> Optional[LoggingController]:
+class _MeteredQueueHandler(logging.handlers.QueueHandler):
+    # Tracks how many records went through the queue and the time spent preparing them.
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self._stats_lock = threading.Lock()
+        self.records = 0
+        self.seconds = 0.0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        started = time.perf_counter()
+        super().emit(record)
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self.records += 1
+            self.seconds += elapsed
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class HotPathSampler:
+    # Emits one DEBUG record out of every N calls; level checks happen before any formatting.
+    def __init__(self, logger_name: str, every: Optional[int] = None):
+        self._logger = logging.getLogger(logger_name)
+        self._every = every
+        self._counter = itertools.count()
+        self.suppressed = 0
+        _samplers.append(self)
+
+    def debug(self, msg: str, *args) -> None:
+        if not self._logger.isEnabledFor(logging.DEBUG):
+            return
+        seen = next(self._counter)
+        every = self._every or _sample_every
+        if every > 1 and seen % every:
+            self.suppressed += 1
+            return
+        if every > 1:
+            self._logger.debug(f"{msg} [sampled 1/{every}, seen={seen + 1}]", *args)
+        else:
+            self._logger.debug(msg, *args)
+
+
+def sampled_out_count() -> int:
+    return sum(sampler.suppressed for sampler in _samplers)
+
+
+def parse_level_spec(spec: str | None) -> dict[str, int]:
+    levels: dict[str, int] = {}
+    if not spec:
+        return levels
+    for chunk in spec.split(","):
+        name, sep, level_name = chunk.partition("=")
+        name = name.strip().lower()
+        level = logging.getLevelName(level_name.strip().upper())
+        if not sep or not name or not isinstance(level, int):
+            continue
+        levels[name] = level
+    return levels
+
+
+def apply_subsystem_levels(levels: Mapping[str, int | str]) -> None:
+    for name, raw_level in levels.items():
+        level = logging.getLevelName(raw_level.upper()) if isinstance(raw_level, str) else raw_level
+        if not isinstance(level, int):
+            continue
+        key = name.lower()
+        if key in {"root", "*"}:
+            logging.getLogger().setLevel(level)
+            continue
+        for logger_name in SUBSYSTEM_LOGGERS.get(key, (key,)):
+            logging.getLogger(logger_name).setLevel(level)
+
+
+def configure_sampling(every: int) -> None:
+    global _sample_every
+    _sample_every = max(1, int(every))
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def setup_logging(
+    log_dir: str | None = None,
+    *,
+    levels: Optional[Mapping[str, int | str]] = None,
+    json_lines: Optional[bool] = None,
+    sample_every: Optional[int] = None,
+) -> Optional[LoggingController]:
     if getattr(setup_logging, "_configured", False):
         return None
 
@@ -34,14 +182,27 @@ def setup_logging(log_dir: str | None = None) -> Optional[LoggingController]:
     formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
 
     log_queue: queue.Queue = queue.Queue(-1)
-    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler = _MeteredQueueHandler(log_queue)
 
     file_handler = logging.handlers.RotatingFileHandler(
         log_path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"
     )
     file_handler.setFormatter(formatter)
-
-    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    handlers: list[logging.Handler] = [file_handler]
+
+    if json_lines is None:
+        json_lines = _env_flag(LOG_JSON_ENV)
+    if json_lines:
+        json_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, "archivecord.jsonl"),
+            maxBytes=5 * 1024 * 1024,
+            backupCount=3,
+            encoding="utf-8",
+        )
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
     listener.start()
 
     root = logging.getLogger()
@@ -51,5 +212,10 @@ def setup_logging(log_dir: str | None = None) -> Optional[LoggingController]:
     logging.getLogger("urllib3").setLevel(logging.WARNING)
     logging.getLogger("requests").setLevel(logging.WARNING)
 
+    configure_sampling(sample_every if sample_every is not None else _env_int(LOG_SAMPLE_ENV, DEFAULT_HOT_PATH_SAMPLE_EVERY))
+    apply_subsystem_levels(parse_level_spec(os.environ.get(LOG_LEVELS_ENV)))
+    if levels:
+        apply_subsystem_levels(levels)
+
     setup_logging._configured = True
-    return LoggingController(listener)
+    return LoggingController(listener, queue_handler)
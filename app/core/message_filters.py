@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+DISCORD_EPOCH_MS = 1420070400000
+# Discord's guild search endpoint returns at most 25 hits per request.
+SEARCH_PAGE_SIZE = 25
+HAS_VALUES = ("attachment", "link", "embed")
+# The search API calls attachments "file".
+_SEARCH_HAS_PARAM = {"attachment": "file", "link": "link", "embed": "embed"}
+_LINK_RE = re.compile(r"https?://\S", re.IGNORECASE)
+_ID_SPLIT_RE = re.compile(r"[\s,;]+")
+
+
+def snowflake_from_datetime(value: datetime) -> str:
+    millis = max(0, int(value.timestamp() * 1000) - DISCORD_EPOCH_MS)
+    return str(millis << 22)
+
+
+def parse_id_list(value: Any) -> Tuple[str, ...]:
+    if not value:
+        return ()
+    items = _ID_SPLIT_RE.split(value) if isinstance(value, str) else [str(item) for item in value]
+    ids = []
+    for item in items:
+        item = item.strip().lstrip("<@!").rstrip(">")
+        if not item:
+            continue
+        if not item.isdigit():
+            raise ValueError(f"Invalid Discord ID: {item!r}")
+        if item not in ids:
+            ids.append(item)
+    return tuple(ids)
+
+
+def _normalize_has(value: Iterable[str]) -> Tuple[str, ...]:
+    has = []
+    for item in value or ():
+        item = str(item).strip().lower()
+        if item == "file":
+            item = "attachment"
+        if item not in HAS_VALUES:
+            raise ValueError(f"Unsupported has: filter '{item}'. Use one of: {', '.join(HAS_VALUES)}")
+        if item not in has:
+            has.append(item)
+    return tuple(has)
+
+
+@dataclass(frozen=True)
+class MessageSearchFilter:
+    author_ids: Tuple[str, ...] = ()
+    mention_ids: Tuple[str, ...] = ()
+    has: Tuple[str, ...] = ()
+    content: str = ""
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        author_ids: Any = None,
+        mention_ids: Any = None,
+        has: Iterable[str] = (),
+        content: Optional[str] = None,
+    ) -> "MessageSearchFilter":
+        return cls(
+            author_ids=parse_id_list(author_ids),
+            mention_ids=parse_id_list(mention_ids),
+            has=_normalize_has(has),
+            content=" ".join((content or "").split()),
+        )
+
+    def is_empty(self) -> bool:
+        return not (self.author_ids or self.mention_ids or self.has or self.content)
+
+    def as_dict(self) -> dict:
+        return {
+            "author_ids": list(self.author_ids),
+            "mention_ids": list(self.mention_ids),
+            "has": list(self.has),
+            "content": self.content or None,
+        }
+
+    def search_params(
+        self,
+        *,
+        channel_id: str,
+        min_id: Optional[str] = None,
+        max_id: Optional[str] = None,
+        sort_order: str = "desc",
+    ) -> dict:
+        params: dict = {"channel_id": channel_id, "include_nsfw": "true", "sort_by": "timestamp", "sort_order": sort_order}
+        if self.author_ids:
+            params["author_id"] = list(self.author_ids)
+        if self.mention_ids:
+            params["mentions"] = list(self.mention_ids)
+        if self.has:
+            params["has"] = [_SEARCH_HAS_PARAM[item] for item in self.has]
+        if self.content:
+            params["content"] = self.content
+        if min_id:
+            params["min_id"] = min_id
+        if max_id:
+            params["max_id"] = max_id
+        return params
+
+    def matches(self, message: dict) -> bool:
+        # Client-side equivalent of the search query, used where the endpoint is unavailable (DMs).
+        if self.author_ids and str((message.get("author") or {}).get("id")) not in self.author_ids:
+            return False
+        if self.mention_ids:
+            mentioned = {str(user.get("id")) for user in message.get("mentions") or []}
+            if not mentioned.intersection(self.mention_ids):
+                return False
+        content = message.get("content") or ""
+        for item in self.has:
+            if item == "attachment" and not message.get("attachments"):
+                return False
+            if item == "embed" and not message.get("embeds"):
+                return False
+            if item == "link" and not _LINK_RE.search(content):
+                return False
+        if self.content:
+            lowered = content.lower()
+            if not all(term in lowered for term in self.content.lower().split()):
+                return False
+        return True
+
+
+def search_hits(payload: Optional[dict]) -> List[dict]:
+    # Each result is a list of the hit plus optional context messages.
+    hits: List[dict] = []
+    for group in (payload or {}).get("messages") or []:
+        if isinstance(group, dict):
+            group.pop("hit", None)
+            hits.append(group)
+            continue
+        if not group:
+            continue
+        hit = next((item for item in group if item.get("hit")), group[0])
+        # Drop the search marker so exported payloads match channel history.
+        hit.pop("hit", None)
+        hits.append(hit)
+    hits.sort(key=lambda message: int(message.get("id") or 0), reverse=True)
+    return hits
+
+
+MessagePredicate = Callable[[dict], bool]
+
+# Discord message types that are useful to filter on by name.
+MESSAGE_TYPE_NAMES = {
+    "default": 0,
+    "call": 3,
+    "pin": 6,
+    "join": 7,
+    "boost": 8,
+    "reply": 19,
+    "command": 20,
+    "thread": 21,
+}
+# A bare URL is one token, so its "//" is not read as an empty /regex/.
+_URL_TOKEN = r"""(?:[^\s()"/]*:)?[A-Za-z][\w+.-]*://[^\s()"]*"""
+_URL_RE = re.compile(r"[A-Za-z][\w+.-]*://")
+_TOKEN_RE = re.compile(
+    r"""\s*(?:[()-]|""" + _URL_TOKEN + r"""|[^\s()"/]*(?:"(?:[^"\\]|\\.)*"|/(?:[^/\\]|\\.)*/i?|[^\s()"]*))"""
+)
+
+
+class FilterSyntaxError(ValueError):
+    pass
+
+
+def _tokenize(expression: str) -> List[str]:
+    tokens: List[str] = []
+    position = 0
+    expression = expression.strip()
+    while position < len(expression):
+        match = _TOKEN_RE.match(expression, position)
+        if not match or match.end() == position:
+            raise FilterSyntaxError(f"Unexpected character at position {position}: {expression[position:]!r}")
+        tokens.append(match.group(0).strip())
+        position = match.end()
+    return [token for token in tokens if token]
+
+
+def _unquote(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return re.sub(r"\\(.)", r"\1", value[1:-1])
+    return value
+
+
+def _compile_regex(value: str) -> "re.Pattern[str]":
+    flags = 0
+    if value.endswith("/i"):
+        flags = re.IGNORECASE
+        value = value[:-1]
+    try:
+        return re.compile(value[1:-1], flags)
+    except re.error as exc:
+        raise FilterSyntaxError(f"Invalid regex {value!r}: {exc}") from exc
+
+
+def _reaction_count(message: dict) -> int:
+    return sum(int(reaction.get("count") or 0) for reaction in message.get("reactions") or [])
+
+
+def _compile_term(token: str) -> MessagePredicate:
+    if token.startswith("/"):
+        pattern = _compile_regex(token)
+        return lambda message: pattern.search(message.get("content") or "") is not None
+    # Quoted phrases and bare URLs are free text even when they contain a colon.
+    if token.startswith('"') or _URL_RE.match(token):
+        needle = _unquote(token).lower()
+        return lambda message: needle in (message.get("content") or "").lower()
+    key, separator, value = token.partition(":")
+    if not separator:
+        needle = _unquote(token).lower()
+        return lambda message: needle in (message.get("content") or "").lower()
+
+    key = key.lower()
+    value = _unquote(value)
+    if not value:
+        raise FilterSyntaxError(f"Missing value for '{key}:'")
+    if key in ("author", "from"):
+        try:
+            authors = frozenset(parse_id_list(value))
+        except ValueError as exc:
+            raise FilterSyntaxError(str(exc)) from exc
+        return lambda message: str((message.get("author") or {}).get("id")) in authors
+    if key == "content":
+        if value.startswith("/"):
+            return _compile_term(value)
+        needle = value.lower()
+        return lambda message: needle in (message.get("content") or "").lower()
+    if key == "type":
+        try:
+            types = frozenset(
+                MESSAGE_TYPE_NAMES[item] if item in MESSAGE_TYPE_NAMES else int(item)
+                for item in value.lower().split(",")
+            )
+        except ValueError as exc:
+            raise FilterSyntaxError(f"Unknown message type in {value!r}") from exc
+        return lambda message: int(message.get("type") or 0) in types
+    if key == "is":
+        if value == "pinned":
+            return lambda message: bool(message.get("pinned"))
+        if value == "edited":
+            return lambda message: bool(message.get("edited_timestamp"))
+        if value == "reply":
+            return lambda message: bool(message.get("message_reference"))
+        raise FilterSyntaxError(f"Unknown is: value '{value}'. Use pinned, edited or reply")
+    if key == "has":
+        if value in ("attachment", "file"):
+            return lambda message: bool(message.get("attachments"))
+        if value == "embed":
+            return lambda message: bool(message.get("embeds"))
+        if value == "link":
+            return lambda message: _LINK_RE.search(message.get("content") or "") is not None
+        if value == "reaction":
+            return lambda message: bool(message.get("reactions"))
+        raise FilterSyntaxError(f"Unknown has: value '{value}'. Use attachment, embed, link or reaction")
+    if key == "reactions":
+        minimum = value[2:] if value.startswith(">=") else value
+        if not minimum.isdigit():
+            raise FilterSyntaxError(f"reactions: expects a minimum count, got {value!r}")
+        threshold = int(minimum)
+        return lambda message: _reaction_count(message) >= threshold
+    raise FilterSyntaxError(f"Unknown filter key '{key}:'")
+
+
+class _FilterParser:
+    # expr := and ("or" and)* ; and := unary ("and"? unary)* ; unary := ("not" | "-") unary | "(" expr ")" | term
+    def __init__(self, tokens: List[str]):
+        self._tokens = tokens
+        self._index = 0
+
+    def _peek(self) -> Optional[str]:
+        return self._tokens[self._index] if self._index < len(self._tokens) else None
+
+    def _take(self) -> str:
+        token = self._tokens[self._index]
+        self._index += 1
+        return token
+
+    def parse(self) -> MessagePredicate:
+        predicate = self._parse_or()
+        if self._peek() is not None:
+            raise FilterSyntaxError(f"Unexpected '{self._peek()}'")
+        return predicate
+
+    def _parse_or(self) -> MessagePredicate:
+        options = [self._parse_and()]
+        while self._peek() is not None and self._peek().lower() == "or":
+            self._take()
+            options.append(self._parse_and())
+        if len(options) == 1:
+            return options[0]
+        return lambda message: any(option(message) for option in options)
+
+    def _parse_and(self) -> MessagePredicate:
+        parts = [self._parse_unary()]
+        while True:
+            token = self._peek()
+            if token is None or token == ")" or token.lower() == "or":
+                break
+            if token.lower() == "and":
+                self._take()
+            parts.append(self._parse_unary())
+        if len(parts) == 1:
+            return parts[0]
+        if len(parts) == 2:
+            first, second = parts
+            return lambda message: first(message) and second(message)
+        return lambda message: all(part(message) for part in parts)
+
+    def _parse_unary(self) -> MessagePredicate:
+        token = self._peek()
+        if token is None:
+            raise FilterSyntaxError("Unexpected end of filter expression")
+        if token.lower() == "not" or token == "-":
+            self._take()
+            inner = self._parse_unary()
+            return lambda message: not inner(message)
+        if token == "(":
+            self._take()
+            inner = self._parse_or()
+            if self._peek() != ")":
+                raise FilterSyntaxError("Missing ')'")
+            self._take()
+            return inner
+        if token == ")" or token.lower() in ("and", "or"):
+            raise FilterSyntaxError(f"Unexpected '{token}'")
+        return _compile_term(self._take())
+
+
+def compile_message_filter(expression: str) -> MessagePredicate:
+    tokens = _tokenize(expression or "")
+    if not tokens:
+        raise FilterSyntaxError("Filter expression is empty")
+    return _FilterParser(tokens).parse()
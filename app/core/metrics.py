@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from app.core import tracing
+
+EXPORT_STAGES = (
+    "validate",
+    "fetch",
+    "filter",
+    "sort",
+    "format",
+    "write_json",
+    "write_txt",
+    "attachments",
+)
+
+
+@dataclass
+class RequestStats:
+    api_calls: int = 0
+    rate_limit_waits: int = 0
+    rate_limit_sleep_seconds: float = 0.0
+    bytes_received: int = 0
+    server_error_retries: int = 0
+
+
+@dataclass
+class ExportMetrics:
+    stages: dict[str, float] = field(default_factory=dict)
+    bytes_written: int = 0
+    attachment_bytes_received: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            with tracing.span(name, "export"):
+                yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def add_bytes_written(self, count: int) -> None:
+        with self._lock:
+            self.bytes_written += count
+
+    def add_attachment_bytes(self, count: int) -> None:
+        with self._lock:
+            self.attachment_bytes_received += count
+            self.bytes_written += count
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def as_dict(self, *, message_count: int, requests: RequestStats | None = None) -> dict:
+        total = self.elapsed()
+        requests = requests or RequestStats()
+        return {
+            "total_seconds": round(total, 4),
+            "stages_seconds": {
+                name: round(self.stages[name], 4) for name in EXPORT_STAGES if name in self.stages
+            },
+            "api_calls": requests.api_calls,
+            "rate_limit_waits": requests.rate_limit_waits,
+            "rate_limit_sleep_seconds": round(requests.rate_limit_sleep_seconds, 4),
+            "server_error_retries": requests.server_error_retries,
+            "bytes_received": requests.bytes_received + self.attachment_bytes_received,
+            "bytes_written": self.bytes_written,
+            "messages_per_second": round(message_count / total, 2) if total > 0 else 0.0,
+        }
+
+
+def format_performance_summary(performance: dict) -> str:
+    stages = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in performance["stages_seconds"].items())
+    return (
+        f"{performance['total_seconds']:.2f}s total, {performance['messages_per_second']} msg/s, "
+        f"api_calls={performance['api_calls']}, rate_limit_waits={performance['rate_limit_waits']} "
+        f"({performance['rate_limit_sleep_seconds']:.2f}s), rx={performance['bytes_received']}B, "
+        f"tx={performance['bytes_written']}B [{stages}]"
+    )
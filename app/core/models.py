@@ -4,6 +4,9 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+from app.core.attachment_plan import DEFAULT_ATTACHMENT_LIMITS, AttachmentLimits
+from app.core.message_filters import MessageSearchFilter
+
 
 @dataclass(frozen=True)
 class ConversationItem:
@@ -34,6 +37,11 @@ class ExportOptions:
     category_name: Optional[str]
     channel_name: Optional[str]
     export_label: str
+    search: Optional[MessageSearchFilter] = None
+    message_filter: Optional[str] = None
+    attachment_limits: AttachmentLimits = DEFAULT_ATTACHMENT_LIMITS
+    # Report the attachment plan without downloading anything.
+    attachment_plan_only: bool = False
 
 
 @dataclass(frozen=True)
@@ -46,3 +54,5 @@ class ExportResult:
     metadata_path: str
     attachments_dir: Optional[str]
     attachments_saved: int
+    performance: Optional[dict] = None
+    attachment_plan: Optional[dict] = None
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import logging
+import os
+import pstats
+import tracemalloc
+from typing import Optional
+
+from app.core.utils import ensure_dir
+
+
+PROFILE_ENV = "ARCHIVECORD_PROFILE"
+PROFILE_TOP_N = 15
+REPORT_TOP_N = 50
+
+_IGNORED_ALLOCATION_FILES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>")
+
+
+def profiling_enabled_by_env() -> bool:
+    return os.environ.get(PROFILE_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+class ExportProfiler:
+    # cProfile only sees the thread that called start(), which is the export worker thread.
+    def __init__(self, *, top_n: int = PROFILE_TOP_N):
+        self._top_n = top_n
+        self._profile = cProfile.Profile()
+        self._started_tracemalloc = False
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._peak_bytes = 0
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._profile.enable()
+
+    def stop(self) -> None:
+        self._profile.disable()
+        _, self._peak_bytes = tracemalloc.get_traced_memory()
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in _IGNORED_ALLOCATION_FILES]
+        )
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def hottest_functions(self, limit: int) -> list[str]:
+        stats = pstats.Stats(self._profile)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)  # type: ignore[attr-defined]
+        lines = []
+        for (filename, lineno, func), (_cc, ncalls, tottime, cumtime, _callers) in rows[:limit]:
+            lines.append(
+                f"{tottime:.4f}s self {cumtime:.4f}s cum {ncalls} calls {os.path.basename(filename)}:{lineno}({func})"
+            )
+        return lines
+
+    def top_allocators(self, limit: int) -> list[str]:
+        if self._snapshot is None:
+            return []
+        return [str(stat) for stat in self._snapshot.statistics("lineno")[:limit]]
+
+    def write_reports(self, directory: str) -> list[str]:
+        ensure_dir(directory)
+        prof_path = os.path.join(directory, "profile.prof")
+        self._profile.dump_stats(prof_path)
+
+        stats_text = io.StringIO()
+        pstats.Stats(self._profile, stream=stats_text).sort_stats("cumulative").print_stats(REPORT_TOP_N)
+        stats_path = os.path.join(directory, "profile.txt")
+        with open(stats_path, "w", encoding="utf-8") as handle:
+            handle.write(stats_text.getvalue())
+
+        written = [prof_path, stats_path]
+        if self._snapshot is not None:
+            snapshot_path = os.path.join(directory, "memory.snapshot")
+            self._snapshot.dump(snapshot_path)
+            memory_path = os.path.join(directory, "memory.txt")
+            with open(memory_path, "w", encoding="utf-8") as handle:
+                handle.write(f"Peak traced memory: {self._peak_bytes} bytes\n\n")
+                handle.write("\n".join(self.top_allocators(REPORT_TOP_N)))
+                handle.write("\n")
+            written.extend([snapshot_path, memory_path])
+        return written
+
+    def log_summary(self, logger: logging.Logger) -> None:
+        logger.info("Profile peak traced memory: %.1f MiB", self._peak_bytes / (1024 * 1024))
+        for line in self.top_allocators(self._top_n):
+            logger.info("Profile top allocator: %s", line)
+        for line in self.hottest_functions(self._top_n):
+            logger.info("Profile hot function: %s", line)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+from app.core.paths import resolve_default_paths
+from app.core.utils import ensure_dir
+
+
+TRACE_ENV = "ARCHIVECORD_TRACE"
+TRACE_DIR_ENV = "ARCHIVECORD_TRACE_DIR"
+
+
+class TraceRecorder:
+    # Collects Chrome trace-event "complete" events (ph=X), timestamps in microseconds.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._events: list[dict] = []
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1_000_000
+
+    @contextmanager
+    def span(self, name: str, category: str = "app", **args: Any) -> Iterator[dict]:
+        started = self._now_us()
+        try:
+            yield args
+        finally:
+            self._append(
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": round(started, 3),
+                    "dur": round(self._now_us() - started, 3),
+                    "pid": self._pid,
+                    "tid": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    def instant(self, name: str, category: str = "app", **args: Any) -> None:
+        self._append(
+            {
+                "name": name,
+                "cat": category,
+                "ph": "i",
+                "s": "t",
+                "ts": round(self._now_us(), 3),
+                "pid": self._pid,
+                "tid": threading.get_ident(),
+                "args": args,
+            }
+        )
+
+    def _append(self, event: dict) -> None:
+        with self._lock:
+            self._events.append(event)
+
+    def events(self) -> list[dict]:
+        with self._lock:
+            events = list(self._events)
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self._pid,
+                "tid": tid,
+                "args": {"name": thread_names.get(tid, f"thread-{tid}")},
+            }
+            for tid in sorted({event["tid"] for event in events})
+        ]
+        return metadata + events
+
+    def dump(self, path: str) -> str:
+        ensure_dir(os.path.dirname(path) or ".")
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, handle, default=str)
+        return path
+
+
+_active: Optional[TraceRecorder] = None
+_active_lock = threading.Lock()
+
+
+def tracing_enabled_by_env() -> bool:
+    return os.environ.get(TRACE_ENV, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def default_trace_path(name: str) -> str:
+    trace_dir = os.environ.get(TRACE_DIR_ENV, "").strip()
+    if not trace_dir:
+        trace_dir = os.path.join(resolve_default_paths().logs_dir, "traces")
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    return os.path.join(trace_dir, f"{name}_{stamp}_{os.getpid()}.json")
+
+
+def active_recorder() -> Optional[TraceRecorder]:
+    return _active
+
+
+def start_trace() -> TraceRecorder:
+    global _active
+    with _active_lock:
+        if _active is None:
+            _active = TraceRecorder()
+        return _active
+
+
+def stop_trace(path: str) -> Optional[str]:
+    global _active
+    with _active_lock:
+        recorder = _active
+        _active = None
+    if recorder is None:
+        return None
+    try:
+        written = recorder.dump(path)
+    except OSError:
+        logging.getLogger("discordsorter.trace").exception("Failed to write trace file: %s", path)
+        return None
+    logging.getLogger("discordsorter.trace").info("Trace written: %s", written)
+    return written
+
+
+@contextmanager
+def span(name: str, category: str = "app", **args: Any) -> Iterator[dict]:
+    # No-op unless a recorder is active, so call sites can stay unconditional.
+    recorder = _active
+    if recorder is None:
+        yield args
+        return
+    with recorder.span(name, category, **args) as span_args:
+        yield span_args
+
+
+def instant(name: str, category: str = "app", **args: Any) -> None:
+    recorder = _active
+    if recorder is not None:
+        recorder.instant(name, category, **args)
@@ -1,10 +1,12 @@
 ﻿from __future__ import annotations
 
 import logging
+import re
+import threading
 from collections import deque
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Deque, List
+from typing import Callable, Deque, List, Optional, Set, Tuple
 
 from PySide6.QtCore import (
     QAbstractTableModel,
@@ -39,24 +41,67 @@ LEVEL_COLORS = {
     "ERROR": QColor("#e06c75"),
 }
 
+DEFAULT_MAX_LOG_ENTRIES = 5000
+SEARCH_DEBOUNCE_MS = 150
 
-@dataclass(frozen=True)
+LogQueryMatcher = Callable[[str], bool]
+
+_EXCEPTION_FORMATTER = logging.Formatter()
+
+
+# eq=False keeps hashing by identity so the proxy can track accepted entries cheaply.
+@dataclass(frozen=True, eq=False)
 class LogEntry:
     timestamp: datetime
     timestamp_str: str
     level: str
     levelno: int
     message: str
+    search_key: str = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "search_key",
+            f"{self.timestamp_str} {self.level} {self.message}".lower(),
+        )
+
+
+def compile_log_query(query: str) -> Tuple[Optional[LogQueryMatcher], bool]:
+    query = query.strip()
+    if not query:
+        return None, False
+
+    if len(query) > 2 and query.startswith("/") and query.endswith("/"):
+        try:
+            pattern = re.compile(query[1:-1], re.IGNORECASE)
+        except re.error:
+            pattern = None
+        if pattern is not None:
+            return (lambda key: pattern.search(key) is not None), True
+
+    terms = query.lower().split()
+    if len(terms) == 1:
+        term = terms[0]
+        return (lambda key: term in key), False
+    return (lambda key: all(term in key for term in terms)), False
 
 
 class LogTableModel(QAbstractTableModel):
-    def __init__(self, max_entries: int = 5000) -> None:
+    # Fixed-capacity ring buffer: row N lives at (_head + N) % capacity.
+    def __init__(self, max_entries: int = DEFAULT_MAX_LOG_ENTRIES) -> None:
         super().__init__()
-        self._entries: List[LogEntry] = []
-        self._max_entries = max_entries
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self._capacity = max_entries
+        self._buffer: List[Optional[LogEntry]] = [None] * max_entries
+        self._head = 0
+        self._count = 0
 
     def rowCount(self, parent=None) -> int:
-        return len(self._entries)
+        if parent is not None and parent.isValid():
+            return 0
+        return self._count
 
     def columnCount(self, parent=None) -> int:
         return 3
@@ -64,7 +109,7 @@ class LogTableModel(QAbstractTableModel):
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return None
-        entry = self._entries[index.row()]
+        entry = self.entry(index.row())
 
         if role == Qt.DisplayRole:
             if index.column() == 0:
@@ -90,30 +135,60 @@ class LogTableModel(QAbstractTableModel):
             return "Message"
         return None
 
+    def capacity(self) -> int:
+        return self._capacity
+
     def entry(self, row: int) -> LogEntry:
-        return self._entries[row]
+        if row < 0 or row >= self._count:
+            raise IndexError(row)
+        return self._buffer[(self._head + row) % self._capacity]  # type: ignore[return-value]
+
+    def entries(self) -> List[LogEntry]:
+        return [self.entry(row) for row in range(self._count)]
 
     def append_entries(self, entries: List[LogEntry]) -> None:
         if not entries:
             return
+        if len(entries) > self._capacity:
+            entries = entries[-self._capacity:]
 
-        overflow = max(0, len(self._entries) + len(entries) - self._max_entries)
+        overflow = max(0, self._count + len(entries) - self._capacity)
         if overflow:
             self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
-            del self._entries[:overflow]
+            # Evicted slots are overwritten by the insert below.
+            self._head = (self._head + overflow) % self._capacity
+            self._count -= overflow
             self.endRemoveRows()
 
-        start = len(self._entries)
+        start = self._count
         end = start + len(entries) - 1
         self.beginInsertRows(QModelIndex(), start, end)
-        self._entries.extend(entries)
+        for entry in entries:
+            self._buffer[(self._head + self._count) % self._capacity] = entry
+            self._count += 1
         self.endInsertRows()
 
+    def set_capacity(self, max_entries: int) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        if max_entries == self._capacity:
+            return
+        kept = self.entries()[-max_entries:]
+        self.beginResetModel()
+        self._capacity = max_entries
+        self._buffer = [None] * max_entries
+        self._buffer[: len(kept)] = kept
+        self._head = 0
+        self._count = len(kept)
+        self.endResetModel()
+
     def clear(self) -> None:
-        if not self._entries:
+        if not self._count:
             return
-        self.beginRemoveRows(QModelIndex(), 0, len(self._entries) - 1)
-        self._entries.clear()
+        self.beginRemoveRows(QModelIndex(), 0, self._count - 1)
+        self._buffer = [None] * self._capacity
+        self._head = 0
+        self._count = 0
         self.endRemoveRows()
 
 
@@ -122,24 +197,78 @@ class LogFilterProxyModel(QSortFilterProxyModel):
         super().__init__()
         self._level_filter = "ALL"
         self._text_filter = ""
+        self._text_is_regex = False
+        self._matcher: Optional[LogQueryMatcher] = None
         self._include_debug = True
+        # Entries accepted by the current filter; lets a narrowing query skip rejected rows.
+        self._accepted: Set[LogEntry] = set()
+        self._narrowing = False
+
+    def setSourceModel(self, model) -> None:  # type: ignore[override]
+        super().setSourceModel(model)
+        self._accepted.clear()
+        if model is not None:
+            model.rowsAboutToBeRemoved.connect(self._on_source_rows_about_to_be_removed)
+            model.modelAboutToBeReset.connect(self._accepted.clear)
 
     def set_level_filter(self, value: str) -> None:
+        self.beginFilterChange()
         self._level_filter = value.upper()
-        self.invalidateFilter()
+        self._end_filter_change(narrow=False)
 
     def set_text_filter(self, text: str) -> None:
-        self._text_filter = text.lower().strip()
-        self.invalidateFilter()
+        query = text.strip()
+        if query == self._text_filter:
+            return
+        previous = self._text_filter
+        matcher, is_regex = compile_log_query(query)
+        narrow = (
+            not is_regex
+            and not self._text_is_regex
+            and query.lower().startswith(previous.lower())
+        )
+        self.beginFilterChange()
+        self._text_filter = query
+        self._text_is_regex = is_regex
+        self._matcher = matcher
+        self._end_filter_change(narrow=narrow)
 
     def set_include_debug(self, enabled: bool) -> None:
+        self.beginFilterChange()
         self._include_debug = enabled
-        self.invalidateFilter()
+        self._end_filter_change(narrow=False)
+
+    def _end_filter_change(self, *, narrow: bool) -> None:
+        if not narrow:
+            self._accepted.clear()
+        self._narrowing = narrow
+        try:
+            self.endFilterChange(QSortFilterProxyModel.Direction.Rows)
+        finally:
+            self._narrowing = False
+
+    def _on_source_rows_about_to_be_removed(self, parent, first: int, last: int) -> None:
+        if not self._accepted:
+            return
+        model: LogTableModel = self.sourceModel()  # type: ignore
+        for row in range(first, last + 1):
+            self._accepted.discard(model.entry(row))
 
     def filterAcceptsRow(self, source_row: int, source_parent) -> bool:
         model: LogTableModel = self.sourceModel()  # type: ignore
         entry = model.entry(source_row)
 
+        if self._narrowing and entry not in self._accepted:
+            return False
+
+        accepted = self._entry_matches(entry)
+        if accepted:
+            self._accepted.add(entry)
+        else:
+            self._accepted.discard(entry)
+        return accepted
+
+    def _entry_matches(self, entry: LogEntry) -> bool:
         if self._level_filter == "ALL":
             if not self._include_debug and entry.levelno == logging.DEBUG:
                 return False
@@ -147,34 +276,73 @@ class LogFilterProxyModel(QSortFilterProxyModel):
             if entry.level.upper() != self._level_filter:
                 return False
 
-        if self._text_filter:
-            haystack = f"{entry.timestamp_str} {entry.level} {entry.message}".lower()
-            if self._text_filter not in haystack:
-                return False
+        if self._matcher is not None and not self._matcher(entry.search_key):
+            return False
 
         return True
 
 
 class QtLogHandler(QObject, logging.Handler):
-    record_emitted = Signal(object)
+    # Records are converted to LogEntry on the emitting thread and buffered; the GUI
+    # thread is only signalled when the buffer goes from empty to non-empty.
+    entries_available = Signal()
 
-    def __init__(self) -> None:
+    def __init__(self, *, max_pending: int = DEFAULT_MAX_LOG_ENTRIES) -> None:
         QObject.__init__(self)
         logging.Handler.__init__(self)
+        self._buffer_lock = threading.Lock()
+        self._buffer: Deque[LogEntry] = deque(maxlen=max_pending)
 
     def emit(self, record: logging.LogRecord) -> None:
-        self.record_emitted.emit(record)
+        try:
+            entry = self._entry_from_record(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._buffer_lock:
+            was_empty = not self._buffer
+            self._buffer.append(entry)
+        if was_empty:
+            self.entries_available.emit()
+
+    def drain(self) -> List[LogEntry]:
+        with self._buffer_lock:
+            entries = list(self._buffer)
+            self._buffer.clear()
+        return entries
+
+    def _entry_from_record(self, record: logging.LogRecord) -> LogEntry:
+        timestamp = datetime.fromtimestamp(record.created).astimezone()
+        message = record.getMessage()
+        if record.exc_info:
+            try:
+                exc_text = (self.formatter or _EXCEPTION_FORMATTER).formatException(record.exc_info)
+                message = f"{message} | {exc_text}"
+            except Exception:
+                pass
+        return LogEntry(
+            timestamp=timestamp,
+            timestamp_str=format_log_timestamp(timestamp),
+            level=record.levelname,
+            levelno=record.levelno,
+            message=message,
+        )
 
 
 class LogTab(QWidget):
-    def __init__(self) -> None:
+    def __init__(self, *, max_entries: int = DEFAULT_MAX_LOG_ENTRIES) -> None:
         super().__init__()
-        self._pending: Deque[logging.LogRecord] = deque()
         self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
         self._flush_timer.setInterval(100)
         self._flush_timer.timeout.connect(self._flush_pending)
 
-        self._model = LogTableModel(max_entries=5000)
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self._search_timer.timeout.connect(self._apply_search)
+
+        self._model = LogTableModel(max_entries=max_entries)
         self._proxy = LogFilterProxyModel()
         self._proxy.setSourceModel(self._model)
 
@@ -197,8 +365,8 @@ class LogTab(QWidget):
         self.debug_toggle.toggled.connect(self._proxy.set_include_debug)
 
         self.search_input = QLineEdit()
-        self.search_input.setPlaceholderText("Search logs")
-        self.search_input.textChanged.connect(self._proxy.set_text_filter)
+        self.search_input.setPlaceholderText("Search logs (terms or /regex/)")
+        self.search_input.textChanged.connect(lambda _text: self._search_timer.start())
 
         self.auto_scroll = QCheckBox("Auto-scroll")
         self.auto_scroll.setChecked(True)
@@ -233,43 +401,23 @@ class LogTab(QWidget):
         layout.addLayout(controls)
         layout.addWidget(self.table, 1)
 
+    def _apply_search(self) -> None:
+        self._proxy.set_text_filter(self.search_input.text())
+
     def _install_handler(self) -> None:
-        self._handler = QtLogHandler()
+        self._handler = QtLogHandler(max_pending=self._model.capacity())
         self._handler.setLevel(logging.DEBUG)
-        self._handler.record_emitted.connect(self._enqueue_record)
+        self._handler.entries_available.connect(self._schedule_flush)
         logging.getLogger().addHandler(self._handler)
 
-    def _enqueue_record(self, record: logging.LogRecord) -> None:
-        self._pending.append(record)
+    def _schedule_flush(self) -> None:
         if not self._flush_timer.isActive():
             self._flush_timer.start()
 
     def _flush_pending(self) -> None:
-        if not self._pending:
+        entries = self._handler.drain()
+        if not entries:
             return
-        records = []
-        while self._pending:
-            records.append(self._pending.popleft())
-
-        entries: List[LogEntry] = []
-        for record in records:
-            timestamp = datetime.fromtimestamp(record.created).astimezone()
-            message = record.getMessage()
-            if record.exc_info:
-                try:
-                    exc_text = self._handler.formatException(record.exc_info)
-                    message = f"{message} | {exc_text}"
-                except Exception:
-                    pass
-            entries.append(
-                LogEntry(
-                    timestamp=timestamp,
-                    timestamp_str=format_log_timestamp(timestamp),
-                    level=record.levelname,
-                    levelno=record.levelno,
-                    message=message,
-                )
-            )
 
         self._model.append_entries(entries)
 
@@ -287,4 +435,4 @@ class LogTab(QWidget):
         source_index = self._proxy.mapToSource(index)
         entry = self._model.entry(source_index.row())
         text = f"[{entry.timestamp_str}] [{entry.level}] {entry.message}"
-        QApplication.clipboard().setText(text)
+        QApplication.clipboard().setText(text)
@@ -3,7 +3,7 @@
 import logging
 import os
 
-from PySide6.QtCore import QDate, QSettings, QTime, Qt, QUrl, Signal
+from PySide6.QtCore import QDate, QSettings, QTime, QTimer, Qt, QUrl, Signal
 from PySide6.QtGui import QAction, QDesktopServices, QIcon
 from PySide6.QtWidgets import (
     QApplication,
@@ -33,6 +33,8 @@ from PySide6.QtWidgets import (
     QWidget,
 )
 
+from app.core.attachment_plan import AttachmentLimits, build_attachment_limits, format_bytes
+from app.core.message_filters import MessageSearchFilter, compile_message_filter
 from app.core.models import ExportOptions
 from app.core.icon_cache import (
     IconCache,
@@ -50,6 +52,7 @@ from app.ui.log_tab import LogTab
 from app.workers.batch_export_worker import BatchExportResult, BatchExportTarget, BatchExportWorker
 from app.workers.conversation_worker import ConversationWorker
 from app.workers.export_worker import ExportWorker
+from app.workers.timeline_export_worker import TimelineExportWorker
 
 CHANNEL_TYPES_EXPORTABLE = {0, 5}  # GUILD_TEXT, GUILD_NEWS
 CATEGORY_TYPE = 4
@@ -61,6 +64,10 @@ NODE_KIND_CATEGORY = "category"
 NODE_KIND_CHANNEL = "channel"
 NODE_KIND_PLACEHOLDER = "placeholder"
 
+ICON_REQUEST_ROLE = Qt.UserRole + 1
+ICON_VIEWPORT_DEBOUNCE_MS = 50
+ICON_PREFETCH_PAGES = 1
+
 
 class ConversationTreeWidget(QTreeWidget):
     toggle_requested = Signal(object)
@@ -90,6 +97,7 @@ class MainWindow(QMainWindow):
         export_default_fallback_used: bool = False,
         logs_fallback_used: bool = False,
         startup_warnings: tuple[str, ...] = (),
+        icon_cache: IconCache | None = None,
     ):
         super().__init__()
         self.setWindowTitle("ArchiveCord")
@@ -115,6 +123,7 @@ class MainWindow(QMainWindow):
         self._conversation_worker: ConversationWorker | None = None
         self._export_worker: ExportWorker | None = None
         self._batch_worker: BatchExportWorker | None = None
+        self._timeline_worker: TimelineExportWorker | None = None
         self._connected_user: dict | None = None
         self._selected_targets: list[dict] = []
         self._tree_syncing = False
@@ -122,9 +131,15 @@ class MainWindow(QMainWindow):
         self._is_export_running = False
         self._batch_cancel_requested = False
         self._logger = logging.getLogger("discordsorter.ui")
-        self._icon_cache = IconCache()
+        # Tests and benchmarks pass their own so they never open the user's icon cache.
+        self._icon_cache = icon_cache or IconCache()
         self._icon_cache.icon_ready.connect(self.on_icon_ready)
         self._icon_items: dict[str, list[QTreeWidgetItem]] = {}
+        self._pending_icon_requests: list[tuple[str, str | None]] = []
+        self._icon_viewport_timer = QTimer(self)
+        self._icon_viewport_timer.setSingleShot(True)
+        self._icon_viewport_timer.setInterval(ICON_VIEWPORT_DEBOUNCE_MS)
+        self._icon_viewport_timer.timeout.connect(self._update_icon_viewport)
         self._dm_fallback_icon: QIcon = placeholder_dm_icon()
         self._guild_fallback_icon: QIcon = placeholder_guild_icon()
         self._dms_root_item: QTreeWidgetItem | None = None
@@ -200,6 +215,10 @@ class MainWindow(QMainWindow):
         self.tree.itemPressed.connect(self.on_tree_item_pressed)
         self.tree.itemChanged.connect(self.on_tree_item_changed)
         self.tree.toggle_requested.connect(self.on_tree_toggle_requested)
+        self.tree.itemExpanded.connect(self._schedule_icon_viewport_update)
+        self.tree.itemCollapsed.connect(self._schedule_icon_viewport_update)
+        self.tree.verticalScrollBar().valueChanged.connect(self._schedule_icon_viewport_update)
+        self.tree.verticalScrollBar().rangeChanged.connect(self._schedule_icon_viewport_update)
 
         search_row = QHBoxLayout()
         search_row.setSpacing(6)
@@ -279,6 +298,49 @@ class MainWindow(QMainWindow):
 
         self.date_filter_master.toggled.connect(self.update_filter_controls)
 
+        message_filter_group = QGroupBox("Message Filters (optional)")
+        message_filter_group.setToolTip(
+            "Server channels are filtered by Discord search, so only matches are downloaded. "
+            "DMs are filtered locally."
+        )
+        message_filter_layout = QGridLayout(message_filter_group)
+        message_filter_layout.setHorizontalSpacing(8)
+        message_filter_layout.setVerticalSpacing(6)
+        self.filter_authors_input = QLineEdit()
+        self.filter_authors_input.setPlaceholderText("Author user IDs (comma separated)")
+        self.filter_mentions_input = QLineEdit()
+        self.filter_mentions_input.setPlaceholderText("Mentioned user IDs (comma separated)")
+        self.filter_contains_input = QLineEdit()
+        self.filter_contains_input.setPlaceholderText("Words the message must contain")
+        self.filter_has_attachment = QCheckBox("Attachment")
+        self.filter_has_link = QCheckBox("Link")
+        self.filter_has_embed = QCheckBox("Embed")
+        has_layout = QHBoxLayout()
+        has_layout.setSpacing(12)
+        has_layout.addWidget(self.filter_has_attachment)
+        has_layout.addWidget(self.filter_has_link)
+        has_layout.addWidget(self.filter_has_embed)
+        has_layout.addStretch(1)
+        message_filter_layout.addWidget(QLabel("From:"), 0, 0)
+        message_filter_layout.addWidget(self.filter_authors_input, 0, 1)
+        message_filter_layout.addWidget(QLabel("Mentions:"), 0, 2)
+        message_filter_layout.addWidget(self.filter_mentions_input, 0, 3)
+        message_filter_layout.addWidget(QLabel("Contains:"), 1, 0)
+        message_filter_layout.addWidget(self.filter_contains_input, 1, 1)
+        message_filter_layout.addWidget(QLabel("Has:"), 1, 2)
+        message_filter_layout.addLayout(has_layout, 1, 3)
+        self.filter_expression_input = QLineEdit()
+        self.filter_expression_input.setPlaceholderText("Expression, e.g. author:123 (has:attachment or reactions:>=3)")
+        self.filter_expression_input.setToolTip(
+            "Terms: author:ID[,ID], content:/regex/i, \"words\", type:default|reply|N, "
+            "is:pinned|edited|reply, has:attachment|embed|link|reaction, reactions:>=N.\n"
+            "Combine with spaces (and), or, not/-, and parentheses. Applied to every message while fetching."
+        )
+        message_filter_layout.addWidget(QLabel("Expression:"), 2, 0)
+        message_filter_layout.addWidget(self.filter_expression_input, 2, 1, 1, 3)
+        message_filter_layout.setColumnStretch(1, 1)
+        message_filter_layout.setColumnStretch(3, 1)
+
         options_group = QGroupBox("Output Format")
         options_layout = QVBoxLayout(options_group)
         options_layout.setSpacing(8)
@@ -304,6 +366,26 @@ class MainWindow(QMainWindow):
         formats_layout.setColumnStretch(1, 1)
         options_layout.addLayout(formats_layout)
 
+        # Checked against attachment metadata before any download starts.
+        self.attachment_limits_panel = QWidget()
+        attachment_limits_layout = QGridLayout(self.attachment_limits_panel)
+        attachment_limits_layout.setContentsMargins(20, 0, 0, 0)
+        attachment_limits_layout.setHorizontalSpacing(8)
+        attachment_limits_layout.setVerticalSpacing(4)
+        self.attachment_max_size_input = QLineEdit()
+        self.attachment_max_size_input.setPlaceholderText("Max file size, e.g. 25MB")
+        self.attachment_max_total_input = QLineEdit()
+        self.attachment_max_total_input.setPlaceholderText("Total budget (default 2GB, 0 = unlimited)")
+        self.attachment_types_input = QLineEdit()
+        self.attachment_types_input.setPlaceholderText("Types, e.g. image/*, video/mp4 (blank = all)")
+        self.attachment_plan_only = QCheckBox("Estimate only (don't download)")
+        attachment_limits_layout.addWidget(self.attachment_max_size_input, 0, 0)
+        attachment_limits_layout.addWidget(self.attachment_max_total_input, 0, 1)
+        attachment_limits_layout.addWidget(self.attachment_types_input, 1, 0)
+        attachment_limits_layout.addWidget(self.attachment_plan_only, 1, 1)
+        options_layout.addWidget(self.attachment_limits_panel)
+        self.export_attachments.toggled.connect(self._update_attachment_controls)
+
         self.txt_format_section = QWidget()
         txt_format_section_layout = QVBoxLayout(self.txt_format_section)
         txt_format_section_layout.setContentsMargins(0, 4, 0, 0)
@@ -367,6 +449,14 @@ class MainWindow(QMainWindow):
         self.open_folder_toggle.toggled.connect(self._persist_open_folder_preference)
         output_layout.addWidget(self.open_folder_toggle)
 
+        self.merge_timeline_toggle = QCheckBox("Merge selected conversations into one timeline")
+        self.merge_timeline_toggle.setToolTip(
+            "Writes a single chronological timeline.txt / timeline.jsonl (TXT / JSON options) "
+            "under Timelines/, with each message labelled by its conversation."
+        )
+        output_layout.addWidget(self.merge_timeline_toggle)
+        self.merge_timeline_toggle.toggled.connect(self._update_attachment_controls)
+
         actions_row = QHBoxLayout()
         self.export_button = QPushButton("Export & Process")
         self.export_button.setObjectName("PrimaryButton")
@@ -409,6 +499,7 @@ class MainWindow(QMainWindow):
         self.preview.setMinimumHeight(180)
 
         date_group.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Maximum)
+        message_filter_group.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Maximum)
         options_group.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Maximum)
         output_group.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Maximum)
         execute_group.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Maximum)
@@ -419,6 +510,7 @@ class MainWindow(QMainWindow):
         top_row_layout.setColumnStretch(1, 1)
         top_row_layout.addWidget(date_group, 0, 0)
         top_row_layout.addWidget(options_group, 0, 1)
+        top_row_layout.addWidget(message_filter_group, 1, 0, 1, 2)
 
         export_layout.addLayout(top_row_layout)
         export_layout.addWidget(output_group)
@@ -428,6 +520,7 @@ class MainWindow(QMainWindow):
 
         self.update_filter_controls()
         self._update_txt_format_controls()
+        self._update_attachment_controls()
 
         self.log_tab = LogTab()
         self.tabs.addTab(export_tab, "Export")
@@ -702,6 +795,7 @@ class MainWindow(QMainWindow):
 
     def _reset_icon_bindings(self) -> None:
         self._icon_items.clear()
+        self._pending_icon_requests = []
 
     def _track_item_icon_key(self, key: str, item: QTreeWidgetItem) -> None:
         if not key:
@@ -715,11 +809,32 @@ class MainWindow(QMainWindow):
         if not key:
             return
         self._track_item_icon_key(key, item)
+        item.setData(0, ICON_REQUEST_ROLE, (key, url))
         cached = self._icon_cache.get_icon(key)
         if cached:
             item.setIcon(0, cached)
             return
-        self._icon_cache.request_icon(key, url)
+        # Queued so the whole tree is served by one batched disk lookup.
+        self._pending_icon_requests.append((key, url))
+
+    def _schedule_icon_viewport_update(self, *_args) -> None:
+        if not self._tree_syncing:
+            self._icon_viewport_timer.start()
+
+    def _visible_icon_requests(self) -> list[tuple[str, str | None]]:
+        # Walk on-screen rows top to bottom, plus one page below so scrolling finds icons ready.
+        limit = self.tree.viewport().height() * (1 + ICON_PREFETCH_PAGES)
+        requests: list[tuple[str, str | None]] = []
+        item = self.tree.itemAt(0, 0)
+        while item is not None and self.tree.visualItemRect(item).top() < limit:
+            request = item.data(0, ICON_REQUEST_ROLE)
+            if request:
+                requests.append((request[0], request[1]))
+            item = self.tree.itemBelow(item)
+        return requests
+
+    def _update_icon_viewport(self) -> None:
+        self._icon_cache.update_viewport(self._visible_icon_requests())
 
     def on_icon_ready(self, key: str, icon_obj: object) -> None:
         if not isinstance(icon_obj, QIcon):
@@ -753,7 +868,7 @@ class MainWindow(QMainWindow):
         if user_id and avatar_hash:
             return (
                 f"dm:{user_id}:{avatar_hash}",
-                build_dm_avatar_url(str(user_id), str(avatar_hash)),
+                build_dm_avatar_url(str(user_id), str(avatar_hash), size=self._icon_cache.request_size),
             )
 
         index = default_avatar_index(
@@ -762,7 +877,7 @@ class MainWindow(QMainWindow):
         )
         return (
             f"dm-default:{user_id or 'unknown'}:{index}",
-            build_default_avatar_url(index),
+            build_default_avatar_url(index, size=self._icon_cache.request_size),
         )
 
     def _resolve_guild_icon(self, guild: dict) -> tuple[str | None, str | None]:
@@ -771,7 +886,7 @@ class MainWindow(QMainWindow):
         if guild_id and icon_hash:
             return (
                 f"guild:{guild_id}:{icon_hash}",
-                build_guild_icon_url(str(guild_id), str(icon_hash)),
+                build_guild_icon_url(str(guild_id), str(icon_hash), size=self._icon_cache.request_size),
             )
         return None, None
 
@@ -996,6 +1111,10 @@ class MainWindow(QMainWindow):
 
         self.tree.setUpdatesEnabled(True)
         self._tree_syncing = False
+        # Cached icons load for every row; downloads wait until a row is on screen.
+        self._icon_cache.request_icons(self._pending_icon_requests, download=False)
+        self._pending_icon_requests = []
+        self._schedule_icon_viewport_update()
 
         self._selected_targets = []
         self._update_selection_ui()
@@ -1017,6 +1136,7 @@ class MainWindow(QMainWindow):
             root = self.tree.topLevelItem(i)
             self._filter_item(root, text)
         self._refresh_tree_counts()
+        self._schedule_icon_viewport_update()
 
     def _refresh_tree_counts(self) -> None:
         if self._dms_root_item:
@@ -1224,7 +1344,7 @@ class MainWindow(QMainWindow):
             self.set_status("Select at least one DM or channel")
             return
 
-        if not (self.export_json.isChecked() or self.export_txt.isChecked() or self.export_attachments.isChecked()):
+        if not (self.export_json.isChecked() or self.export_txt.isChecked() or self._attachments_requested()):
             self._logger.warning("Export blocked: no export format selected.")
             self.set_status("Select at least one export option")
             return
@@ -1263,6 +1383,21 @@ class MainWindow(QMainWindow):
         if self.after_check.isChecked():
             after_dt = build_dt(self.after_date.date().toPython(), self.after_time.time().toPython())
 
+        try:
+            search = self._build_message_filter()
+            message_filter = self._message_filter_expression()
+        except ValueError as exc:
+            self._logger.warning("Export blocked: invalid message filter. %s", exc)
+            self.set_status(f"Invalid message filter: {exc}")
+            return
+
+        try:
+            attachment_limits = self._attachment_limits()
+        except ValueError as exc:
+            self._logger.warning("Export blocked: invalid attachment limit. %s", exc)
+            self.set_status(f"Invalid attachment limit: {exc}")
+            return
+
         batch_targets: list[BatchExportTarget] = []
         for target in targets:
             options = ExportOptions(
@@ -1271,7 +1406,7 @@ class MainWindow(QMainWindow):
                 after_dt=after_dt,
                 export_json=self.export_json.isChecked(),
                 export_txt=self.export_txt.isChecked(),
-                export_attachments=self.export_attachments.isChecked(),
+                export_attachments=self._attachments_requested(),
                 include_edits=self.include_edits.isChecked(),
                 include_pins=self.include_pins.isChecked(),
                 include_replies=self.include_replies.isChecked(),
@@ -1284,6 +1419,10 @@ class MainWindow(QMainWindow):
                 category_name=target.get("category_name"),
                 channel_name=target.get("channel_name"),
                 export_label=self.base_filename_input.text().strip(),
+                search=search,
+                message_filter=message_filter,
+                attachment_limits=attachment_limits,
+                attachment_plan_only=self.attachment_plan_only.isChecked(),
             )
             label = (
                 target.get("dm_name")
@@ -1298,11 +1437,62 @@ class MainWindow(QMainWindow):
                 )
             )
 
-        if len(batch_targets) == 1:
+        if self.merge_timeline_toggle.isChecked() and len(batch_targets) > 1:
+            if not (self.export_json.isChecked() or self.export_txt.isChecked()):
+                self.set_status("Timeline export needs TXT and/or JSON output")
+                return
+            self._start_timeline_export(token, batch_targets, output_root)
+        elif len(batch_targets) == 1:
             self._start_single_export(token, batch_targets[0])
         else:
             self._start_batch_export(token, batch_targets)
 
+    def _build_message_filter(self) -> MessageSearchFilter | None:
+        has = [
+            name
+            for name, checkbox in (
+                ("attachment", self.filter_has_attachment),
+                ("link", self.filter_has_link),
+                ("embed", self.filter_has_embed),
+            )
+            if checkbox.isChecked()
+        ]
+        search = MessageSearchFilter.create(
+            author_ids=self.filter_authors_input.text(),
+            mention_ids=self.filter_mentions_input.text(),
+            has=has,
+            content=self.filter_contains_input.text(),
+        )
+        return None if search.is_empty() else search
+
+    def _update_attachment_controls(self) -> None:
+        # Merged timelines write text/JSONL only, so attachment options would be silently dropped.
+        merging = self.merge_timeline_toggle.isChecked()
+        self.export_attachments.setEnabled(not merging)
+        self.export_attachments.setToolTip(
+            "Attachments are not downloaded for merged timelines; export conversations separately to get them."
+            if merging
+            else ""
+        )
+        self.attachment_limits_panel.setVisible(self.export_attachments.isChecked() and not merging)
+
+    def _attachments_requested(self) -> bool:
+        return self.export_attachments.isChecked() and self.export_attachments.isEnabled()
+
+    def _attachment_limits(self) -> AttachmentLimits:
+        return build_attachment_limits(
+            max_file_size=self.attachment_max_size_input.text(),
+            max_total_size=self.attachment_max_total_input.text(),
+            allowed_types=self.attachment_types_input.text(),
+        )
+
+    def _message_filter_expression(self) -> str | None:
+        expression = self.filter_expression_input.text().strip()
+        if not expression:
+            return None
+        compile_message_filter(expression)
+        return expression
+
     def _start_single_export(self, token: str, target: BatchExportTarget) -> None:
         if self._export_worker and self._export_worker.isRunning():
             return
@@ -1320,7 +1510,7 @@ class MainWindow(QMainWindow):
             target.options.channel_id,
             self.export_json.isChecked(),
             self.export_txt.isChecked(),
-            self.export_attachments.isChecked(),
+            self._attachments_requested(),
         )
 
         self._export_worker = ExportWorker(token, target.options)
@@ -1329,6 +1519,49 @@ class MainWindow(QMainWindow):
         self._export_worker.error.connect(self.on_export_error)
         self._export_worker.finished.connect(self.on_export_finished)
         self._export_worker.start()
+
+    def _start_timeline_export(self, token: str, targets: list[BatchExportTarget], output_root: str) -> None:
+        if self._timeline_worker and self._timeline_worker.isRunning():
+            return
+        if (self._export_worker and self._export_worker.isRunning()) or (
+            self._batch_worker and self._batch_worker.isRunning()
+        ):
+            return
+
+        self._is_export_running = True
+        self._update_selection_ui()
+        self._set_progress_active_single()
+        self.cancel_button.setVisible(False)
+        self.preview.clear()
+        self.set_status(f"Merging {len(targets)} conversations into one timeline...")
+        self._logger.info("Timeline export started. Items=%s", len(targets))
+
+        self._timeline_worker = TimelineExportWorker(
+            token,
+            targets,
+            output_root=output_root,
+            label=self.base_filename_input.text().strip(),
+            write_txt=self.export_txt.isChecked(),
+            write_jsonl=self.export_json.isChecked(),
+        )
+        self._timeline_worker.status.connect(self.set_status)
+        self._timeline_worker.preview.connect(self.preview.setPlainText)
+        self._timeline_worker.error.connect(self.on_export_error)
+        self._timeline_worker.finished.connect(self.on_timeline_finished)
+        self._timeline_worker.start()
+
+    def on_timeline_finished(self, result) -> None:
+        self._is_export_running = False
+        self._set_progress_idle()
+        self.set_status(
+            f"Timeline complete | {result.message_count} messages from {len(result.channel_counts)} "
+            f"conversations | Folder: {result.export_dir}"
+        )
+        self._logger.info("Timeline export completed successfully.")
+        if self.open_folder_toggle.isChecked():
+            QDesktopServices.openUrl(QUrl.fromLocalFile(result.export_dir))
+        self._update_selection_ui()
+
     def _start_batch_export(self, token: str, targets: list[BatchExportTarget]) -> None:
         if self._batch_worker and self._batch_worker.isRunning():
             return
@@ -1439,6 +1672,9 @@ class MainWindow(QMainWindow):
             status_parts.append(f"TXT: {result.txt_path}")
         if result.attachments_dir:
             status_parts.append(f"Attachments: {result.attachments_saved}")
+        elif result.attachment_plan:
+            plan = result.attachment_plan
+            status_parts.append(f"Attachments planned: {plan['files']} files, {format_bytes(plan['bytes'])} (not downloaded)")
         status_parts.append(f"Folder: {result.export_dir}")
         self.set_status(" | ".join(status_parts))
         self._logger.info("Export completed successfully.")
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from app.core import tracing
+from app.core.discord_client import DiscordAPIError
+from app.core.models import ExportOptions, ExportResult
+from app.workers.export_pipeline import (
+    CancelCallback,
+    ExportCancelled,
+    PreviewCallback,
+    StatusCallback,
+    emit_preview,
+    emit_status,
+    execute_export,
+)
+
+
+ItemStartedCallback = Callable[[int, int, str], None]
+ProgressCallback = Callable[[int, int], None]
+
+
+@dataclass(frozen=True)
+class BatchExportTarget:
+    stable_id: str
+    label: str
+    options: ExportOptions
+
+
+@dataclass(frozen=True)
+class BatchExportItemResult:
+    stable_id: str
+    label: str
+    success: bool
+    error: Optional[str] = None
+    result: Optional[ExportResult] = None
+
+
+@dataclass(frozen=True)
+class BatchExportResult:
+    attempted: int
+    succeeded: int
+    failed: int
+    cancelled: bool
+    last_success: Optional[ExportResult]
+    items: list[BatchExportItemResult]
+
+
+def run_batch_export(
+    token: str,
+    targets: List[BatchExportTarget],
+    *,
+    status_callback: Optional[StatusCallback] = None,
+    preview_callback: Optional[PreviewCallback] = None,
+    item_started_callback: Optional[ItemStartedCallback] = None,
+    progress_callback: Optional[ProgressCallback] = None,
+    cancel_check: Optional[CancelCallback] = None,
+) -> BatchExportResult:
+    logger = logging.getLogger("discordsorter.batch")
+    total = len(targets)
+    attempted = 0
+    succeeded = 0
+    failed = 0
+    cancelled = False
+    last_success: Optional[ExportResult] = None
+    item_results: list[BatchExportItemResult] = []
+    owns_trace = tracing.tracing_enabled_by_env() and tracing.active_recorder() is None
+    if owns_trace:
+        tracing.start_trace()
+
+    try:
+        logger.info("Batch export started. Total items: %s", total)
+        emit_status(status_callback, f"Batch export started: {total} items")
+        if progress_callback:
+            progress_callback(0, total)
+
+        for idx, target in enumerate(targets, start=1):
+            if cancel_check and cancel_check():
+                cancelled = True
+                logger.warning(
+                    "Batch export cancelled before item %s/%s. Attempted=%s Succeeded=%s Failed=%s",
+                    idx,
+                    total,
+                    attempted,
+                    succeeded,
+                    failed,
+                )
+                break
+
+            if item_started_callback:
+                item_started_callback(idx, total, target.label)
+            logger.info("Batch item %s/%s started: %s", idx, total, target.label)
+
+            try:
+                with tracing.span("batch_item", "batch", index=idx, total=total, label=target.label):
+                    result = execute_export(
+                        token,
+                        target.options,
+                        status_callback=lambda msg, i=idx, t=total: emit_status(
+                            status_callback, f"[{i}/{t}] {msg}"
+                        ),
+                        preview_callback=lambda content: emit_preview(preview_callback, content),
+                    )
+                attempted += 1
+                succeeded += 1
+                last_success = result
+                item_results.append(
+                    BatchExportItemResult(
+                        stable_id=target.stable_id,
+                        label=target.label,
+                        success=True,
+                        result=result,
+                    )
+                )
+                logger.info("Batch item %s/%s completed: %s", idx, total, target.label)
+            except (DiscordAPIError, ExportCancelled) as exc:
+                attempted += 1
+                failed += 1
+                item_results.append(
+                    BatchExportItemResult(
+                        stable_id=target.stable_id,
+                        label=target.label,
+                        success=False,
+                        error=str(exc),
+                    )
+                )
+                logger.error("Batch item %s/%s failed: %s | %s", idx, total, target.label, exc)
+                emit_status(status_callback, f"[{idx}/{total}] Failed: {target.label} ({exc})")
+            except Exception as exc:  # pragma: no cover - defensive
+                attempted += 1
+                failed += 1
+                item_results.append(
+                    BatchExportItemResult(
+                        stable_id=target.stable_id,
+                        label=target.label,
+                        success=False,
+                        error=f"Unexpected error: {exc}",
+                    )
+                )
+                logger.exception(
+                    "Unexpected batch error on item %s/%s: %s", idx, total, target.label
+                )
+                emit_status(status_callback, f"[{idx}/{total}] Failed: {target.label} (Unexpected error)")
+
+            if progress_callback:
+                progress_callback(attempted, total)
+
+        if cancelled:
+            logger.warning(
+                "Batch export cancelled. Attempted=%s Succeeded=%s Failed=%s Total=%s",
+                attempted,
+                succeeded,
+                failed,
+                total,
+            )
+            emit_status(
+                status_callback,
+                f"Batch export cancelled. Attempted {attempted}/{total}, succeeded {succeeded}, failed {failed}",
+            )
+        else:
+            logger.info(
+                "Batch export completed. Attempted=%s Succeeded=%s Failed=%s Total=%s",
+                attempted,
+                succeeded,
+                failed,
+                total,
+            )
+            emit_status(
+                status_callback,
+                f"Batch export complete. Attempted {attempted}/{total}, succeeded {succeeded}, failed {failed}",
+            )
+
+        return BatchExportResult(
+            attempted=attempted,
+            succeeded=succeeded,
+            failed=failed,
+            cancelled=cancelled,
+            last_success=last_success,
+            items=item_results,
+        )
+    finally:
+        if owns_trace:
+            tracing.stop_trace(tracing.default_trace_path("batch"))
@@ -2,14 +2,27 @@ from __future__ import annotations
 
 import logging
 import os
+from contextlib import ExitStack
 from datetime import datetime
-from typing import Callable, Dict, Optional, Tuple
+from typing import Callable, Dict, Iterator, Optional, Tuple
 
-from app.core.discord_client import DiscordClient
+from app.core import tracing
+from app.core.attachment_plan import plan_attachments
+from app.core.discord_client import DiscordAPIError, DiscordClient
 from app.core.export_paths import build_export_paths
 from app.core.exporter import export_attachments, save_json, save_txt
-from app.core.formatter import format_message
+from app.core.formatter import format_message, reply_lookup_entry
+from app.core.logging_setup import HotPathSampler
+from app.core.message_filters import (
+    SEARCH_PAGE_SIZE,
+    MessageSearchFilter,
+    compile_message_filter,
+    search_hits,
+    snowflake_from_datetime,
+)
+from app.core.metrics import ExportMetrics, format_performance_summary
 from app.core.models import ExportOptions, ExportResult
+from app.core.profiling import ExportProfiler, profiling_enabled_by_env
 from app.core.utils import ensure_dir
 from app.core.utils import parse_discord_timestamp
 
@@ -18,26 +31,96 @@ StatusCallback = Callable[[str], None]
 PreviewCallback = Callable[[str], None]
 CancelCallback = Callable[[], bool]
 
+_progress_log = HotPathSampler("discordsorter.export")
+
 
 class ExportCancelled(RuntimeError):
     pass
 
 
-def _emit_status(callback: Optional[StatusCallback], message: str) -> None:
+def emit_status(callback: Optional[StatusCallback], message: str) -> None:
     if callback:
         callback(message)
 
 
-def _emit_preview(callback: Optional[PreviewCallback], content: str) -> None:
+def emit_preview(callback: Optional[PreviewCallback], content: str) -> None:
     if callback:
         callback(content)
 
 
-def _check_cancel(cancel_check: Optional[CancelCallback]) -> None:
+def check_cancel(cancel_check: Optional[CancelCallback]) -> None:
     if cancel_check and cancel_check():
         raise ExportCancelled("Export cancelled.")
 
 
+def _finish_profile(profiler: ExportProfiler, directory: Optional[str], logger: logging.Logger) -> None:
+    profiler.stop()
+    profiler.log_summary(logger)
+    if not directory:
+        return
+    try:
+        written = profiler.write_reports(directory)
+    except OSError:
+        logger.exception("Failed to write profiling reports to %s", directory)
+        return
+    logger.info("Profiling reports written: %s", ", ".join(os.path.basename(path) for path in written))
+
+
+def _channel_pages(client: DiscordClient, channel_id: str) -> Iterator[Tuple[list, bool]]:
+    before_id = None
+    while True:
+        batch = client.get_channel_messages(channel_id, before_id=before_id, limit=100)
+        if not batch:
+            return
+        yield batch, False
+        before_id = batch[-1].get("id")
+
+
+def _search_pages(
+    client: DiscordClient, options: ExportOptions, search: MessageSearchFilter
+) -> Iterator[Tuple[list, bool]]:
+    min_id = snowflake_from_datetime(options.after_dt) if options.after_dt else None
+    max_id = snowflake_from_datetime(options.before_dt) if options.before_dt else None
+    while True:
+        params = search.search_params(channel_id=options.channel_id, min_id=min_id, max_id=max_id)
+        batch = search_hits(client.search_guild_messages(options.guild_id, params))
+        if not batch:
+            return
+        yield batch, True
+        if len(batch) < SEARCH_PAGE_SIZE:
+            return
+        # Page by ID instead of offset; the endpoint caps offsets far below large channels.
+        max_id = batch[-1].get("id")
+
+
+def _message_pages(
+    client: DiscordClient,
+    options: ExportOptions,
+    search: Optional[MessageSearchFilter],
+    logger: logging.Logger,
+) -> Iterator[Tuple[list, bool]]:
+    # Yields (newest-first page, already matched by the server).
+    if search is None or options.target_kind == "dm" or not options.guild_id:
+        if search is not None:
+            logger.info("Applying message filters client-side for channel %s.", options.channel_id)
+        yield from _channel_pages(client, options.channel_id)
+        return
+    logger.info("Using guild search for channel %s: %s", options.channel_id, search.as_dict())
+    pages = _search_pages(client, options, search)
+    try:
+        first = next(pages, None)
+    except DiscordAPIError as exc:
+        if exc.status_code not in (403, 404):
+            raise
+        logger.warning("Guild search unavailable (%s); filtering client-side instead.", exc.status_code)
+        yield from _channel_pages(client, options.channel_id)
+        return
+    if first is None:
+        return
+    yield first
+    yield from pages
+
+
 def execute_export(
     token: str,
     options: ExportOptions,
@@ -50,78 +133,106 @@ def execute_export(
     client = None
     logger = logging.getLogger("discordsorter.export")
     export_started_at = export_started_at or datetime.now()
+    metrics = ExportMetrics()
+    owns_trace = tracing.tracing_enabled_by_env() and tracing.active_recorder() is None
+    if owns_trace:
+        tracing.start_trace()
+    trace_path: Optional[str] = None
+    spans = ExitStack()
+    profiler = ExportProfiler() if profiling_enabled_by_env() else None
+    profile_dir: Optional[str] = None
+    if profiler:
+        profiler.start()
     try:
+        spans.enter_context(
+            tracing.span("execute_export", "export", channel_id=options.channel_id, target=options.target_kind)
+        )
+        # Compiled once up front so a bad expression fails before any request is made.
+        predicate = compile_message_filter(options.message_filter) if options.message_filter else None
         client = DiscordClient(token)
-        _emit_status(status_callback, "Validating token...")
+        emit_status(status_callback, "Validating token...")
         logger.info("Validating token.")
-        client.validate_token()
-        _check_cancel(cancel_check)
+        with metrics.stage("validate"):
+            client.validate_token()
+        check_cancel(cancel_check)
 
-        _emit_status(status_callback, "Fetching messages...")
+        emit_status(status_callback, "Fetching messages...")
         logger.info("Fetching messages for channel %s", options.channel_id)
         messages: list = []
-        before_id = None
+        excluded = 0
         stop_due_to_after = False
+        search = options.search if options.search and not options.search.is_empty() else None
+        pages = _message_pages(client, options, search, logger)
 
         while True:
-            _check_cancel(cancel_check)
-            batch = client.get_channel_messages(options.channel_id, before_id=before_id, limit=100)
+            check_cancel(cancel_check)
+            with metrics.stage("fetch"):
+                batch, prefiltered = next(pages, ([], True))
             if not batch:
                 break
 
-            for message in batch:
-                ts = parse_discord_timestamp(message.get("timestamp"))
-                if options.before_dt and ts > options.before_dt:
-                    continue
-                if options.after_dt and ts < options.after_dt:
-                    stop_due_to_after = True
-                    continue
-                messages.append(message)
+            with metrics.stage("filter"):
+                for message in batch:
+                    ts = parse_discord_timestamp(message.get("timestamp"))
+                    if options.before_dt and ts > options.before_dt:
+                        continue
+                    if options.after_dt and ts < options.after_dt:
+                        stop_due_to_after = True
+                        continue
+                    if search and not prefiltered and not search.matches(message):
+                        excluded += 1
+                        continue
+                    if predicate and not predicate(message):
+                        excluded += 1
+                        continue
+                    messages.append(message)
 
-            before_id = batch[-1].get("id")
             if stop_due_to_after:
                 break
 
-        _emit_status(status_callback, "Formatting output...")
+        if search or predicate:
+            logger.info("Message filters excluded %s messages; kept %s.", excluded, len(messages))
+
+        emit_status(status_callback, "Formatting output...")
         logger.info("Formatting %s messages.", len(messages))
-        lookup: Dict[str, Tuple[str, str]] = {}
-        for message in messages:
-            author = message.get("author") or {}
-            if not author:
-                logger.warning("Message missing author field (id=%s).", message.get("id"))
-            username = author.get("username", "Unknown")
-            discriminator = author.get("discriminator")
-            label = f"{username}#{discriminator}" if discriminator is not None else username
-            content = message.get("content") or ""
-            if not content and message.get("attachments"):
-                content = "[Attachments]"
-            if not content:
-                content = "[No content]"
-            lookup[message.get("id")] = (label, content)
-
-        messages_sorted = sorted(
-            messages,
-            key=lambda m: parse_discord_timestamp(m.get("timestamp")),
-        )
+        with metrics.stage("format"):
+            # Reply lines are the only reader of the lookup, so skip building it when they are off.
+            lookup: Dict[str, Tuple[str, str]] = {}
+            labels: Dict[Tuple[str, Optional[str]], str] = {}
+            for message in messages:
+                author = message.get("author") or {}
+                if not author:
+                    logger.warning("Message missing author field (id=%s).", message.get("id"))
+                if not options.include_replies:
+                    continue
+                lookup[message.get("id")] = reply_lookup_entry(message, labels)
+
+        with metrics.stage("sort"):
+            # Sort in place: a second list would double the per-message references held.
+            messages.sort(key=lambda m: parse_discord_timestamp(m.get("timestamp")))
+            messages_sorted = messages
 
-        blocks = []
-        for idx, message in enumerate(messages_sorted, start=1):
-            _check_cancel(cancel_check)
-            blocks.append(
-                format_message(
-                    message,
-                    lookup,
-                    include_edits=options.include_edits,
-                    include_pins=options.include_pins,
-                    include_replies=options.include_replies,
+        with metrics.stage("format"):
+            blocks = []
+            for idx, message in enumerate(messages_sorted, start=1):
+                check_cancel(cancel_check)
+                blocks.append(
+                    format_message(
+                        message,
+                        lookup,
+                        include_edits=options.include_edits,
+                        include_pins=options.include_pins,
+                        include_replies=options.include_replies,
+                    )
                 )
-            )
-            if idx % 200 == 0:
-                _emit_preview(preview_callback, "\n\n".join(blocks))
-                logger.debug("Formatted %s messages...", idx)
+                if idx % 200 == 0:
+                    if preview_callback:
+                        emit_preview(preview_callback, "\n\n".join(blocks))
+                    _progress_log.debug("Formatted %s messages...", idx)
 
-        formatted_text = "\n\n".join(blocks)
-        _emit_preview(preview_callback, formatted_text)
+            formatted_text = "\n\n".join(blocks)
+            del blocks, lookup, labels
+        emit_preview(preview_callback, formatted_text)
 
         paths = build_export_paths(options, export_started_at=export_started_at)
         ensure_dir(paths.export_dir)
@@ -130,20 +241,35 @@ def execute_export(
         txt_path = None
         attachments_dir = None
         attachments_saved = 0
+        attachment_plan = None
 
         if options.export_json:
-            _check_cancel(cancel_check)
-            json_path = save_json(messages_sorted, paths.json_path)
+            check_cancel(cancel_check)
+            with metrics.stage("write_json"):
+                json_path = save_json(messages_sorted, paths.json_path)
+            metrics.add_bytes_written(os.path.getsize(json_path))
 
         if options.export_txt:
-            _check_cancel(cancel_check)
-            txt_path = save_txt(formatted_text, paths.txt_path)
+            check_cancel(cancel_check)
+            with metrics.stage("write_txt"):
+                txt_path = save_txt(formatted_text, paths.txt_path)
+            metrics.add_bytes_written(os.path.getsize(txt_path))
 
         if options.export_attachments:
-            _check_cancel(cancel_check)
-            attachments_dir = paths.attachments_dir
-            attachments_saved = export_attachments(messages_sorted, attachments_dir)
+            check_cancel(cancel_check)
+            # Sized from message metadata before any byte is fetched, so limits apply up front.
+            plan = plan_attachments(messages_sorted, options.attachment_limits)
+            attachment_plan = plan.as_dict()
+            emit_status(status_callback, f"Attachments: {plan.summary()}")
+            logger.info("Attachment plan for channel %s: %s", options.channel_id, plan.summary())
+            if options.attachment_plan_only:
+                logger.info("Attachment plan only; nothing downloaded.")
+            else:
+                attachments_dir = paths.attachments_dir
+                with metrics.stage("attachments"):
+                    attachments_saved = export_attachments(messages_sorted, attachments_dir, metrics=metrics, plan=plan)
 
+        performance = metrics.as_dict(message_count=len(messages_sorted), requests=client.stats)
         metadata = {
             "package": {
                 "export_dir_name": os.path.basename(paths.export_dir),
@@ -156,6 +282,8 @@ def execute_export(
                 "include_edits": options.include_edits,
                 "include_pins": options.include_pins,
                 "include_replies": options.include_replies,
+                "search": search.as_dict() if search else None,
+                "expression": options.message_filter or None,
             },
             "target": {
                 "kind": options.target_kind,
@@ -184,21 +312,26 @@ def execute_export(
             "artifacts": {
                 "txt": "messages.txt" if options.export_txt else None,
                 "json": "messages.json" if options.export_json else None,
-                "attachments": "attachments" if options.export_attachments else None,
+                "attachments": "attachments" if attachments_dir else None,
             },
             "message_count": len(messages_sorted),
             "attachment_count": sum(len(message.get("attachments") or []) for message in messages_sorted),
+            "attachment_plan": attachment_plan,
             "export_label": options.export_label or None,
+            "performance": performance,
         }
         metadata_path = save_json(metadata, paths.metadata_path)
+        trace_path = os.path.join(paths.export_dir, "trace.json")
+        profile_dir = paths.export_dir
 
-        _emit_status(status_callback, "Export complete.")
+        emit_status(status_callback, "Export complete.")
         logger.info(
-            "Export finished. Dir=%s JSON=%s TXT=%s Attachments=%s",
+            "Export finished. Dir=%s JSON=%s TXT=%s Attachments=%s Performance: %s",
             paths.export_dir,
             json_path or "none",
             txt_path or "none",
             attachments_dir or "none",
+            format_performance_summary(performance),
         )
         return ExportResult(
             formatted_text=formatted_text,
@@ -209,7 +342,14 @@ def execute_export(
             metadata_path=metadata_path,
             attachments_dir=attachments_dir,
             attachments_saved=attachments_saved,
+            performance=performance,
+            attachment_plan=attachment_plan,
         )
     finally:
+        spans.close()
         if client:
             client.close()
+        if owns_trace:
+            tracing.stop_trace(trace_path or tracing.default_trace_path(f"export_{options.channel_id}"))
+        if profiler:
+            _finish_profile(profiler, profile_dir, logger)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.discord_client import DiscordAPIError, DiscordClient
+from app.core.export_paths import build_export_paths
+from app.core.formatter import format_message, reply_lookup_entry
+from app.core.models import ExportOptions
+from app.core.utils import ensure_dir
+
+
+MIRROR_DIR_NAME = "Mirror"
+WATCHLIST_FILE_NAME = "watchlist.json"
+MIRROR_JSONL_NAME = "messages.jsonl"
+MIRROR_TXT_NAME = "messages.txt"
+
+DEFAULT_MIN_INTERVAL_SECONDS = 30.0
+DEFAULT_MAX_INTERVAL_SECONDS = 300.0
+INTERVAL_BACKOFF_FACTOR = 1.5
+PAGE_LIMIT = 100
+# Snowflake 0 predates every message, so paging forward from it mirrors full history.
+BACKFILL_HIGH_WATER_ID = "0"
+
+StatusCallback = Callable[[str], None]
+StopCallback = Callable[[], bool]
+
+
+@dataclass
+class WatchedChannel:
+    channel_id: str
+    target_kind: str = "dm"
+    dm_name: Optional[str] = None
+    guild_id: Optional[str] = None
+    guild_name: Optional[str] = None
+    category_id: Optional[str] = None
+    category_name: Optional[str] = None
+    channel_name: Optional[str] = None
+    high_water_id: Optional[str] = None
+    interval_seconds: float = DEFAULT_MIN_INTERVAL_SECONDS
+    next_poll_at: float = 0.0
+    last_poll_at: Optional[float] = None
+    last_error: Optional[str] = None
+    messages_mirrored: int = 0
+
+    @property
+    def label(self) -> str:
+        if self.target_kind == "dm":
+            return self.dm_name or f"DM {self.channel_id}"
+        return f"{self.guild_name or 'Server'} #{self.channel_name or self.channel_id}"
+
+    def export_options(self, mirror_root: str) -> ExportOptions:
+        return ExportOptions(
+            channel_id=self.channel_id,
+            before_dt=None,
+            after_dt=None,
+            export_json=True,
+            export_txt=True,
+            export_attachments=False,
+            include_edits=True,
+            include_pins=True,
+            include_replies=True,
+            output_root=mirror_root,
+            target_kind=self.target_kind,
+            dm_name=self.dm_name,
+            guild_id=self.guild_id,
+            guild_name=self.guild_name,
+            category_id=self.category_id,
+            category_name=self.category_name,
+            channel_name=self.channel_name,
+            export_label="",
+        )
+
+
+_WATCHED_FIELDS = {item.name for item in fields(WatchedChannel)}
+
+
+@dataclass
+class WatchList:
+    channels: Dict[str, WatchedChannel] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "WatchList":
+        if not os.path.isfile(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as handle:
+            payload = json.load(handle)
+        channels: Dict[str, WatchedChannel] = {}
+        for raw in payload.get("channels", []):
+            entry = WatchedChannel(**{key: value for key, value in raw.items() if key in _WATCHED_FIELDS})
+            channels[entry.channel_id] = entry
+        return cls(channels=channels)
+
+    def save(self, path: str) -> None:
+        ensure_dir(os.path.dirname(path) or ".")
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as handle:
+            json.dump({"channels": [asdict(entry) for entry in self.channels.values()]}, handle, indent=2)
+        os.replace(tmp, path)
+
+    def add(self, entry: WatchedChannel) -> None:
+        existing = self.channels.get(entry.channel_id)
+        if existing:
+            # Keep sync progress when a channel is re-added with new labels.
+            entry.high_water_id = existing.high_water_id
+            entry.messages_mirrored = existing.messages_mirrored
+        self.channels[entry.channel_id] = entry
+
+    def remove(self, channel_id: str) -> bool:
+        return self.channels.pop(channel_id, None) is not None
+
+
+def default_mirror_root(output_root: str) -> str:
+    return os.path.join(output_root, MIRROR_DIR_NAME)
+
+
+def _snowflake(message: dict) -> int:
+    try:
+        return int(message.get("id") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+class ChannelMirror:
+    def __init__(self, channel: WatchedChannel, mirror_root: str):
+        self._channel = channel
+        paths = build_export_paths(channel.export_options(mirror_root), export_started_at=datetime.now())
+        self.directory = paths.conversation_dir
+        self.jsonl_path = os.path.join(self.directory, MIRROR_JSONL_NAME)
+        self.txt_path = os.path.join(self.directory, MIRROR_TXT_NAME)
+
+    def append(self, messages: List[dict]) -> int:
+        if not messages:
+            return 0
+        ensure_dir(self.directory)
+        lookup = self._reply_lookup(messages)
+        blocks = [
+            format_message(message, lookup, include_edits=True, include_pins=True, include_replies=True)
+            for message in messages
+        ]
+        with open(self.jsonl_path, "a", encoding="utf-8") as handle:
+            for message in messages:
+                handle.write(json.dumps(message, ensure_ascii=False))
+                handle.write("\n")
+        has_text = os.path.isfile(self.txt_path) and os.path.getsize(self.txt_path) > 0
+        with open(self.txt_path, "a", encoding="utf-8") as handle:
+            if has_text:
+                handle.write("\n\n")
+            handle.write("\n\n".join(blocks))
+        return len(messages)
+
+    def _reply_lookup(self, messages: List[dict]) -> Dict[str, Tuple[str, str]]:
+        lookup: Dict[str, Tuple[str, str]] = {message.get("id"): reply_lookup_entry(message) for message in messages}
+        missing = set()
+        for message in messages:
+            parent_id = (message.get("message_reference") or {}).get("message_id")
+            if parent_id and not message.get("referenced_message") and parent_id not in lookup:
+                missing.add(parent_id)
+        if not missing or not os.path.isfile(self.jsonl_path):
+            return lookup
+        # Parents from earlier polls are read back from the mirror, and only when a reply needs one.
+        with open(self.jsonl_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    mirrored = json.loads(line)
+                except ValueError:
+                    continue
+                if mirrored.get("id") in missing:
+                    lookup[mirrored["id"]] = reply_lookup_entry(mirrored)
+                    missing.discard(mirrored["id"])
+                    if not missing:
+                        break
+        return lookup
+
+
+class SyncDaemon:
+    def __init__(
+        self,
+        client: DiscordClient,
+        watch_list: WatchList,
+        *,
+        state_path: str,
+        mirror_root: str,
+        min_interval: float = DEFAULT_MIN_INTERVAL_SECONDS,
+        max_interval: float = DEFAULT_MAX_INTERVAL_SECONDS,
+        backfill: bool = False,
+        status_callback: Optional[StatusCallback] = None,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self._client = client
+        self._watch_list = watch_list
+        self._state_path = state_path
+        self._mirror_root = mirror_root
+        self._min_interval = min_interval
+        self._max_interval = max(max_interval, min_interval)
+        self._backfill = backfill
+        self._status_callback = status_callback
+        self._clock = clock
+        self._sleep = sleep
+        self._logger = logging.getLogger("discordsorter.sync")
+
+    def _status(self, message: str) -> None:
+        self._logger.info(message)
+        if self._status_callback:
+            self._status_callback(message)
+
+    def _fetch_newer(self, channel: WatchedChannel) -> Iterable[List[dict]]:
+        after_id = channel.high_water_id
+        while True:
+            batch = self._client.get_channel_messages(channel.channel_id, limit=PAGE_LIMIT, after_id=after_id)
+            if not batch:
+                return
+            batch = sorted(batch, key=_snowflake)
+            yield batch
+            after_id = batch[-1].get("id")
+            if len(batch) < PAGE_LIMIT:
+                return
+
+    def _initialize_high_water(self, channel: WatchedChannel) -> None:
+        if self._backfill:
+            channel.high_water_id = BACKFILL_HIGH_WATER_ID
+            return
+        latest = self._client.get_channel_messages(channel.channel_id, limit=1)
+        channel.high_water_id = latest[0].get("id") if latest else BACKFILL_HIGH_WATER_ID
+        self._status(f"{channel.label}: mirroring new messages after {channel.high_water_id}")
+
+    def poll_channel(self, channel: WatchedChannel) -> int:
+        now = self._clock()
+        if channel.last_poll_at is None:
+            channel.interval_seconds = self._min_interval
+        channel.last_poll_at = now
+        mirrored = 0
+        try:
+            if channel.high_water_id is None:
+                self._initialize_high_water(channel)
+            mirror = ChannelMirror(channel, self._mirror_root)
+            for batch in self._fetch_newer(channel):
+                mirrored += mirror.append(batch)
+                # Advance per page so a failure mid-run never re-appends mirrored pages.
+                channel.high_water_id = batch[-1].get("id")
+                channel.messages_mirrored += len(batch)
+                self._watch_list.save(self._state_path)
+            channel.last_error = None
+        except (DiscordAPIError, OSError) as exc:
+            channel.last_error = str(exc)
+            self._logger.error("Sync failed for %s: %s", channel.label, exc)
+
+        if mirrored:
+            channel.interval_seconds = max(self._min_interval, channel.interval_seconds / 2)
+            self._status(f"{channel.label}: mirrored {mirrored} new messages")
+        else:
+            channel.interval_seconds = min(self._max_interval, channel.interval_seconds * INTERVAL_BACKOFF_FACTOR)
+        channel.next_poll_at = now + channel.interval_seconds
+        self._watch_list.save(self._state_path)
+        return mirrored
+
+    def run_once(self) -> int:
+        total = 0
+        for channel in list(self._watch_list.channels.values()):
+            total += self.poll_channel(channel)
+        return total
+
+    def run_forever(self, stop_check: Optional[StopCallback] = None, *, tick_seconds: float = 1.0) -> None:
+        self._status(f"Sync daemon started for {len(self._watch_list.channels)} channels")
+        while not (stop_check and stop_check()):
+            if not self._watch_list.channels:
+                self._status("Watch list is empty; nothing to sync")
+                return
+            channel = min(self._watch_list.channels.values(), key=lambda entry: entry.next_poll_at)
+            delay = channel.next_poll_at - self._clock()
+            if delay > 0:
+                self._sleep(min(delay, tick_seconds))
+                continue
+            self.poll_channel(channel)
+        self._status("Sync daemon stopped")
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import logging
+from typing import List
+
+from PySide6.QtCore import QThread, Signal
+
+from app.core.discord_client import DiscordAPIError
+from app.workers.batch_pipeline import BatchExportTarget
+from app.workers.export_pipeline import ExportCancelled
+from app.workers.timeline_pipeline import run_timeline_export
+
+
+class TimelineExportWorker(QThread):
+    status = Signal(str)
+    error = Signal(str)
+    preview = Signal(str)
+    finished = Signal(object)
+
+    def __init__(
+        self,
+        token: str,
+        targets: List[BatchExportTarget],
+        *,
+        output_root: str,
+        label: str,
+        write_txt: bool,
+        write_jsonl: bool,
+    ):
+        super().__init__()
+        self._token = token
+        self._targets = targets
+        self._output_root = output_root
+        self._label = label
+        self._write_txt = write_txt
+        self._write_jsonl = write_jsonl
+
+    def run(self) -> None:
+        logger = logging.getLogger("discordsorter.export")
+        try:
+            result = run_timeline_export(
+                self._token,
+                self._targets,
+                output_root=self._output_root,
+                label=self._label,
+                write_txt=self._write_txt,
+                write_jsonl=self._write_jsonl,
+                status_callback=self.status.emit,
+                preview_callback=self.preview.emit,
+            )
+            self.finished.emit(result)
+        except (DiscordAPIError, ExportCancelled, ValueError) as exc:
+            self.error.emit(str(exc))
+            logger.error("Timeline export failed: %s", exc)
+        except Exception as exc:  # pragma: no cover - defensive
+            self.error.emit(f"Unexpected error: {exc}")
+            logger.exception("Unexpected timeline export error.")
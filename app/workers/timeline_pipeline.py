@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import os
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core import tracing
+from app.core.discord_client import DiscordAPIError, DiscordClient
+from app.core.export_paths import build_timeline_paths
+from app.core.exporter import save_json
+from app.core.formatter import format_message, reply_lookup_entry
+from app.core.message_filters import (
+    SEARCH_PAGE_SIZE,
+    MessagePredicate,
+    MessageSearchFilter,
+    compile_message_filter,
+    search_hits,
+    snowflake_from_datetime,
+)
+from app.core.metrics import ExportMetrics, format_performance_summary
+from app.core.models import ExportOptions
+from app.core.utils import ensure_dir, parse_discord_timestamp
+from app.workers.batch_pipeline import BatchExportTarget
+from app.workers.export_pipeline import (
+    CancelCallback,
+    PreviewCallback,
+    StatusCallback,
+    check_cancel,
+    emit_preview,
+    emit_status,
+)
+
+
+PAGE_LIMIT = 100
+# Replies usually point at recent messages; older targets fall back to referenced_message.
+REPLY_LOOKUP_SIZE = 5000
+PREVIEW_BLOCKS = 50
+PROGRESS_EVERY = 500
+
+# (snowflake, stream index, message); the index breaks ties between channels deterministically.
+_HeapItem = Tuple[int, int, dict]
+
+
+@dataclass(frozen=True)
+class TimelineExportResult:
+    export_dir: str
+    txt_path: Optional[str]
+    jsonl_path: Optional[str]
+    metadata_path: str
+    message_count: int
+    channel_counts: Dict[str, int]
+    performance: Optional[dict] = None
+
+
+def _snowflake(message: dict) -> int:
+    try:
+        return int(message.get("id") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _channel_pages(client: DiscordClient, options: ExportOptions) -> Iterator[Tuple[list, bool]]:
+    # Pages forward with after= so each channel yields oldest first while holding one page at most.
+    after_id = snowflake_from_datetime(options.after_dt) if options.after_dt else "0"
+    while True:
+        batch = client.get_channel_messages(options.channel_id, limit=PAGE_LIMIT, after_id=after_id)
+        if not batch:
+            return
+        batch.sort(key=_snowflake)
+        yield batch, False
+        if len(batch) < PAGE_LIMIT:
+            return
+        after_id = batch[-1].get("id")
+
+
+def _search_pages(
+    client: DiscordClient, options: ExportOptions, search: MessageSearchFilter
+) -> Iterator[Tuple[list, bool]]:
+    # Same guild search as single exports, but ascending so the channel still streams oldest first.
+    min_id = snowflake_from_datetime(options.after_dt) if options.after_dt else None
+    max_id = snowflake_from_datetime(options.before_dt) if options.before_dt else None
+    while True:
+        params = search.search_params(channel_id=options.channel_id, min_id=min_id, max_id=max_id, sort_order="asc")
+        batch = search_hits(client.search_guild_messages(options.guild_id, params))
+        if not batch:
+            return
+        batch.sort(key=_snowflake)
+        yield batch, True
+        if len(batch) < SEARCH_PAGE_SIZE:
+            return
+        min_id = batch[-1].get("id")
+
+
+def _message_pages(
+    client: DiscordClient, options: ExportOptions, search: Optional[MessageSearchFilter], logger: logging.Logger
+) -> Iterator[Tuple[list, bool]]:
+    # Yields (oldest-first page, already matched by the server), mirroring export_pipeline's page source.
+    if search is None or options.target_kind == "dm" or not options.guild_id:
+        yield from _channel_pages(client, options)
+        return
+    pages = _search_pages(client, options, search)
+    try:
+        first = next(pages, None)
+    except DiscordAPIError as exc:
+        if exc.status_code not in (403, 404):
+            raise
+        logger.warning("Guild search unavailable (%s); filtering client-side instead.", exc.status_code)
+        yield from _channel_pages(client, options)
+        return
+    if first is None:
+        return
+    yield first
+    yield from pages
+
+
+def _channel_stream(
+    client: DiscordClient,
+    index: int,
+    target: BatchExportTarget,
+    predicate: Optional[MessagePredicate],
+    metrics: ExportMetrics,
+    cancel_check: Optional[CancelCallback],
+    logger: logging.Logger,
+) -> Iterator[_HeapItem]:
+    options = target.options
+    search = options.search if options.search and not options.search.is_empty() else None
+    pages = _message_pages(client, options, search, logger)
+    while True:
+        check_cancel(cancel_check)
+        with metrics.stage("fetch"):
+            batch, prefiltered = next(pages, ([], True))
+        if not batch:
+            return
+        for message in batch:
+            ts = parse_discord_timestamp(message.get("timestamp"))
+            if options.after_dt and ts < options.after_dt:
+                continue
+            if options.before_dt and ts > options.before_dt:
+                return
+            if search and not prefiltered and not search.matches(message):
+                continue
+            if predicate and not predicate(message):
+                continue
+            yield _snowflake(message), index, message
+
+
+def run_timeline_export(
+    token: str,
+    targets: List[BatchExportTarget],
+    *,
+    output_root: str,
+    label: str = "",
+    write_txt: bool = True,
+    write_jsonl: bool = True,
+    export_started_at: Optional[datetime] = None,
+    status_callback: Optional[StatusCallback] = None,
+    preview_callback: Optional[PreviewCallback] = None,
+    cancel_check: Optional[CancelCallback] = None,
+) -> TimelineExportResult:
+    if not targets:
+        raise ValueError("A timeline needs at least one channel")
+    if not (write_txt or write_jsonl):
+        raise ValueError("Select TXT and/or JSONL output for the timeline")
+    logger = logging.getLogger("discordsorter.export")
+    export_started_at = export_started_at or datetime.now()
+    metrics = ExportMetrics()
+    predicates = {
+        target.options.message_filter: compile_message_filter(target.options.message_filter)
+        for target in targets
+        if target.options.message_filter
+    }
+    client = DiscordClient(token)
+    txt_handle = None
+    jsonl_handle = None
+    try:
+        with tracing.span("timeline_export", "export", channels=len(targets)):
+            emit_status(status_callback, "Validating token...")
+            with metrics.stage("validate"):
+                client.validate_token()
+            check_cancel(cancel_check)
+
+            paths = build_timeline_paths(output_root, export_started_at=export_started_at, label=label)
+            ensure_dir(paths.export_dir)
+            if write_txt:
+                txt_handle = open(paths.txt_path, "w", encoding="utf-8")
+            if write_jsonl:
+                jsonl_handle = open(paths.jsonl_path, "w", encoding="utf-8")
+
+            streams = [
+                _channel_stream(
+                    client,
+                    index,
+                    target,
+                    predicates.get(target.options.message_filter) if target.options.message_filter else None,
+                    metrics,
+                    cancel_check,
+                    logger,
+                )
+                for index, target in enumerate(targets)
+            ]
+            counts = [0] * len(targets)
+            lookup: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+            labels: Dict[Tuple[str, Optional[str]], str] = {}
+            recent: deque = deque(maxlen=PREVIEW_BLOCKS)
+            written = 0
+            logger.info("Merging %s channels into one timeline.", len(targets))
+            emit_status(status_callback, f"Merging {len(targets)} channels...")
+
+            for _, index, message in heapq.merge(*streams):
+                target = targets[index]
+                # Each channel keeps its own formatting options; only the output files are shared.
+                options = target.options
+                counts[index] += 1
+                written += 1
+                if options.include_replies:
+                    lookup[message.get("id")] = reply_lookup_entry(message, labels)
+                    if len(lookup) > REPLY_LOOKUP_SIZE:
+                        lookup.popitem(last=False)
+                if txt_handle:
+                    block = format_message(
+                        message,
+                        lookup,
+                        include_edits=options.include_edits,
+                        include_pins=options.include_pins,
+                        include_replies=options.include_replies,
+                    )
+                    block = f"[{target.label}] {block}"
+                    if written > 1:
+                        txt_handle.write("\n\n")
+                    txt_handle.write(block)
+                    recent.append(block)
+                if jsonl_handle:
+                    record = {
+                        "channel": {"id": target.options.channel_id, "label": target.label},
+                        "message": message,
+                    }
+                    jsonl_handle.write(json.dumps(record, ensure_ascii=False))
+                    jsonl_handle.write("\n")
+                if written % PROGRESS_EVERY == 0:
+                    emit_status(status_callback, f"Merged {written} messages...")
+                    if preview_callback and recent:
+                        emit_preview(preview_callback, "\n\n".join(recent))
+
+            for handle in (txt_handle, jsonl_handle):
+                if handle:
+                    handle.close()
+            txt_handle = jsonl_handle = None
+            if preview_callback and recent:
+                emit_preview(preview_callback, "\n\n".join(recent))
+
+            for path in (paths.txt_path if write_txt else None, paths.jsonl_path if write_jsonl else None):
+                if path:
+                    metrics.add_bytes_written(os.path.getsize(path))
+            channel_counts = {target.label: counts[index] for index, target in enumerate(targets)}
+            performance = metrics.as_dict(message_count=written, requests=client.stats)
+            metadata = {
+                "export_started_at": export_started_at.isoformat(),
+                "kind": "timeline",
+                "label": label or None,
+                "channels": [
+                    {
+                        "label": target.label,
+                        "channel_id": target.options.channel_id,
+                        "kind": target.options.target_kind,
+                        "guild_id": target.options.guild_id,
+                        "message_count": counts[index],
+                        "after": target.options.after_dt.isoformat() if target.options.after_dt else None,
+                        "before": target.options.before_dt.isoformat() if target.options.before_dt else None,
+                        "expression": target.options.message_filter or None,
+                    }
+                    for index, target in enumerate(targets)
+                ],
+                "artifacts": {
+                    "txt": os.path.basename(paths.txt_path) if write_txt else None,
+                    "jsonl": os.path.basename(paths.jsonl_path) if write_jsonl else None,
+                },
+                "message_count": written,
+                "performance": performance,
+            }
+            metadata_path = save_json(metadata, paths.metadata_path)
+
+        emit_status(status_callback, f"Timeline export complete: {written} messages.")
+        logger.info(
+            "Timeline export finished. Dir=%s Messages=%s Performance: %s",
+            paths.export_dir,
+            written,
+            format_performance_summary(performance),
+        )
+        return TimelineExportResult(
+            export_dir=paths.export_dir,
+            txt_path=paths.txt_path if write_txt else None,
+            jsonl_path=paths.jsonl_path if write_jsonl else None,
+            metadata_path=metadata_path,
+            message_count=written,
+            channel_counts=channel_counts,
+            performance=performance,
+        )
+    finally:
+        for handle in (txt_handle, jsonl_handle):
+            if handle:
+                handle.close()
+        client.close()
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from app.core.metrics import RequestStats
+from app.core.models import ExportOptions
+
+DISCORD_EPOCH_MS = 1420070400000
+CORPUS_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DEFAULT_SEED = 1420070400
+
+_WORDS = (
+    "the a to and of is in it you that for on this was with be are have not lol ok yeah "
+    "export archive discord message channel server thanks please tomorrow meeting link "
+    "build release fix bug test merge deploy review idea maybe sure nice great"
+).split()
+_FILE_TYPES = (
+    ("png", "image/png", 250_000),
+    ("jpg", "image/jpeg", 400_000),
+    ("gif", "image/gif", 900_000),
+    ("pdf", "application/pdf", 1_200_000),
+    ("zip", "application/zip", 5_000_000),
+    ("txt", "text/plain", 8_000),
+)
+
+
+@dataclass(frozen=True)
+class CorpusProfile:
+    authors: int = 40
+    mean_words: float = 12.0
+    max_words: int = 400
+    empty_ratio: float = 0.03
+    reply_ratio: float = 0.12
+    attachment_ratio: float = 0.06
+    edit_ratio: float = 0.08
+    pin_ratio: float = 0.004
+    nick_ratio: float = 0.3
+    mean_gap_seconds: float = 90.0
+
+
+def snowflake_for(moment: datetime, sequence: int = 0) -> str:
+    millis = int(moment.timestamp() * 1000) - DISCORD_EPOCH_MS
+    return str((millis << 22) | (sequence & 0x3FFFFF))
+
+
+def _content(rng: random.Random, profile: CorpusProfile) -> str:
+    # Chat lengths are heavy-tailed: mostly short lines, occasionally long pastes.
+    words = min(profile.max_words, max(1, int(rng.expovariate(1.0 / profile.mean_words))))
+    return " ".join(rng.choice(_WORDS) for _ in range(words))
+
+
+def generate_messages(
+    count: int,
+    *,
+    seed: int = DEFAULT_SEED,
+    channel_id: str = "900000000000000001",
+    profile: Optional[CorpusProfile] = None,
+) -> List[dict]:
+    profile = profile or CorpusProfile()
+    rng = random.Random(seed)
+    authors = [
+        {
+            "id": str(100_000_000_000_000_000 + index),
+            "username": f"member{index}",
+            "discriminator": "0" if index % 3 else f"{1000 + index:04d}",
+            "avatar": None,
+        }
+        for index in range(profile.authors)
+    ]
+    nicks = {author["id"]: f"Nick {author['username']}" for author in authors if rng.random() < profile.nick_ratio}
+
+    messages: List[dict] = []
+    moment = CORPUS_START
+    for index in range(count):
+        moment = moment + timedelta(seconds=rng.expovariate(1.0 / profile.mean_gap_seconds))
+        author = authors[min(int(rng.paretovariate(1.2)) - 1, profile.authors - 1)]
+        message_id = snowflake_for(moment, index)
+        message = {
+            "id": message_id,
+            "channel_id": channel_id,
+            "type": 0,
+            "content": "" if rng.random() < profile.empty_ratio else _content(rng, profile),
+            "author": author,
+            "timestamp": moment.isoformat(),
+            "edited_timestamp": None,
+            "pinned": rng.random() < profile.pin_ratio,
+            "mentions": [],
+            "embeds": [],
+            "attachments": [],
+        }
+        nick = nicks.get(author["id"])
+        if nick:
+            message["member"] = {"nick": nick}
+        if rng.random() < profile.edit_ratio:
+            message["edited_timestamp"] = (moment + timedelta(seconds=rng.randint(5, 3600))).isoformat()
+        if rng.random() < profile.attachment_ratio:
+            extension, content_type, typical_size = rng.choice(_FILE_TYPES)
+            filename = f"upload_{index}.{extension}"
+            message["attachments"].append(
+                {
+                    "id": str(int(message_id) + 1),
+                    "filename": filename,
+                    "size": int(rng.expovariate(1.0 / typical_size)) + 1,
+                    "content_type": content_type,
+                    "url": f"https://cdn.discordapp.com/attachments/{channel_id}/{message_id}/{filename}",
+                }
+            )
+        if messages and rng.random() < profile.reply_ratio:
+            # Most replies target recent messages; some point outside the export window.
+            target = messages[max(0, len(messages) - 1 - int(rng.expovariate(1.0 / 5)))]
+            if rng.random() < 0.05:
+                message["message_reference"] = {"message_id": str(int(target["id"]) - 1)}
+            else:
+                message["message_reference"] = {"message_id": target["id"]}
+        messages.append(message)
+    return messages
+
+
+def generate_conversations(channel_count: int, *, seed: int = DEFAULT_SEED, dm_ratio: float = 0.2) -> dict:
+    rng = random.Random(seed)
+    dm_count = int(channel_count * dm_ratio)
+    dms = [
+        {
+            "id": str(800_000_000_000_000_000 + index),
+            "type": 1,
+            "recipients": [
+                {"id": str(700_000_000_000_000_000 + index), "username": f"friend{index}", "discriminator": "0"}
+            ],
+        }
+        for index in range(dm_count)
+    ]
+    guilds: List[dict] = []
+    remaining = channel_count - dm_count
+    guild_index = 0
+    while remaining > 0:
+        channel_total = min(remaining, rng.randint(5, 120))
+        remaining -= channel_total
+        guild_id = str(600_000_000_000_000_000 + guild_index)
+        category_total = max(1, channel_total // 8)
+        channels: List[dict] = [
+            {"id": f"{guild_id}{c:04d}", "type": 4, "name": f"category {c}", "position": c}
+            for c in range(category_total)
+        ]
+        for c in range(channel_total):
+            channels.append(
+                {
+                    "id": f"{guild_id}{category_total + c:04d}",
+                    "type": 0 if rng.random() < 0.9 else 5,
+                    "name": f"channel-{c}",
+                    "position": c,
+                    "parent_id": f"{guild_id}{rng.randrange(category_total):04d}" if rng.random() < 0.85 else None,
+                }
+            )
+        guilds.append({"id": guild_id, "name": f"Server {guild_index}", "channels": channels})
+        guild_index += 1
+    return {"me": {"id": "1", "username": "bench"}, "dms": dms, "guilds": guilds}
+
+
+def corpus_export_options(output_root: str, *, label: str = "") -> ExportOptions:
+    return ExportOptions(
+        channel_id="900000000000000001",
+        before_dt=None,
+        after_dt=None,
+        export_json=True,
+        export_txt=True,
+        export_attachments=False,
+        include_edits=True,
+        include_pins=True,
+        include_replies=True,
+        output_root=output_root,
+        target_kind="guild",
+        dm_name=None,
+        guild_id="600000000000000000",
+        guild_name="Benchmark Server",
+        category_id="600000000000000001",
+        category_name="Load",
+        channel_name="general",
+        export_label=label,
+    )
+
+
+class CorpusClient:
+    # DiscordClient stand-in that pages a generated corpus newest first.
+    def __init__(self, messages: List[dict]):
+        self._messages = messages
+        self._positions: Dict[str, int] = {message["id"]: index for index, message in enumerate(messages)}
+        self.stats = RequestStats()
+
+    def validate_token(self) -> None:
+        self.stats.api_calls += 1
+
+    def get_channel_messages(self, channel_id: str, before_id=None, limit: int = 100, *, after_id=None) -> List[dict]:
+        self.stats.api_calls += 1
+        if after_id is not None:
+            start = self._positions[after_id] + 1 if after_id in self._positions else 0
+            page = self._messages[start:start + limit]
+        else:
+            end = self._positions.get(before_id, len(self._messages)) if before_id else len(self._messages)
+            page = self._messages[max(0, end - limit):end]
+        return page[::-1]
+
+    def close(self) -> None:
+        return None
@@ -0,0 +1,362 @@
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+from unittest.mock import patch
+
+import requests
+
+from app.core.export_paths import build_export_paths
+from app.core.exporter import save_json, save_txt
+from app.core.formatter import format_message
+from app.core.message_filters import compile_message_filter
+from app.workers.export_pipeline import execute_export
+from benchmarks.corpus import DEFAULT_SEED, CorpusClient, corpus_export_options, generate_conversations, generate_messages
+from benchmarks.stub_cdn import StubCdn
+
+SIZE_ALIASES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SIZES = ("10k", "100k", "1m")
+BENCHMARKS = (
+    "format_message",
+    "message_filter",
+    "execute_export",
+    "save_json",
+    "save_txt",
+    "build_export_paths",
+    "tree_population",
+    "icon_fetch",
+)
+BENCH_FILTER_EXPRESSION = "(author:100000000000000000,100000000000000001 or /deploy|release/i) -is:edited has:attachment"
+# The conversation tree holds channels, not messages; scale it to one channel per this many messages.
+MESSAGES_PER_TREE_CHANNEL = 100
+EXPORT_PATH_CALLS_PER_MESSAGE = 0.01
+# Avatars fetched per run: one per 20 messages, capped at a large account's worth.
+MESSAGES_PER_ICON = 20
+ICON_FETCH_MAX = 500
+ICON_FETCH_WORKERS = 4
+REGRESSION_THRESHOLD = 0.10
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    size: int
+    seconds: float
+    units: int
+    repeat: int = 1
+    skipped: Optional[str] = None
+    extra: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.size}"
+
+    def as_dict(self) -> dict:
+        payload = asdict(self)
+        payload["per_unit_us"] = round(self.seconds / self.units * 1_000_000, 3) if self.units else None
+        return payload
+
+
+def parse_sizes(spec: str) -> List[int]:
+    sizes = []
+    for raw in spec.split(","):
+        token = raw.strip().lower()
+        if not token:
+            continue
+        sizes.append(SIZE_ALIASES.get(token) or int(token.replace("_", "")))
+    return sizes
+
+
+def _best_of(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def _lookup(messages: Sequence[dict]) -> dict:
+    lookup = {}
+    for message in messages:
+        author = message.get("author") or {}
+        lookup[message["id"]] = (author.get("username", "Unknown"), message.get("content") or "[No content]")
+    return lookup
+
+
+def bench_format_message(messages: List[dict], *, repeat: int) -> BenchmarkResult:
+    lookup = _lookup(messages)
+
+    def run() -> None:
+        for message in messages:
+            format_message(message, lookup, include_edits=True, include_pins=True, include_replies=True)
+
+    return BenchmarkResult("format_message", len(messages), _best_of(run, repeat), len(messages), repeat)
+
+
+def bench_message_filter(messages: List[dict], *, repeat: int) -> BenchmarkResult:
+    predicate = compile_message_filter(BENCH_FILTER_EXPRESSION)
+    matched = sum(1 for message in messages if predicate(message))
+
+    def run() -> None:
+        for message in messages:
+            predicate(message)
+
+    return BenchmarkResult(
+        "message_filter", len(messages), _best_of(run, repeat), len(messages), repeat, extra={"matched": matched}
+    )
+
+
+def bench_execute_export(messages: List[dict], work_dir: str) -> BenchmarkResult:
+    client = CorpusClient(messages)
+    options = corpus_export_options(work_dir)
+    started = time.perf_counter()
+    with patch("app.workers.export_pipeline.DiscordClient", lambda token: client):
+        result = execute_export("benchmark-token", options, export_started_at=datetime(2026, 1, 1, 12, 0, 0))
+    seconds = time.perf_counter() - started
+    with open(result.metadata_path, "r", encoding="utf-8") as handle:
+        performance = json.load(handle).get("performance") or {}
+    return BenchmarkResult(
+        "execute_export",
+        len(messages),
+        seconds,
+        len(messages),
+        extra={"stages_seconds": performance.get("stages_seconds", {}), "bytes_written": performance.get("bytes_written")},
+    )
+
+
+def bench_save_json(messages: List[dict], work_dir: str, *, repeat: int) -> BenchmarkResult:
+    path = os.path.join(work_dir, "bench", "messages.json")
+    seconds = _best_of(lambda: save_json(messages, path), repeat)
+    return BenchmarkResult(
+        "save_json", len(messages), seconds, len(messages), repeat, extra={"bytes": os.path.getsize(path)}
+    )
+
+
+def bench_save_txt(messages: List[dict], work_dir: str, *, repeat: int) -> BenchmarkResult:
+    lookup = _lookup(messages)
+    text = "\n\n".join(
+        format_message(message, lookup, include_edits=True, include_pins=True, include_replies=True)
+        for message in messages
+    )
+    path = os.path.join(work_dir, "bench", "messages.txt")
+    seconds = _best_of(lambda: save_txt(text, path), repeat)
+    return BenchmarkResult(
+        "save_txt", len(messages), seconds, len(messages), repeat, extra={"bytes": os.path.getsize(path)}
+    )
+
+
+def bench_build_export_paths(size: int, work_dir: str, *, repeat: int) -> BenchmarkResult:
+    calls = max(1, int(size * EXPORT_PATH_CALLS_PER_MESSAGE))
+    options = [corpus_export_options(work_dir, label=f"Run {index} / part {index % 7}") for index in range(calls)]
+    started_at = datetime(2026, 1, 1, 12, 0, 0)
+
+    def run() -> None:
+        for item in options:
+            build_export_paths(item, export_started_at=started_at)
+
+    return BenchmarkResult("build_export_paths", size, _best_of(run, repeat), calls, repeat)
+
+
+def bench_tree_population(size: int, work_dir: str, *, seed: int, repeat: int) -> BenchmarkResult:
+    channels = max(1, size // MESSAGES_PER_TREE_CHANNEL)
+    try:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PySide6.QtWidgets import QApplication
+
+        from app.core.icon_cache import IconCache
+        from app.ui.main_window import MainWindow
+    except ImportError as exc:
+        return BenchmarkResult("tree_population", size, 0.0, channels, skipped=f"PySide6 unavailable: {exc}")
+
+    app = QApplication.instance() or QApplication([])
+    payload = generate_conversations(channels, seed=seed)
+    icon_cache = IconCache(cache_dir=os.path.join(work_dir, "icons"))
+    window = MainWindow(default_export_root=work_dir, logs_dir=work_dir, icon_cache=icon_cache)
+    # Measure tree construction only; icon downloads would hit the network.
+    icon_cache.request_icons = lambda requests_, download=True: None
+    icon_cache.update_viewport = lambda requests_: None
+    try:
+        seconds = _best_of(lambda: window.on_conversations_loaded(payload), repeat)
+        items = window.tree.topLevelItemCount()
+    finally:
+        window.close()
+        window.deleteLater()
+        app.processEvents()
+        icon_cache.close()
+    return BenchmarkResult(
+        "tree_population",
+        size,
+        seconds,
+        channels,
+        repeat,
+        extra={"channels": channels, "guilds": len(payload["guilds"]), "top_level_items": items},
+    )
+
+
+def bench_icon_fetch(size: int, *, seed: int) -> BenchmarkResult:
+    icons = max(1, min(ICON_FETCH_MAX, size // MESSAGES_PER_ICON))
+    try:
+        from app.core.icon_cache import DOWNLOAD_TIMEOUT_SECONDS, IconHttpSessions
+    except ImportError as exc:
+        return BenchmarkResult("icon_fetch", size, 0.0, icons, skipped=f"PySide6 unavailable: {exc}")
+
+    def fetch_all(get: Callable[[str], requests.Response], urls: List[str]) -> float:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=ICON_FETCH_WORKERS) as executor:
+            for response in executor.map(get, urls):
+                response.content
+        return time.perf_counter() - started
+
+    with StubCdn(seed=seed) as cdn:
+        urls = [cdn.avatar_url(index) for index in range(icons)]
+        # Previous behavior: a fresh connection per icon via the module-level requests.get.
+        unpooled = fetch_all(lambda url: requests.get(url, timeout=DOWNLOAD_TIMEOUT_SECONDS), urls)
+        unpooled_connections = cdn.connections
+        cdn.reset_counters()
+        sessions = IconHttpSessions()
+        try:
+            pooled = fetch_all(lambda url: sessions.get().get(url, timeout=DOWNLOAD_TIMEOUT_SECONDS), urls)
+        finally:
+            sessions.close()
+        pooled_connections = cdn.connections
+    return BenchmarkResult(
+        "icon_fetch",
+        size,
+        pooled,
+        icons,
+        extra={
+            "icons": icons,
+            "workers": ICON_FETCH_WORKERS,
+            "connect_latency_seconds": cdn.connect_latency,
+            "unpooled_seconds": round(unpooled, 6),
+            "unpooled_connections": unpooled_connections,
+            "pooled_connections": pooled_connections,
+            "speedup": round(unpooled / pooled, 2) if pooled else None,
+        },
+    )
+
+
+def run_benchmarks(
+    sizes: Iterable[int],
+    *,
+    seed: int = DEFAULT_SEED,
+    only: Optional[Iterable[str]] = None,
+    repeat: int = 3,
+    work_dir: Optional[str] = None,
+    progress: Optional[Callable[[str], None]] = None,
+) -> dict:
+    selected = [name for name in BENCHMARKS if not only or name in set(only)]
+    results: List[BenchmarkResult] = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmpdir:
+        for size in sizes:
+            # Large corpora are expensive to repeat; time them once.
+            size_repeat = repeat if size <= 100_000 else 1
+            started = time.perf_counter()
+            messages = generate_messages(size, seed=seed)
+            if progress:
+                progress(f"generated {size} messages in {time.perf_counter() - started:.2f}s")
+            for name in selected:
+                size_dir = os.path.join(tmpdir, f"{name}-{size}")
+                if name == "format_message":
+                    result = bench_format_message(messages, repeat=size_repeat)
+                elif name == "message_filter":
+                    result = bench_message_filter(messages, repeat=size_repeat)
+                elif name == "execute_export":
+                    result = bench_execute_export(messages, size_dir)
+                elif name == "save_json":
+                    result = bench_save_json(messages, size_dir, repeat=size_repeat)
+                elif name == "save_txt":
+                    result = bench_save_txt(messages, size_dir, repeat=size_repeat)
+                elif name == "build_export_paths":
+                    result = bench_build_export_paths(size, size_dir, repeat=size_repeat)
+                elif name == "tree_population":
+                    result = bench_tree_population(size, size_dir, seed=seed, repeat=size_repeat)
+                else:
+                    result = bench_icon_fetch(size, seed=seed)
+                results.append(result)
+                if progress:
+                    status = f"skipped ({result.skipped})" if result.skipped else f"{result.seconds:.3f}s"
+                    progress(f"{result.key}: {status}")
+            del messages
+            gc.collect()
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": [result.as_dict() for result in results],
+    }
+
+
+def compare_reports(report: dict, baseline: dict, *, threshold: float = REGRESSION_THRESHOLD) -> List[dict]:
+    previous = {f"{item['name']}@{item['size']}": item for item in baseline.get("results", [])}
+    rows = []
+    for item in report.get("results", []):
+        key = f"{item['name']}@{item['size']}"
+        before = previous.get(key)
+        if item.get("skipped") or not before or before.get("skipped") or not before.get("seconds"):
+            continue
+        change = (item["seconds"] - before["seconds"]) / before["seconds"]
+        rows.append(
+            {
+                "benchmark": key,
+                "baseline_seconds": before["seconds"],
+                "seconds": item["seconds"],
+                "change": round(change, 4),
+                "regression": change > threshold,
+            }
+        )
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Time ArchiveCord export hot paths.")
+    parser.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help="Comma list, e.g. 10k,100k,1m or 5000.")
+    parser.add_argument("--only", action="append", choices=BENCHMARKS, help="Run only this benchmark; repeatable.")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of repeats for corpora up to 100k messages.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output", default="benchmark-report.json", help="Where to write the JSON report.")
+    parser.add_argument("--baseline", help="Previous report to compare against.")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Slowdown ratio flagged.")
+    args = parser.parse_args(argv)
+    # Records are still created so logging cost is measured, but corpus warnings are not printed.
+    logging.getLogger("discordsorter").addHandler(logging.NullHandler())
+
+    report = run_benchmarks(
+        parse_sizes(args.sizes),
+        seed=args.seed,
+        only=args.only,
+        repeat=args.repeat,
+        progress=lambda message: print(message, flush=True),
+    )
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as handle:
+            comparison = compare_reports(report, json.load(handle), threshold=args.threshold)
+        report["baseline"] = {"path": args.baseline, "threshold": args.threshold, "comparison": comparison}
+        for row in comparison:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['benchmark']}: {row['baseline_seconds']:.3f}s -> {row['seconds']:.3f}s ({row['change']:+.1%}){flag}")
+        if any(row["regression"] for row in comparison):
+            exit_code = 1
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Report written to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
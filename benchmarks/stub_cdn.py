@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Loopback connections are nearly free; this stands in for the TCP and TLS handshake to a real CDN.
+DEFAULT_CONNECT_LATENCY_SECONDS = 0.01
+DEFAULT_ICON_BYTES = 2048
+
+
+class StubCdnHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, delayed ACKs stall every keep-alive reply.
+    disable_nagle_algorithm = True
+
+    def setup(self) -> None:
+        super().setup()
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.connect_latency:
+            time.sleep(server.connect_latency)
+
+    def do_GET(self) -> None:  # noqa: N802
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(server.payload)))
+        self.end_headers()
+        self.wfile.write(server.payload)
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        return
+
+
+class StubCdn(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        *,
+        connect_latency: float = DEFAULT_CONNECT_LATENCY_SECONDS,
+        payload: Optional[bytes] = None,
+        seed: int = 0,
+    ):
+        super().__init__(("127.0.0.1", 0), StubCdnHandler)
+        self.connect_latency = connect_latency
+        self.payload = payload if payload is not None else random.Random(seed).randbytes(DEFAULT_ICON_BYTES)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = 0
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def avatar_url(self, index: int) -> str:
+        return f"{self.base_url}/avatars/{index}/{index:032x}.png?size=64"
+
+    def reset_counters(self) -> None:
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+
+    def __enter__(self) -> "StubCdn":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
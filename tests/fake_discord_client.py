@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from app.core.metrics import RequestStats
+
+
+# A one-message stand-in for DiscordClient, patched into the export pipeline.
+class FakeDiscordClient:
+    def __init__(self, token: str):
+        self.token = token
+        self.stats = RequestStats(api_calls=2, bytes_received=512)
+
+    def validate_token(self) -> None:
+        return None
+
+    def get_channel_messages(self, channel_id: str, before_id=None, limit: int = 100):
+        return [
+            {
+                "id": "100",
+                "timestamp": "2026-01-10T12:00:00.000000+00:00",
+                "content": "hello",
+                "author": {"username": "Fish", "discriminator": "1234"},
+                "attachments": [],
+            }
+        ] if before_id is None else []
+
+    def close(self) -> None:
+        return None
@@ -0,0 +1,332 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+DISCORD_EPOCH_MS = 1420070400000
+CORPUS_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+API_PREFIX = "/api/v9"
+CDN_PREFIX = "/cdn/attachments"
+
+
+def snowflake_for(moment: datetime, sequence: int = 0) -> int:
+    millis = int(moment.timestamp() * 1000) - DISCORD_EPOCH_MS
+    return (millis << 22) | (sequence & 0xFFF)
+
+
+@dataclass
+class FakeChannel:
+    channel_id: str
+    message_count: int
+    attachment_every: int = 0
+    attachment_size: int = 1024
+    reply_every: int = 0
+    seconds_between_messages: int = 60
+    guild_id: Optional[str] = None
+    mention_every: int = 0
+
+    def message(self, index: int, base_url: str) -> dict:
+        moment = CORPUS_START + timedelta(seconds=index * self.seconds_between_messages)
+        message_id = str(snowflake_for(moment, index))
+        payload = {
+            "id": message_id,
+            "channel_id": self.channel_id,
+            "type": 0,
+            "content": f"message {index} in {self.channel_id} " + "lorem ipsum " * (index % 7),
+            "author": {"id": str(1000 + index % 5), "username": f"user{index % 5}", "discriminator": "0"},
+            "timestamp": moment.isoformat(),
+            "edited_timestamp": None,
+            "pinned": False,
+            "mentions": [],
+            "embeds": [],
+            "attachments": [],
+        }
+        if self.attachment_every and index % self.attachment_every == 0:
+            filename = f"file_{index}.bin"
+            payload["attachments"].append(
+                {
+                    "id": f"{message_id}1",
+                    "filename": filename,
+                    "size": self.attachment_size,
+                    "content_type": "application/octet-stream",
+                    "url": f"{base_url}{CDN_PREFIX}/{self.channel_id}/{message_id}/{filename}",
+                }
+            )
+        if self.mention_every and index % self.mention_every == 0:
+            payload["mentions"].append({"id": "4242", "username": "mentioned"})
+        if self.reply_every and index and index % self.reply_every == 0:
+            previous = CORPUS_START + timedelta(seconds=(index - 1) * self.seconds_between_messages)
+            payload["message_reference"] = {"message_id": str(snowflake_for(previous, index - 1))}
+        return payload
+
+    def index_for(self, message_id: str) -> int:
+        # Inverse of snowflake_for for this channel's fixed spacing.
+        millis = (int(message_id) >> 22) + DISCORD_EPOCH_MS
+        offset = (millis - int(CORPUS_START.timestamp() * 1000)) // 1000
+        return int(offset // self.seconds_between_messages)
+
+
+@dataclass
+class RateLimitPolicy:
+    limit: int = 50
+    window_seconds: float = 1.0
+    retry_after: Optional[float] = None
+
+
+@dataclass
+class FakeDiscordState:
+    token: str = "fake-token"
+    channels: Dict[str, FakeChannel] = field(default_factory=dict)
+    rate_limit: Optional[RateLimitPolicy] = None
+    server_error_every: int = 0
+    latency_seconds: float = 0.0
+    search_index_pending: int = 0
+    requests: int = 0
+    search_requests: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    bytes_served: int = 0
+    _buckets: Dict[str, list] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeDiscord/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def state(self) -> FakeDiscordState:
+        return self.server.state  # type: ignore[attr-defined]
+
+    def log_message(self, format: str, *args) -> None:
+        return
+
+    def _send(self, status: int, body: bytes, *, content_type: str = "application/json", headers=None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.state._lock:
+            self.state.bytes_served += len(body)
+
+    def _send_json(self, status: int, payload, headers=None) -> None:
+        self._send(status, json.dumps(payload).encode("utf-8"), headers=headers)
+
+    def _rate_limit_headers(self, route: str) -> tuple[dict, Optional[float]]:
+        policy = self.state.rate_limit
+        if policy is None:
+            return {}, None
+        now = time.monotonic()
+        with self.state._lock:
+            window = self.state._buckets.setdefault(route, [now, 0])
+            if now - window[0] >= policy.window_seconds:
+                window[0], window[1] = now, 0
+            window[1] += 1
+            used = window[1]
+            reset_after = max(0.0, policy.window_seconds - (now - window[0]))
+        headers = {
+            "X-RateLimit-Limit": str(policy.limit),
+            "X-RateLimit-Remaining": str(max(0, policy.limit - used)),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Bucket": route,
+        }
+        if used > policy.limit:
+            retry_after = policy.retry_after if policy.retry_after is not None else reset_after
+            return headers, retry_after
+        return headers, None
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server API
+        state = self.state
+        with state._lock:
+            state.requests += 1
+            request_number = state.requests
+        if state.latency_seconds:
+            time.sleep(state.latency_seconds)
+
+        parts = urlsplit(self.path)
+        if parts.path.startswith(CDN_PREFIX + "/"):
+            self._serve_attachment(parts.path[len(CDN_PREFIX) + 1:])
+            return
+        if not parts.path.startswith(API_PREFIX):
+            self._send_json(404, {"message": "404: Not Found", "code": 0})
+            return
+        if self.headers.get("Authorization") != state.token:
+            self._send_json(401, {"message": "401: Unauthorized", "code": 0})
+            return
+        if state.server_error_every and request_number % state.server_error_every == 0:
+            with state._lock:
+                state.server_errors += 1
+            self._send(502, b"Bad Gateway", content_type="text/plain")
+            return
+
+        route = parts.path[len(API_PREFIX):]
+        headers, retry_after = self._rate_limit_headers(route)
+        if retry_after is not None:
+            with state._lock:
+                state.rate_limited += 1
+            headers["Retry-After"] = f"{retry_after:.3f}"
+            self._send_json(
+                429,
+                {"message": "You are being rate limited.", "retry_after": retry_after, "global": False},
+                headers=headers,
+            )
+            return
+
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        segments = [segment for segment in route.split("/") if segment]
+        if segments == ["users", "@me"]:
+            self._send_json(200, {"id": "1", "username": "fake", "discriminator": "0"}, headers)
+        elif segments == ["users", "@me", "channels"]:
+            self._send_json(200, [], headers)
+        elif segments == ["users", "@me", "guilds"]:
+            self._send_json(200, [], headers)
+        elif len(segments) == 3 and segments[0] == "channels" and segments[2] == "messages":
+            self._serve_messages(segments[1], query, headers)
+        elif len(segments) == 4 and segments[0] == "guilds" and segments[2:] == ["messages", "search"]:
+            self._serve_search(segments[1], parse_qs(parts.query), headers)
+        else:
+            self._send_json(404, {"message": "404: Not Found", "code": 0}, headers)
+
+    def _serve_messages(self, channel_id: str, query: dict, headers: dict) -> None:
+        channel = self.state.channels.get(channel_id)
+        if channel is None:
+            self._send_json(404, {"message": "Unknown Channel", "code": 10003}, headers)
+            return
+        limit = max(1, min(100, int(query.get("limit", 50))))
+        base_url = f"http://{self.headers.get('Host')}"
+        if "after" in query:
+            start = channel.index_for(query["after"]) + 1 if int(query["after"]) else 0
+            start = max(0, start)
+            indexes = range(start, min(channel.message_count, start + limit))
+        else:
+            end = channel.index_for(query["before"]) if "before" in query else channel.message_count
+            end = min(end, channel.message_count)
+            indexes = range(max(0, end - limit), end)
+        # Discord returns newest first regardless of the paging direction.
+        payload = [channel.message(index, base_url) for index in reversed(indexes)]
+        self._send_json(200, payload, headers)
+
+    def _serve_search(self, guild_id: str, query: dict, headers: dict) -> None:
+        state = self.state
+        with state._lock:
+            state.search_requests += 1
+            pending = state.search_index_pending > 0
+            if pending:
+                state.search_index_pending -= 1
+        if pending:
+            self._send_json(202, {"message": "Index not yet available.", "code": 110000, "retry_after": 0.01}, headers)
+            return
+        channels = [
+            channel
+            for channel in state.channels.values()
+            if channel.guild_id == guild_id and channel.channel_id in query.get("channel_id", [channel.channel_id])
+        ]
+        authors = set(query.get("author_id", []))
+        mentions = set(query.get("mentions", []))
+        has = set(query.get("has", []))
+        terms = " ".join(query.get("content", [])).lower().split()
+        min_id = int(query.get("min_id", ["0"])[-1])
+        max_id = int(query.get("max_id", [str(1 << 63)])[-1])
+        base_url = f"http://{self.headers.get('Host')}"
+        hits = []
+        for channel in channels:
+            for index in range(channel.message_count):
+                message = channel.message(index, base_url)
+                if not min_id < int(message["id"]) < max_id:
+                    continue
+                if authors and message["author"]["id"] not in authors:
+                    continue
+                if mentions and not mentions.intersection(user["id"] for user in message["mentions"]):
+                    continue
+                if "file" in has and not message["attachments"]:
+                    continue
+                if terms and not all(term in message["content"].lower() for term in terms):
+                    continue
+                hits.append(message)
+        hits.sort(key=lambda message: int(message["id"]), reverse=query.get("sort_order", ["desc"])[-1] != "asc")
+        page = [[{**message, "hit": True}] for message in hits[:25]]
+        self._send_json(200, {"total_results": len(hits), "messages": page}, headers)
+
+    def _serve_attachment(self, path: str) -> None:
+        channel_id, _message_id, _filename = (path.split("/") + ["", "", ""])[:3]
+        channel = self.state.channels.get(channel_id)
+        if channel is None:
+            self._send(404, b"missing", content_type="text/plain")
+            return
+        body = (b"0123456789abcdef" * (channel.attachment_size // 16 + 1))[: channel.attachment_size]
+        self._send(200, body, content_type="application/octet-stream")
+
+
+class FakeDiscordServer:
+    def __init__(self, state: Optional[FakeDiscordState] = None, *, host: str = "127.0.0.1", port: int = 0):
+        self.state = state or FakeDiscordState()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.state = self.state  # type: ignore[attr-defined]
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def root_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base_url(self) -> str:
+        return f"{self.root_url}{API_PREFIX}"
+
+    def add_channel(self, channel_id: str, message_count: int, **kwargs) -> FakeChannel:
+        channel = FakeChannel(channel_id=channel_id, message_count=message_count, **kwargs)
+        self.state.channels[channel_id] = channel
+        return channel
+
+    def start(self) -> "FakeDiscordServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-discord", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "FakeDiscordServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve a synthetic Discord API for offline load tests.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--channel", action="append", default=[], help="channel_id=message_count")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per second per route (0 disables).")
+    parser.add_argument("--attachment-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeDiscordServer(
+        FakeDiscordState(rate_limit=RateLimitPolicy(limit=args.rate_limit) if args.rate_limit else None),
+        port=args.port,
+    )
+    for spec in args.channel or ["100=1000"]:
+        channel_id, _, count = spec.partition("=")
+        server.add_channel(channel_id, int(count or 1000), attachment_every=args.attachment_every)
+    print(f"Fake Discord API at {server.api_base_url} (token: {server.state.token})", flush=True)
+    server.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import unittest
+
+from app.core.attachment_plan import (
+    DEFAULT_MAX_TOTAL_BYTES,
+    SKIP_BUDGET,
+    SKIP_NO_URL,
+    SKIP_TOO_LARGE,
+    SKIP_TYPE,
+    AttachmentLimits,
+    build_attachment_limits,
+    format_bytes,
+    format_duration,
+    parse_byte_size,
+    parse_content_types,
+    plan_attachments,
+)
+
+
+def _message(message_id: str, *attachments: dict) -> dict:
+    return {"id": message_id, "attachments": list(attachments)}
+
+
+def _attachment(name: str, size, content_type: str | None = None, url: str | None = "https://cdn/x") -> dict:
+    return {"id": f"a{name}", "filename": name, "size": size, "content_type": content_type, "url": url}
+
+
+class AttachmentPlanTests(unittest.TestCase):
+    def test_parse_sizes_and_types(self) -> None:
+        self.assertEqual(parse_byte_size("25MB"), 25 * 1024**2)
+        self.assertEqual(parse_byte_size("1.5 GiB"), int(1.5 * 1024**3))
+        self.assertEqual(parse_byte_size("500k"), 500 * 1024)
+        self.assertEqual(parse_byte_size("4096"), 4096)
+        for unlimited in (None, "", "0", "none"):
+            self.assertIsNone(parse_byte_size(unlimited))
+        with self.assertRaises(ValueError):
+            parse_byte_size("lots")
+        self.assertEqual(parse_content_types("image, video/mp4,IMAGE/*"), ("image/*", "video/mp4"))
+        self.assertEqual(parse_content_types(["audio/*", "image/png,image/gif"]), ("audio/*", "image/png", "image/gif"))
+
+    def test_default_limits_keep_total_budget_unless_lifted(self) -> None:
+        self.assertEqual(build_attachment_limits().max_total_bytes, DEFAULT_MAX_TOTAL_BYTES)
+        self.assertEqual(build_attachment_limits(max_total_size=" ").max_total_bytes, DEFAULT_MAX_TOTAL_BYTES)
+        self.assertIsNone(build_attachment_limits(max_total_size="0").max_total_bytes)
+        self.assertEqual(build_attachment_limits(max_total_size="10GB").max_total_bytes, 10 * 1024**3)
+
+    def test_plan_applies_type_size_and_budget_limits(self) -> None:
+        messages = [
+            _message("1", _attachment("a.png", 400, "image/png"), _attachment("b.mp4", 5000, "video/mp4")),
+            _message("2", _attachment("c.zip", 100, "application/zip"), _attachment("d.jpg", 700, None)),
+            _message("3", _attachment("e.gif", 500, "image/gif; charset=binary"), _attachment("f.png", 50, "image/png", url=None)),
+            _message("4", _attachment("g.png", None, "image/png"), _attachment("h.png", 100, "image/png")),
+        ]
+        limits = AttachmentLimits(max_file_bytes=1000, max_total_bytes=1200, allowed_types=("image/*", "video/mp4"))
+        plan = plan_attachments(messages, limits)
+
+        # d.jpg has no content_type, so its extension decides; e.gif would overflow the budget but h.png still fits.
+        self.assertEqual([item.filename for item in plan.selected], ["a.png", "d.jpg", "g.png", "h.png"])
+        self.assertEqual(plan.total_bytes, 1200)
+        self.assertEqual(plan.unknown_sizes, 1)
+        self.assertEqual(plan.skipped, {SKIP_TOO_LARGE: 1, SKIP_TYPE: 1, SKIP_BUDGET: 1, SKIP_NO_URL: 1})
+        self.assertEqual(plan.skipped_bytes, 5000 + 100 + 500 + 50)
+        self.assertEqual(plan.selected[1].content_type, "image/jpeg")
+        self.assertEqual(plan.as_dict()["limits"]["allowed_types"], ["image/*", "video/mp4"])
+
+    def test_summary_reports_bytes_and_estimated_time(self) -> None:
+        messages = [_message(str(index), _attachment(f"{index}.bin", 40 * 1024**2)) for index in range(10)]
+        plan = plan_attachments(messages, AttachmentLimits(max_total_bytes=200 * 1024**2))
+        self.assertEqual(plan.file_count, 5)
+        self.assertAlmostEqual(plan.estimated_seconds(bytes_per_second=10 * 1024**2, seconds_per_file=1), 25.0)
+        summary = plan.summary()
+        self.assertTrue(summary.startswith("5 files, 200.0 MB, about "), summary)
+        self.assertIn("skipped 5 (200.0 MB): 5 over total budget", summary)
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(3 * 1024**4), "3072.0 GB")
+        self.assertEqual(format_duration(3725), "1h 02m")
+        self.assertEqual(format_duration(65), "1m 05s")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.corpus import CorpusClient, generate_conversations, generate_messages
+from benchmarks.run import compare_reports, main, parse_sizes, run_benchmarks
+
+
+class CorpusTests(unittest.TestCase):
+    def test_generator_is_deterministic_and_ordered(self) -> None:
+        first = generate_messages(500, seed=7)
+        second = generate_messages(500, seed=7)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, generate_messages(500, seed=8))
+        ids = [int(message["id"]) for message in first]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), 500)
+
+    def test_generator_covers_replies_attachments_edits_and_pins(self) -> None:
+        messages = generate_messages(5000, seed=3)
+
+        self.assertTrue(any(message.get("message_reference") for message in messages))
+        self.assertTrue(any(message["attachments"] for message in messages))
+        self.assertTrue(any(message["edited_timestamp"] for message in messages))
+        self.assertTrue(any(message["pinned"] for message in messages))
+        self.assertTrue(any(not message["content"] for message in messages))
+
+    def test_corpus_client_pages_newest_first(self) -> None:
+        messages = generate_messages(250, seed=1)
+        client = CorpusClient(messages)
+
+        fetched = []
+        before_id = None
+        while True:
+            page = client.get_channel_messages("1", before_id=before_id, limit=100)
+            if not page:
+                break
+            fetched.extend(page)
+            before_id = page[-1]["id"]
+
+        self.assertEqual(fetched, messages[::-1])
+        self.assertEqual(client.get_channel_messages("1", limit=2, after_id=messages[10]["id"])[-1], messages[11])
+        self.assertEqual(client.stats.api_calls, 5)
+
+    def test_conversation_payload_matches_requested_channel_count(self) -> None:
+        payload = generate_conversations(300, seed=2)
+        guild_channels = sum(
+            1 for guild in payload["guilds"] for channel in guild["channels"] if channel["type"] != 4
+        )
+
+        self.assertEqual(len(payload["dms"]) + guild_channels, 300)
+
+
+class BenchmarkRunnerTests(unittest.TestCase):
+    def test_parse_sizes_accepts_aliases(self) -> None:
+        self.assertEqual(parse_sizes("10k, 1m,2500"), [10_000, 1_000_000, 2500])
+
+    def test_run_benchmarks_reports_each_selected_benchmark(self) -> None:
+        report = run_benchmarks(
+            [300],
+            only=["format_message", "message_filter", "execute_export", "save_json", "save_txt", "build_export_paths"],
+            repeat=1,
+        )
+
+        names = [item["name"] for item in report["results"]]
+        self.assertEqual(
+            names,
+            ["format_message", "message_filter", "execute_export", "save_json", "save_txt", "build_export_paths"],
+        )
+        self.assertGreater(report["results"][1]["extra"]["matched"], 0)
+        export = report["results"][2]
+        self.assertIn("format", export["extra"]["stages_seconds"])
+        self.assertGreater(report["results"][3]["extra"]["bytes"], 0)
+
+    def test_icon_fetch_compares_pooled_and_unpooled_connections(self) -> None:
+        report = run_benchmarks([400], only=["icon_fetch"], repeat=1)
+
+        result = report["results"][0]
+        self.assertEqual(result["name"], "icon_fetch")
+        self.assertEqual(result["extra"]["icons"], 20)
+        self.assertEqual(result["extra"]["unpooled_connections"], 20)
+        self.assertLessEqual(result["extra"]["pooled_connections"], result["extra"]["workers"])
+
+    def test_baseline_comparison_flags_regressions(self) -> None:
+        baseline = {"results": [{"name": "save_json", "size": 10, "seconds": 1.0}]}
+        report = {"results": [{"name": "save_json", "size": 10, "seconds": 1.5}]}
+
+        rows = compare_reports(report, baseline)
+
+        self.assertEqual(len(rows), 1)
+        self.assertTrue(rows[0]["regression"])
+        self.assertAlmostEqual(rows[0]["change"], 0.5)
+
+    def test_main_writes_report_and_fails_on_regression(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            baseline = os.path.join(tmpdir, "baseline.json")
+            with open(baseline, "w", encoding="utf-8") as handle:
+                json.dump({"results": [{"name": "save_txt", "size": 200, "seconds": 1e-9}]}, handle)
+            output = os.path.join(tmpdir, "report.json")
+
+            exit_code = main(
+                ["--sizes", "200", "--only", "save_txt", "--repeat", "1", "--output", output, "--baseline", baseline]
+            )
+
+            with open(output, "r", encoding="utf-8") as handle:
+                report = json.load(handle)
+        self.assertEqual(exit_code, 1)
+        self.assertTrue(report["baseline"]["comparison"][0]["regression"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest.mock import patch
+
+from tests.fake_discord_client import FakeDiscordClient
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CliTests(unittest.TestCase):
+    def test_cli_import_does_not_load_qt(self) -> None:
+        output = subprocess.check_output(
+            [sys.executable, "-c", "import sys, app.cli; print('PySide6' in sys.modules)"],
+            cwd=REPO_ROOT,
+            text=True,
+        )
+        self.assertEqual(output.strip(), "False")
+
+    def test_job_file_merges_defaults_into_targets(self) -> None:
+        from app.cli import load_job
+
+        job = {
+            "output_root": "exports",
+            "defaults": {"export_json": True, "after": "2026-01-01", "include_pins": False},
+            "targets": [
+                {"channel_id": "1", "dm_name": "Fish"},
+                {"channel_id": "2", "guild_id": "9", "guild_name": "Srv", "channel_name": "general", "export_txt": True},
+            ],
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "job.json")
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump(job, handle)
+            targets = load_job(path)
+
+        self.assertEqual([target.label for target in targets], ["Fish", "Srv #general"])
+        dm, channel = (target.options for target in targets)
+        self.assertEqual(dm.target_kind, "dm")
+        self.assertTrue(dm.export_json)
+        self.assertFalse(dm.export_txt)
+        self.assertFalse(dm.include_pins)
+        self.assertEqual(dm.after_dt.date().isoformat(), "2026-01-01")
+        self.assertEqual(channel.target_kind, "guild")
+        self.assertTrue(channel.export_txt)
+        self.assertEqual(channel.output_root, os.path.abspath("exports"))
+
+    def test_search_flags_build_message_filter(self) -> None:
+        from app.cli import CliError, build_options, build_parser, targets_from_args
+
+        args = build_parser().parse_args(
+            ["export", "--channel", "1", "--guild-id", "9", "--author", "5", "--has", "attachment", "--contains", "hi"]
+        )
+        (target,) = targets_from_args(args)
+
+        self.assertEqual(target.options.search.author_ids, ("5",))
+        self.assertEqual(target.options.search.has, ("attachment",))
+        self.assertEqual(target.options.search.content, "hi")
+        self.assertIsNone(build_options({"channel_id": "1"}, output_root=".").search)
+        with self.assertRaises(CliError):
+            build_options({"channel_id": "1", "has": "sticker"}, output_root=".")
+        self.assertEqual(
+            build_options({"channel_id": "1", "message_filter": "is:pinned"}, output_root=".").message_filter,
+            "is:pinned",
+        )
+        with self.assertRaises(CliError):
+            build_options({"channel_id": "1", "message_filter": "is:"}, output_root=".")
+
+    def test_attachment_flags_build_limits(self) -> None:
+        from app.cli import CliError, build_options, build_parser, targets_from_args
+        from app.core.attachment_plan import DEFAULT_MAX_TOTAL_BYTES
+
+        args = build_parser().parse_args(
+            [
+                "export", "--channel", "1", "--plan-attachments", "--max-attachment-size", "25MB",
+                "--max-attachment-total", "none", "--attachment-type", "image", "--attachment-type", "video/mp4",
+            ]
+        )
+        (target,) = targets_from_args(args)
+
+        self.assertTrue(target.options.export_attachments)
+        self.assertTrue(target.options.attachment_plan_only)
+        self.assertFalse(target.options.export_txt)
+        self.assertEqual(target.options.attachment_limits.max_file_bytes, 25 * 1024**2)
+        self.assertIsNone(target.options.attachment_limits.max_total_bytes)
+        self.assertEqual(target.options.attachment_limits.allowed_types, ("image/*", "video/mp4"))
+        job_options = build_options({"channel_id": "1", "export_attachments": True, "attachment_types": "image/png"}, output_root=".")
+        self.assertEqual(job_options.attachment_limits.max_total_bytes, DEFAULT_MAX_TOTAL_BYTES)
+        self.assertEqual(job_options.attachment_limits.allowed_types, ("image/png",))
+        with self.assertRaises(CliError):
+            build_options({"channel_id": "1", "max_attachment_size": "huge"}, output_root=".")
+
+    def test_export_command_runs_pipeline_with_env_token(self) -> None:
+        from app import cli
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            stdout = io.StringIO()
+            with patch.dict(os.environ, {cli.TOKEN_ENV: "token"}), patch(
+                "app.workers.export_pipeline.DiscordClient", FakeDiscordClient
+            ), patch("app.cli.setup_logging", return_value=None), redirect_stdout(stdout):
+                code = cli.main(["export", "--channel", "333", "--dm-name", "Fish", "--output", tmpdir])
+
+            self.assertEqual(code, cli.EXIT_OK)
+            self.assertIn("Export complete.", stdout.getvalue())
+            exports = os.listdir(os.path.join(tmpdir, "DMs", "Fish [channel_333]"))
+            self.assertEqual(len(exports), 1)
+
+    def test_missing_token_is_a_usage_error(self) -> None:
+        from app import cli
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.dict(os.environ, {cli.TOKEN_ENV: ""}), patch(
+                "app.core.token_store.load_token", return_value=None
+            ), patch("app.cli.setup_logging", return_value=None), redirect_stdout(io.StringIO()), patch(
+                "sys.stderr", io.StringIO()
+            ):
+                code = cli.main(["export", "--channel", "333", "--output", tmpdir])
+
+        self.assertEqual(code, cli.EXIT_USAGE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.core.attachment_plan import AttachmentLimits
+from app.core.discord_client import BASE_URL_ENV, DiscordClient
+from app.core.message_filters import MessageSearchFilter
+from app.core.models import ExportOptions
+from app.workers.export_pipeline import execute_export
+from tests.fake_discord_server import FakeDiscordServer, FakeDiscordState, RateLimitPolicy
+
+
+def _options(output_root: str, **overrides) -> ExportOptions:
+    options = ExportOptions(
+        channel_id="500",
+        before_dt=None,
+        after_dt=None,
+        export_json=True,
+        export_txt=False,
+        export_attachments=False,
+        include_edits=True,
+        include_pins=True,
+        include_replies=True,
+        output_root=output_root,
+        target_kind="guild",
+        dm_name=None,
+        guild_id="50",
+        guild_name="Guild",
+        category_id=None,
+        category_name=None,
+        channel_name="general",
+        export_label="",
+    )
+    return dataclasses.replace(options, **overrides)
+
+
+class DiscordHttpTests(unittest.TestCase):
+    def test_execute_export_pages_full_channel_over_http(self) -> None:
+        with FakeDiscordServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+            server.add_channel("500", 250, attachment_every=50, attachment_size=300)
+            options = ExportOptions(
+                channel_id="500",
+                before_dt=None,
+                after_dt=None,
+                export_json=True,
+                export_txt=True,
+                export_attachments=True,
+                include_edits=True,
+                include_pins=True,
+                include_replies=True,
+                output_root=tmpdir,
+                target_kind="dm",
+                dm_name="Load",
+                guild_id=None,
+                guild_name=None,
+                category_id=None,
+                category_name=None,
+                channel_name=None,
+                export_label="",
+            )
+
+            with patch.dict(os.environ, {BASE_URL_ENV: server.api_base_url}):
+                result = execute_export(server.state.token, options)
+
+            with open(result.metadata_path, "r", encoding="utf-8") as handle:
+                metadata = json.load(handle)
+
+            self.assertEqual(metadata["message_count"], 250)
+            self.assertEqual(result.attachments_saved, 5)
+            self.assertEqual(len(os.listdir(result.attachments_dir)), 5)
+            ids = [int(message["id"]) for message in result.messages]
+            self.assertEqual(ids, sorted(ids))
+            self.assertEqual(len(set(ids)), 250)
+            self.assertEqual(metadata["performance"]["api_calls"], 5)
+            self.assertGreaterEqual(metadata["performance"]["bytes_received"], 5 * 300)
+
+    def test_attachment_plan_applies_limits_before_downloading(self) -> None:
+        with FakeDiscordServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+            server.add_channel("500", 250, attachment_every=50, attachment_size=300)
+            limits = AttachmentLimits(max_total_bytes=700)
+            statuses: list = []
+            with patch.dict(os.environ, {BASE_URL_ENV: server.api_base_url}):
+                budgeted = execute_export(
+                    server.state.token,
+                    _options(tmpdir, export_attachments=True, attachment_limits=limits),
+                    status_callback=statuses.append,
+                )
+                planned = execute_export(
+                    server.state.token, _options(tmpdir, export_attachments=True, attachment_plan_only=True)
+                )
+
+            self.assertEqual(budgeted.attachments_saved, 2)
+            self.assertEqual(len(os.listdir(budgeted.attachments_dir)), 2)
+            self.assertEqual(budgeted.attachment_plan["skipped"], {"budget": 3})
+            self.assertTrue(any(status.startswith("Attachments: 2 files, 600 B, about ") for status in statuses), statuses)
+
+            self.assertIsNone(planned.attachments_dir)
+            self.assertEqual(planned.attachments_saved, 0)
+            self.assertFalse(os.path.exists(os.path.join(planned.export_dir, "attachments")))
+            with open(planned.metadata_path, "r", encoding="utf-8") as handle:
+                metadata = json.load(handle)
+            self.assertEqual(metadata["attachment_plan"]["files"], 5)
+            self.assertEqual(metadata["attachment_plan"]["bytes"], 1500)
+            self.assertIsNone(metadata["artifacts"]["attachments"])
+
+    def test_after_paging_returns_messages_newer_than_high_water(self) -> None:
+        with FakeDiscordServer() as server:
+            server.add_channel("7", 30)
+            client = DiscordClient(server.state.token, base_url=server.api_base_url)
+            try:
+                latest = client.get_channel_messages("7", limit=10)
+                oldest = client.get_channel_messages("7", limit=5, after_id="0")
+                newer = client.get_channel_messages("7", limit=100, after_id=oldest[0]["id"])
+            finally:
+                client.close()
+
+        self.assertEqual(len(latest), 10)
+        self.assertGreater(int(latest[0]["id"]), int(latest[-1]["id"]))
+        self.assertEqual(len(oldest), 5)
+        self.assertEqual(len(newer), 25)
+        self.assertEqual(newer[0]["id"], latest[0]["id"])
+
+    def test_rate_limit_headers_throttle_before_429(self) -> None:
+        state = FakeDiscordState(rate_limit=RateLimitPolicy(limit=2, window_seconds=0.2))
+        with FakeDiscordServer(state) as server:
+            server.add_channel("7", 10)
+            client = DiscordClient(state.token, base_url=server.api_base_url)
+            try:
+                for _ in range(5):
+                    client.get_channel_messages("7", limit=1)
+            finally:
+                client.close()
+
+        self.assertEqual(state.rate_limited, 0)
+        self.assertGreater(client.stats.rate_limit_sleep_seconds, 0)
+
+    def test_429_and_5xx_responses_are_retried(self) -> None:
+        state = FakeDiscordState(
+            rate_limit=RateLimitPolicy(limit=1, window_seconds=0.2, retry_after=0.05),
+            server_error_every=4,
+        )
+        with FakeDiscordServer(state) as server, patch(
+            "app.core.discord_client.SERVER_ERROR_BACKOFF_SECONDS", 0.0
+        ):
+            server.add_channel("7", 10)
+            first = DiscordClient(state.token, base_url=server.api_base_url)
+            second = DiscordClient(state.token, base_url=server.api_base_url)
+            try:
+                for _ in range(3):
+                    self.assertEqual(len(first.get_channel_messages("7", limit=2)), 2)
+                    self.assertEqual(len(second.get_channel_messages("7", limit=2)), 2)
+            finally:
+                first.close()
+                second.close()
+
+        self.assertGreater(state.rate_limited, 0)
+        self.assertGreater(first.stats.rate_limit_waits + second.stats.rate_limit_waits, 0)
+        self.assertGreater(state.server_errors, 0)
+        self.assertEqual(
+            first.stats.server_error_retries + second.stats.server_error_retries,
+            state.server_errors,
+        )
+
+    def test_guild_search_fetches_only_matching_messages(self) -> None:
+        state = FakeDiscordState(search_index_pending=1)
+        with FakeDiscordServer(state) as server, tempfile.TemporaryDirectory() as tmpdir:
+            server.add_channel("500", 1000, attachment_every=10, guild_id="50")
+            search = MessageSearchFilter.create(author_ids="1000", has=["attachment"])
+
+            with patch.dict(os.environ, {BASE_URL_ENV: server.api_base_url}):
+                result = execute_export(state.token, _options(tmpdir, search=search))
+
+            with open(result.metadata_path, "r", encoding="utf-8") as handle:
+                metadata = json.load(handle)
+
+        # Author 1000 posts every 5th message and attachments land on every 10th.
+        self.assertEqual(len(result.messages), 100)
+        self.assertTrue(all(message["author"]["id"] == "1000" for message in result.messages))
+        self.assertTrue(all(message["attachments"] for message in result.messages))
+        self.assertNotIn("hit", result.messages[0])
+        self.assertEqual(state.search_requests, 6)
+        self.assertEqual(metadata["filters"]["search"]["author_ids"], ["1000"])
+        self.assertLess(metadata["performance"]["api_calls"], 10)
+
+    def test_dm_search_filters_client_side(self) -> None:
+        state = FakeDiscordState()
+        with FakeDiscordServer(state) as server, tempfile.TemporaryDirectory() as tmpdir:
+            server.add_channel("500", 300, mention_every=3)
+            search = MessageSearchFilter.create(mention_ids="4242", content="lorem")
+            options = _options(tmpdir, target_kind="dm", dm_name="Friend", guild_id=None, search=search)
+
+            with patch.dict(os.environ, {BASE_URL_ENV: server.api_base_url}):
+                result = execute_export(state.token, options)
+
+        self.assertEqual(state.search_requests, 0)
+        self.assertTrue(result.messages)
+        for message in result.messages:
+            index = int(message["content"].split()[1])
+            self.assertEqual(index % 3, 0)
+            self.assertNotEqual(index % 7, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import dataclasses
+import gc
+import logging
+import tempfile
+import tracemalloc
+import unittest
+from typing import Optional
+from unittest.mock import patch
+
+from app.workers.export_pipeline import PreviewCallback, execute_export
+from benchmarks.corpus import CorpusClient, corpus_export_options, generate_messages
+
+MESSAGE_COUNT = 4000
+# Peak traced bytes per message on top of the already-fetched corpus. Measured
+# peaks sit around 75% of these budgets; a regression that keeps another full
+# copy of the transcript or the message list alive will exceed them.
+BUDGET_BYTES_PER_MESSAGE = {
+    "json": 480,
+    "txt": 480,
+    "txt_no_replies": 352,
+    "json_txt": 480,
+    "json_txt_preview": 480,
+}
+MODES = {
+    "json": {"export_json": True, "export_txt": False},
+    "txt": {"export_json": False, "export_txt": True},
+    "txt_no_replies": {"export_json": False, "export_txt": True, "include_replies": False},
+    "json_txt": {"export_json": True, "export_txt": True},
+    "json_txt_preview": {"export_json": True, "export_txt": True},
+}
+
+
+def _peak_export_bytes(messages: list, mode: str, preview_callback: Optional[PreviewCallback] = None) -> int:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        options = dataclasses.replace(corpus_export_options(tmpdir), **MODES[mode])
+        client = CorpusClient(messages)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            with patch("app.workers.export_pipeline.DiscordClient", lambda token: client):
+                result = execute_export("token", options, preview_callback=preview_callback)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del result
+    return peak
+
+
+class ExportMemoryBudgetTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.messages = generate_messages(MESSAGE_COUNT, seed=5)
+        cls._null_handler = logging.NullHandler()
+        logging.getLogger("discordsorter").addHandler(cls._null_handler)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        logging.getLogger("discordsorter").removeHandler(cls._null_handler)
+
+    def _assert_within_budget(self, mode: str, preview_callback: Optional[PreviewCallback] = None) -> None:
+        peak = _peak_export_bytes(self.messages, mode, preview_callback)
+        budget = BUDGET_BYTES_PER_MESSAGE[mode] * MESSAGE_COUNT
+        self.assertLessEqual(
+            peak,
+            budget,
+            f"{mode} export peaked at {peak / MESSAGE_COUNT:.0f} B/message "
+            f"(budget {BUDGET_BYTES_PER_MESSAGE[mode]} B/message)",
+        )
+
+    def test_json_export_stays_within_budget(self) -> None:
+        self._assert_within_budget("json")
+
+    def test_txt_export_stays_within_budget(self) -> None:
+        self._assert_within_budget("txt")
+
+    def test_txt_export_without_replies_skips_lookup(self) -> None:
+        self._assert_within_budget("txt_no_replies")
+
+    def test_json_and_txt_export_stays_within_budget(self) -> None:
+        self._assert_within_budget("json_txt")
+
+    def test_preview_export_stays_within_budget(self) -> None:
+        self._assert_within_budget("json_txt_preview", lambda content: None)
+
+    def test_peak_grows_linearly_with_message_count(self) -> None:
+        small = _peak_export_bytes(self.messages[: MESSAGE_COUNT // 2], "json_txt")
+        large = _peak_export_bytes(self.messages, "json_txt")
+
+        self.assertLess(large / small, 2.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
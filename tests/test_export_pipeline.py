@@ -9,28 +9,7 @@ from unittest.mock import patch
 
 from app.core.models import ExportOptions
 from app.workers.export_pipeline import execute_export
-
-
-class _FakeDiscordClient:
-    def __init__(self, token: str):
-        self.token = token
-
-    def validate_token(self) -> None:
-        return None
-
-    def get_channel_messages(self, channel_id: str, before_id=None, limit: int = 100):
-        return [
-            {
-                "id": "100",
-                "timestamp": "2026-01-10T12:00:00.000000+00:00",
-                "content": "hello",
-                "author": {"username": "Fish", "discriminator": "1234"},
-                "attachments": [],
-            }
-        ] if before_id is None else []
-
-    def close(self) -> None:
-        return None
+from tests.fake_discord_client import FakeDiscordClient
 
 
 class ExportPipelineTests(unittest.TestCase):
@@ -57,7 +36,7 @@ class ExportPipelineTests(unittest.TestCase):
                 export_label="",
             )
 
-            with patch("app.workers.export_pipeline.DiscordClient", _FakeDiscordClient):
+            with patch("app.workers.export_pipeline.DiscordClient", FakeDiscordClient):
                 result = execute_export(
                     "token",
                     options,
@@ -83,6 +62,88 @@ class ExportPipelineTests(unittest.TestCase):
             )
             self.assertEqual(metadata["package"]["export_dir"], result.export_dir)
 
+            performance = metadata["performance"]
+            self.assertEqual(performance["api_calls"], 2)
+            self.assertEqual(performance["bytes_received"], 512)
+            self.assertEqual(
+                performance["bytes_written"],
+                os.path.getsize(result.json_path) + os.path.getsize(result.txt_path),
+            )
+            for stage in ("validate", "fetch", "filter", "sort", "format", "write_json", "write_txt"):
+                self.assertIn(stage, performance["stages_seconds"])
+            self.assertNotIn("attachments", performance["stages_seconds"])
+
+    def test_execute_export_writes_trace_when_enabled(self) -> None:
+        from app.core.tracing import TRACE_ENV
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            options = ExportOptions(
+                channel_id="333",
+                before_dt=None,
+                after_dt=None,
+                export_json=False,
+                export_txt=True,
+                export_attachments=False,
+                include_edits=False,
+                include_pins=False,
+                include_replies=False,
+                output_root=tmpdir,
+                target_kind="dm",
+                dm_name="Fish",
+                guild_id=None,
+                guild_name=None,
+                category_id=None,
+                category_name=None,
+                channel_name=None,
+                export_label="",
+            )
+
+            with patch.dict(os.environ, {TRACE_ENV: "1"}), patch(
+                "app.workers.export_pipeline.DiscordClient", FakeDiscordClient
+            ):
+                result = execute_export("token", options)
+
+            with open(os.path.join(result.export_dir, "trace.json"), "r", encoding="utf-8") as handle:
+                names = {event["name"] for event in json.load(handle)["traceEvents"]}
+
+            self.assertIn("execute_export", names)
+            self.assertIn("fetch", names)
+            self.assertIn("write_txt", names)
+
+    def test_execute_export_writes_profile_reports_when_enabled(self) -> None:
+        from app.core.profiling import PROFILE_ENV
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            options = ExportOptions(
+                channel_id="333",
+                before_dt=None,
+                after_dt=None,
+                export_json=True,
+                export_txt=False,
+                export_attachments=False,
+                include_edits=False,
+                include_pins=False,
+                include_replies=False,
+                output_root=tmpdir,
+                target_kind="dm",
+                dm_name="Fish",
+                guild_id=None,
+                guild_name=None,
+                category_id=None,
+                category_name=None,
+                channel_name=None,
+                export_label="",
+            )
+
+            with patch.dict(os.environ, {PROFILE_ENV: "1"}), patch(
+                "app.workers.export_pipeline.DiscordClient", FakeDiscordClient
+            ):
+                result = execute_export("token", options)
+
+            for name in ("profile.prof", "profile.txt", "memory.snapshot", "memory.txt"):
+                self.assertTrue(os.path.exists(os.path.join(result.export_dir, name)), name)
+            self.assertEqual(os.path.dirname(result.metadata_path), result.export_dir)
+
     def test_attachment_export_uses_attachment_id_to_avoid_collisions(self) -> None:
         from app.core.exporter import export_attachments
 
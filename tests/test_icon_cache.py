@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _app():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
+
+
+def _png_bytes(size: int = 64, color: str = "#10b981") -> bytes:
+    from PySide6.QtCore import QBuffer, QByteArray, QIODevice
+    from PySide6.QtGui import QColor, QImage
+
+    image = QImage(size, size, QImage.Format_ARGB32)
+    image.fill(QColor(color))
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return bytes(data)
+
+
+def _pump_until(app, condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        app.processEvents()
+        if condition():
+            return True
+        time.sleep(0.005)
+    return condition()
+
+
+class _IconHandler(BaseHTTPRequestHandler):
+    payload = b""
+    requests: list = []
+    conditional: list = []
+    etag = '"v1"'
+    gate = threading.Event()
+
+    def do_GET(self) -> None:  # noqa: N802
+        type(self).requests.append(self.path)
+        type(self).conditional.append(self.headers.get("If-None-Match"))
+        if self.path.startswith("/slow"):
+            type(self).gate.wait(5)
+        if self.path.startswith(("/missing", "/flaky")):
+            self.send_response(404 if self.path.startswith("/missing") else 503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("ETag", self.etag)
+        self.send_header("Last-Modified", "Mon, 05 Oct 2026 10:00:00 GMT")
+        self.send_header("Content-Length", str(len(self.payload)))
+        self.end_headers()
+        self.wfile.write(self.payload)
+
+    def log_message(self, format, *args) -> None:  # noqa: A002
+        return
+
+
+class IconDecodeTests(unittest.TestCase):
+    def test_decode_scales_to_icon_size(self) -> None:
+        _app()
+        from PySide6.QtGui import QImage
+
+        from app.core.icon_cache import DEFAULT_ICON_SIZE, decode_icon_image
+
+        image = decode_icon_image(_png_bytes(64))
+        self.assertIsNotNone(image)
+        self.assertEqual((image.width(), image.height()), (DEFAULT_ICON_SIZE, DEFAULT_ICON_SIZE))
+        self.assertEqual(image.format(), QImage.Format_ARGB32_Premultiplied)
+
+    def test_decode_rejects_garbage(self) -> None:
+        _app()
+        from app.core.icon_cache import decode_icon_image
+
+        self.assertIsNone(decode_icon_image(b"not an image"))
+        self.assertIsNone(decode_icon_image(b""))
+
+    def test_decode_runs_off_gui_thread(self) -> None:
+        _app()
+        from app.core.icon_cache import decode_icon_image
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(decode_icon_image(_png_bytes(32))))
+        worker.start()
+        worker.join(timeout=5)
+        self.assertEqual(len(results), 1)
+        self.assertFalse(results[0].isNull())
+
+
+class IconVariantTests(unittest.TestCase):
+    def test_pixel_sizes_and_cdn_request_size(self) -> None:
+        from app.core.icon_cache import cdn_request_size, icon_pixel_sizes
+
+        self.assertEqual(icon_pixel_sizes(18, (1.0,)), (18,))
+        self.assertEqual(icon_pixel_sizes(18, (1.0, 2.0)), (18, 36))
+        self.assertEqual(icon_pixel_sizes(18, (1.0, 1.5, 0.5)), (18, 27))
+        self.assertEqual([cdn_request_size(pixels) for pixels in (10, 18, 32, 36, 5000)], [16, 32, 32, 64, 4096])
+
+    def test_variants_round_trip_and_build_hidpi_icon(self) -> None:
+        _app()
+        from app.core.icon_cache import decode_cached_variants, decode_icon_variants, encode_icon_variants, icon_from_variants
+
+        images = decode_icon_variants(_png_bytes(64), (18, 36))
+        self.assertEqual([image.width() for image in images], [18, 36])
+        restored = decode_cached_variants(encode_icon_variants(images))
+        self.assertEqual([image.width() for image in restored], [18, 36])
+        # Entries written before variants existed are a single PNG.
+        self.assertEqual([image.width() for image in decode_cached_variants(_png_bytes(64))], [18])
+        self.assertIsNone(decode_cached_variants(b"ACIV\x02\x00\x00"))
+
+        from PySide6.QtCore import QSize
+
+        icon = icon_from_variants(restored)
+        self.assertEqual(icon.pixmap(QSize(18, 18), 1.0).width(), 18)
+        self.assertEqual(icon.pixmap(QSize(18, 18), 2.0).width(), 36)
+
+
+class PlaceholderIconTests(unittest.TestCase):
+    def test_placeholders_are_painted_once_per_kind_size_and_ratio(self) -> None:
+        _app()
+        from unittest import mock
+
+        from PySide6.QtCore import QSize
+
+        from app.core import icon_cache
+
+        with mock.patch.dict(icon_cache._placeholder_icons, clear=True):
+            with mock.patch.object(icon_cache, "_paint_placeholder", wraps=icon_cache._paint_placeholder) as paint:
+                rows = [icon_cache.placeholder_channel_icon() for _ in range(500)]
+                self.assertTrue(all(icon is rows[0] for icon in rows))
+                self.assertIs(icon_cache.placeholder_dm_icon(), icon_cache.placeholder_icon("dm"))
+                self.assertIsNot(icon_cache.placeholder_guild_icon(), icon_cache.placeholder_category_icon())
+                self.assertIsNot(icon_cache.placeholder_icon("dm", 24), icon_cache.placeholder_dm_icon())
+                painted = paint.call_count
+
+                hidpi = icon_cache.placeholder_icon("guild", ratios=(2.0,))
+                self.assertEqual(paint.call_count, painted + 2)
+        self.assertEqual(painted, 5 * len(icon_cache.screen_pixel_ratios()))
+        self.assertEqual(hidpi.pixmap(QSize(18, 18), 2.0).width(), 36)
+
+    def test_placeholders_read_screens_once_until_they_change(self) -> None:
+        app = _app()
+        from unittest import mock
+
+        from PySide6.QtGui import QGuiApplication
+
+        from app.core import icon_cache
+
+        icon_cache.cached_screen_pixel_ratios()
+        with mock.patch.object(QGuiApplication, "screens", wraps=QGuiApplication.screens) as screens:
+            for _ in range(100):
+                icon_cache.placeholder_channel_icon()
+            self.assertEqual(screens.call_count, 0)
+
+            app.screenAdded.emit(app.primaryScreen())
+            icon_cache.placeholder_channel_icon()
+            icon_cache.placeholder_dm_icon()
+            self.assertEqual(screens.call_count, 1)
+
+
+class IconCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.app = _app()
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        _IconHandler.payload = _png_bytes(64)
+        _IconHandler.requests = []
+        _IconHandler.conditional = []
+        _IconHandler.etag = '"v1"'
+        _IconHandler.gate = threading.Event()
+        self.addCleanup(_IconHandler.gate.set)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _IconHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _cache(self, **kwargs):
+        from app.core.icon_cache import IconCache
+
+        cache = IconCache(cache_dir=self._tmp.name, **kwargs)
+        ready: dict = {}
+        cache.icon_ready.connect(lambda key, icon: ready.__setitem__(key, icon))
+        self.addCleanup(cache.close)
+        return cache, ready
+
+    def test_download_decodes_in_pool_and_persists(self) -> None:
+        from PySide6.QtGui import QIcon
+
+        cache, ready = self._cache()
+        cache.request_icon("guild:1", f"{self.base_url}/icons/1.png")
+        self.assertIsNone(cache.get_icon("guild:1"))
+        self.assertTrue(_pump_until(self.app, lambda: "guild:1" in ready))
+        self.assertIsInstance(ready["guild:1"], QIcon)
+        self.assertIs(cache.get_icon("guild:1"), ready["guild:1"])
+        entry = cache.disk_cache.lookup("guild:1")
+        self.assertIsNotNone(entry)
+        # The scaled icon is stored, not the full CDN payload.
+        self.assertLess(entry.size, len(_IconHandler.payload))
+        cache.close()
+
+        # A fresh cache instance is served from disk without another download.
+        second, second_ready = self._cache()
+        second.request_icon("guild:1", f"{self.base_url}/icons/1.png")
+        self.assertTrue(_pump_until(self.app, lambda: "guild:1" in second_ready))
+        self.assertEqual(len(_IconHandler.requests), 1)
+
+    def test_batch_request_serves_cached_icons_without_downloads(self) -> None:
+        keys = [f"guild:{index}" for index in range(10)]
+        first, first_ready = self._cache()
+        first.request_icons([(key, f"{self.base_url}/icons/{key}.png") for key in keys])
+        self.assertTrue(_pump_until(self.app, lambda: len(first_ready) == 10))
+        first.close()
+
+        cache, ready = self._cache()
+        cache.request_icons([(key, f"{self.base_url}/icons/{key}.png") for key in keys] + [("dm:none", None)])
+        self.assertTrue(_pump_until(self.app, lambda: len(ready) == 10 and not cache._in_flight))
+        self.assertEqual(len(_IconHandler.requests), 10)
+
+    def test_hidpi_cache_requests_matching_size_and_upgrades_low_dpi_entries(self) -> None:
+        url = f"{self.base_url}/avatars/7.png?size=32"
+        first, first_ready = self._cache(pixel_ratios=(1.0,))
+        self.assertEqual(first.request_size, 32)
+        first.request_icon("dm:7", url)
+        self.assertTrue(_pump_until(self.app, lambda: "dm:7" in first_ready))
+        first.close()
+
+        cache, ready = self._cache(pixel_ratios=(1.0, 2.0))
+        self.assertEqual(cache.pixel_sizes, (18, 36))
+        self.assertEqual(cache.request_size, 64)
+        hidpi_url = f"{self.base_url}/avatars/7.png?size={cache.request_size}"
+        emitted = []
+        cache.icon_ready.connect(lambda key, icon: emitted.append(icon))
+        cache.request_icon("dm:7", hidpi_url)
+        # The 1x entry shows at once, then a full download adds the 2x variant.
+        self.assertTrue(_pump_until(self.app, lambda: len(emitted) == 2 and not cache._in_flight))
+        self.assertEqual(_IconHandler.conditional[-1], None)
+        self.assertEqual(_IconHandler.requests[-1], "/avatars/7.png?size=64")
+        self.assertEqual(sorted(size.width() for size in ready["dm:7"].availableSizes()), [18, 36])
+        self.assertEqual(cache.disk_cache.lookup("dm:7").url, hidpi_url)
+
+    def test_downloads_reuse_keep_alive_connections(self) -> None:
+        from benchmarks.stub_cdn import StubCdn
+
+        with StubCdn(connect_latency=0) as cdn:
+            cdn.payload = _IconHandler.payload
+            cache, ready = self._cache(max_workers=2)
+            cache.request_icons([(f"dm:{index}", cdn.avatar_url(index)) for index in range(12)])
+            self.assertTrue(_pump_until(self.app, lambda: len(ready) == 12 and not cache._in_flight))
+            self.assertEqual(cdn.requests, 12)
+            # At most one connection per pool thread, including the spare disk-batch thread.
+            self.assertLessEqual(cdn.connections, 3)
+            cache.close()
+
+    def test_identical_urls_are_coalesced(self) -> None:
+        cache, ready = self._cache()
+        url = f"{self.base_url}/embed/avatars/1.png"
+        cache.request_icons([("dm:a", url), ("dm:b", url), ("dm:c", url)])
+        self.assertTrue(_pump_until(self.app, lambda: len(ready) == 3 and not cache._in_flight))
+        self.assertEqual(len(_IconHandler.requests), 1)
+        self.assertEqual(cache.stats.downloads, 1)
+        self.assertEqual(cache.stats.coalesced, 2)
+        # Every key is persisted against the single stored copy.
+        self.assertEqual(len({cache.disk_cache.lookup(key).offset for key in ("dm:a", "dm:b", "dm:c")}), 1)
+
+    def test_viewport_reorders_and_cancels_queued_downloads(self) -> None:
+        cache, ready = self._cache(max_workers=1)
+        cache.request_icon("busy", f"{self.base_url}/slow/busy.png")
+        self.assertTrue(_pump_until(self.app, lambda: cache.stats.downloads == 1))
+        cache.request_icons([(key, f"{self.base_url}/icons/{key}.png") for key in ("a", "b", "c", "d")])
+        self.assertTrue(_pump_until(self.app, lambda: cache.pending_downloads() == 4))
+
+        cache.update_viewport([("d", f"{self.base_url}/icons/d.png"), ("b", f"{self.base_url}/icons/b.png")])
+        self.assertEqual(cache.pending_downloads(), 2)
+        self.assertEqual(cache.stats.cancelled, 2)
+        _IconHandler.gate.set()
+        self.assertTrue(_pump_until(self.app, lambda: not cache._in_flight))
+        self.assertEqual(_IconHandler.requests, ["/slow/busy.png", "/icons/d.png", "/icons/b.png"])
+        self.assertEqual(sorted(ready), ["b", "busy", "d"])
+
+        # Cancelled keys are not cooled down and download once they scroll into view.
+        cache.update_viewport([("a", f"{self.base_url}/icons/a.png")])
+        self.assertTrue(_pump_until(self.app, lambda: "a" in ready))
+
+    def _prime(self, key: str, url: str) -> None:
+        first, first_ready = self._cache()
+        first.request_icon(key, url)
+        self.assertTrue(_pump_until(self.app, lambda: key in first_ready))
+        first.close()
+
+    def test_viewport_request_during_preload_still_downloads(self) -> None:
+        cache, ready = self._cache()
+        requests_ = [(f"dm:{index}", f"{self.base_url}/avatars/{index}.png") for index in range(3)]
+        # The preload's disk batch cannot report back before the event loop runs, so the viewport lands mid-read.
+        cache.request_icons(requests_, download=False)
+        cache.update_viewport(requests_)
+        self.assertTrue(_pump_until(self.app, lambda: len(ready) == 3 and not cache._in_flight))
+        self.assertEqual(len(_IconHandler.requests), 3)
+
+        # Keys the viewport never asked for stay preload-only.
+        cache.request_icons([("dm:9", f"{self.base_url}/avatars/9.png")], download=False)
+        cache.update_viewport(requests_)
+        self.assertTrue(_pump_until(self.app, lambda: not cache._in_flight))
+        self.assertNotIn("dm:9", ready)
+        self.assertEqual(len(_IconHandler.requests), 3)
+
+    def test_expired_entry_revalidates_with_304(self) -> None:
+        url = f"{self.base_url}/avatars/4.png"
+        self._prime("dm:4", url)
+        self.assertEqual(_IconHandler.conditional, [None])
+
+        cache, _ = self._cache(ttl_seconds=3600)
+        cache.disk_cache.lookup("dm:4").fetched_at = 0
+        emitted = []
+        cache.icon_ready.connect(lambda key, icon: emitted.append(key))
+        cache.request_icon("dm:4", url)
+        self.assertTrue(_pump_until(self.app, lambda: not cache._in_flight and emitted))
+        self.assertEqual(_IconHandler.conditional, [None, '"v1"'])
+        self.assertEqual(cache.stats.not_modified, 1)
+        self.assertEqual(emitted, ["dm:4"])
+        entry = cache.disk_cache.lookup("dm:4")
+        self.assertFalse(cache.disk_cache.is_stale(entry))
+        self.assertEqual((entry.etag, entry.last_modified), ('"v1"', "Mon, 05 Oct 2026 10:00:00 GMT"))
+
+    def test_changed_icon_is_replaced_in_place(self) -> None:
+        url = f"{self.base_url}/icons/5.png"
+        self._prime("guild:5", url)
+        _IconHandler.etag = '"v2"'
+        _IconHandler.payload = _png_bytes(64, "#ef4444")
+
+        cache, _ = self._cache(ttl_seconds=0)
+        emitted = []
+        cache.icon_ready.connect(lambda key, icon: emitted.append(icon))
+        cache.request_icon("guild:5", url)
+        self.assertTrue(_pump_until(self.app, lambda: not cache._in_flight and len(emitted) == 2))
+        self.assertEqual(_IconHandler.conditional[-1], '"v1"')
+        self.assertEqual(cache.disk_cache.lookup("guild:5").etag, '"v2"')
+        self.assertIs(cache.get_icon("guild:5"), emitted[-1])
+        self.assertEqual(cache.stats.not_modified, 0)
+
+    def test_preloaded_stale_icon_revalidates_when_visible(self) -> None:
+        url = f"{self.base_url}/avatars/6.png"
+        self._prime("dm:6", url)
+
+        cache, ready = self._cache(ttl_seconds=0)
+        cache.request_icons([("dm:6", url)], download=False)
+        self.assertTrue(_pump_until(self.app, lambda: "dm:6" in ready and not cache._in_flight))
+        self.assertEqual(len(_IconHandler.requests), 1)
+
+        cache.update_viewport([("dm:6", url)])
+        self.assertTrue(_pump_until(self.app, lambda: cache.stats.not_modified == 1 and not cache._in_flight))
+        self.assertEqual(_IconHandler.conditional[-1], '"v1"')
+
+    def test_missing_icon_backs_off_across_restarts(self) -> None:
+        url = f"{self.base_url}/missing.png"
+        cache, ready = self._cache()
+        cache.request_icon("dm:2", url)
+        self.assertTrue(_pump_until(self.app, lambda: not cache._in_flight and cache.disk_cache.failure(url)))
+        self.assertTrue(cache.disk_cache.failure(url).permanent)
+        cache.request_icon("dm:2", url)
+        self.assertEqual(cache.stats.avoided, 1)
+        with self.assertLogs("discordsorter.icons", level="INFO") as logs:
+            cache.close()
+        self.assertIn("avoided=1", logs.output[-1])
+
+        reopened, _ = self._cache()
+        reopened.request_icon("dm:2", url)
+        reopened.wait_for_pending(5000)
+        self.app.processEvents()
+        self.assertEqual(reopened.stats.avoided, 1)
+        self.assertEqual(ready, {})
+        self.assertEqual(len(_IconHandler.requests), 1)
+
+    def test_transient_failure_backs_off_then_recovers(self) -> None:
+        cache, ready = self._cache()
+        cache.request_icon("guild:9", f"{self.base_url}/flaky.png")
+        self.assertTrue(_pump_until(self.app, lambda: not cache._in_flight and cache.disk_cache.failure(f"{self.base_url}/flaky.png")))
+        failure = cache.disk_cache.failure(f"{self.base_url}/flaky.png")
+        self.assertFalse(failure.permanent)
+        self.assertEqual(failure.reason, "HTTP 503")
+        # A new icon hash is a new URL and is not held back by the old one's failure.
+        cache.request_icon("guild:9", f"{self.base_url}/icons/9.png")
+        self.assertTrue(_pump_until(self.app, lambda: "guild:9" in ready))
+        self.assertEqual(cache.stats.avoided, 0)
+
+    def test_disk_miss_without_url_does_not_cool_down(self) -> None:
+        cache, ready = self._cache()
+        cache.request_icon("dm:3", None)
+        self.assertTrue(_pump_until(self.app, lambda: not cache._in_flight))
+        self.assertEqual(ready, {})
+        cache.request_icon("dm:3", f"{self.base_url}/avatars/3.png")
+        self.assertTrue(_pump_until(self.app, lambda: "dm:3" in ready))
+
+
+class MainWindowIconViewportTests(unittest.TestCase):
+    def test_only_rows_near_the_viewport_request_downloads(self) -> None:
+        app = _app()
+        from benchmarks.corpus import generate_conversations
+
+        from app.core.icon_cache import IconCache
+        from app.ui.main_window import MainWindow
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            icon_cache = IconCache(cache_dir=os.path.join(tmpdir, "icons"))
+            window = MainWindow(default_export_root=tmpdir, logs_dir=tmpdir, icon_cache=icon_cache)
+            calls = []
+            window._icon_cache.request_icons = lambda requests_, download=True: calls.append((list(requests_), download))
+            window._icon_cache.update_viewport = lambda requests_: calls.append((list(requests_), "viewport"))
+            try:
+                window.resize(900, 600)
+                window.show()
+                payload = generate_conversations(2000)
+                window.on_conversations_loaded(payload)
+                self.assertTrue(_pump_until(app, lambda: any(kind == "viewport" for _, kind in calls)))
+            finally:
+                window.close()
+                window.deleteLater()
+                app.processEvents()
+                icon_cache.close()
+
+        preload = [requests_ for requests_, kind in calls if kind is False]
+        visible = [requests_ for requests_, kind in calls if kind == "viewport"][-1]
+        self.assertEqual(len(preload), 1)
+        self.assertGreater(len(preload[0]), 300)
+        self.assertTrue(visible)
+        self.assertLess(len(visible), len(preload[0]) // 4)
+        self.assertEqual(visible[0], preload[0][0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from app.core import icon_store
+from app.core.icon_store import INDEX_FILE_NAME, PACK_FILE_NAME, IconDiskCache
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class IconDiskCacheTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.clock = _Clock()
+
+    def _open(self, **kwargs) -> IconDiskCache:
+        cache = IconDiskCache(self._tmp.name, clock=self.clock, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def _pack_size(self) -> int:
+        return os.path.getsize(os.path.join(self._tmp.name, PACK_FILE_NAME))
+
+    def test_round_trip_and_reopen(self) -> None:
+        cache = self._open()
+        cache.put("dm:1", "https://cdn/a.png", b"abc")
+        payload, entry = cache.read("dm:1")
+        self.assertEqual(payload, b"abc")
+        self.assertEqual(entry.url, "https://cdn/a.png")
+        self.assertIsNone(cache.read("dm:2"))
+        cache.close()
+
+        reopened = self._open()
+        self.assertIn("dm:1", reopened)
+        self.assertEqual(reopened.total_bytes, 3)
+        self.assertEqual(reopened.read("dm:1")[0], b"abc")
+
+    def test_read_many_serves_batch_from_one_pack(self) -> None:
+        cache = self._open()
+        for index in range(50):
+            cache.put(f"k{index}", "", f"payload-{index}".encode())
+        cache.close()
+
+        reopened = self._open()
+        with mock.patch("builtins.open", side_effect=AssertionError("no per-icon open")):
+            found = reopened.read_many([f"k{index}" for index in range(60)])
+        self.assertEqual(len(found), 50)
+        self.assertEqual(found["k7"][0], b"payload-7")
+        self.assertEqual(os.listdir(self._tmp.name).count(PACK_FILE_NAME), 1)
+        self.assertFalse([name for name in os.listdir(self._tmp.name) if name.endswith(".img")])
+
+    def test_byte_budget_evicts_least_recently_used(self) -> None:
+        cache = self._open(max_bytes=10)
+        for key in ("a", "b", "c"):
+            cache.put(key, "", b"xxxx")
+            self.clock.now += 1
+        self.assertNotIn("a", cache)
+        self.clock.now += 1
+        cache.read("b")
+        cache.put("d", "", b"xxxx")
+        self.assertEqual(sorted(key for key in ("a", "b", "c", "d") if key in cache), ["b", "d"])
+        self.assertLessEqual(cache.total_bytes, 10)
+
+    def test_access_times_survive_reopen(self) -> None:
+        cache = self._open(max_bytes=100)
+        cache.put("old", "", b"1")
+        self.clock.now += 10
+        cache.put("new", "", b"2")
+        self.clock.now += 10
+        cache.read("old")
+        cache.close()
+
+        reopened = self._open(max_bytes=1)
+        self.assertIn("old", reopened)
+        self.assertNotIn("new", reopened)
+
+    def test_ttl_marks_entries_stale(self) -> None:
+        cache = self._open(ttl_seconds=60)
+        entry = cache.put("k", "", b"1")
+        self.assertFalse(cache.is_stale(entry))
+        self.clock.now += 61
+        self.assertTrue(cache.is_stale(entry))
+        cache.touch_fetched("k")
+        self.assertFalse(cache.is_stale(cache.lookup("k")))
+
+    def test_validators_persist_and_refresh_on_revalidation(self) -> None:
+        cache = self._open(ttl_seconds=60)
+        cache.put_many(["a", "b"], "https://cdn/x.png", b"img", etag='"v1"', last_modified="Mon, 05 Oct 2026 10:00:00 GMT")
+        cache.put("c", "https://cdn/other.png", b"img")
+        self.clock.now += 120
+
+        touched = cache.touch_fetched_many(["a", "b", "c"], url="https://cdn/x.png", etag='"v2"')
+        self.assertEqual(touched, 2)
+        self.assertTrue(cache.is_stale(cache.lookup("c")))
+        cache.close()
+
+        reopened = self._open(ttl_seconds=60)
+        entry = reopened.lookup("b")
+        self.assertFalse(reopened.is_stale(entry))
+        self.assertEqual((entry.etag, entry.last_modified), ('"v2"', "Mon, 05 Oct 2026 10:00:00 GMT"))
+
+    def test_failures_back_off_exponentially_and_persist(self) -> None:
+        cache = self._open(ttl_seconds=30 * 24 * 60 * 60)
+        url = "https://cdn/flaky.png"
+        first = cache.record_failure(url, reason="ConnectTimeout")
+        self.assertEqual(first.retry_at - self.clock.now, icon_store.FAILURE_BACKOFF_BASE_SECONDS)
+        self.assertTrue(cache.is_blocked(url))
+        second = cache.record_failure(url, reason="HTTP 503")
+        self.assertEqual(second.attempts, 2)
+        self.assertEqual(second.retry_at - self.clock.now, 2 * icon_store.FAILURE_BACKOFF_BASE_SECONDS)
+        for _ in range(20):
+            capped = cache.record_failure(url)
+        self.assertEqual(capped.retry_at - self.clock.now, icon_store.FAILURE_BACKOFF_MAX_SECONDS)
+        gone = cache.record_failure("https://cdn/gone.png", permanent=True, reason="HTTP 404")
+        self.assertEqual(gone.retry_at - self.clock.now, cache.ttl_seconds)
+        cache.close()
+
+        reopened = self._open(ttl_seconds=30 * 24 * 60 * 60)
+        self.assertTrue(reopened.is_blocked(url))
+        self.assertEqual(reopened.failure("https://cdn/gone.png").reason, "HTTP 404")
+        self.assertTrue(reopened.failure("https://cdn/gone.png").permanent)
+        self.clock.now += icon_store.FAILURE_BACKOFF_MAX_SECONDS
+        self.assertFalse(reopened.is_blocked(url))
+        self.assertTrue(reopened.is_blocked("https://cdn/gone.png"))
+        self.assertTrue(reopened.clear_failure(url))
+        self.assertFalse(reopened.clear_failure(url))
+        self.assertIsNone(reopened.failure(url))
+
+    def test_long_expired_failures_are_forgotten_on_open(self) -> None:
+        cache = self._open(ttl_seconds=60)
+        cache.record_failure("https://cdn/flaky.png")
+        cache.close()
+        self.clock.now += icon_store.FAILURE_BACKOFF_BASE_SECONDS + 61
+        reopened = self._open(ttl_seconds=60)
+        self.assertIsNone(reopened.failure("https://cdn/flaky.png"))
+
+    def test_writes_remap_lazily_once_per_read_batch(self) -> None:
+        cache = self._open()
+        with mock.patch.object(cache, "_remap", wraps=cache._remap) as remap:
+            for index in range(50):
+                cache.put(f"k{index}", "", bytes([index]) * 10)
+            self.assertEqual(remap.call_count, 0)
+            found = cache.read_many([f"k{index}" for index in range(50)])
+            self.assertEqual(remap.call_count, 1)
+        self.assertEqual(found["k7"][0], bytes([7]) * 10)
+        self.assertEqual(found["k49"][0], bytes([49]) * 10)
+
+    def test_compaction_reclaims_evicted_bytes(self) -> None:
+        with mock.patch.object(icon_store, "COMPACT_MIN_DEAD_BYTES", 0):
+            cache = self._open(max_bytes=40)
+            for index in range(20):
+                cache.put(f"k{index}", "", bytes([index]) * 10)
+                self.clock.now += 1
+            # Automatic compaction keeps dead bytes from outgrowing live ones.
+            self.assertLessEqual(cache.pack_bytes, 2 * cache.total_bytes)
+            cache.compact()
+            self.assertEqual(cache.pack_bytes, cache.total_bytes)
+            self.assertEqual(self._pack_size(), 40)
+            self.assertEqual(cache.read("k19")[0], bytes([19]) * 10)
+            cache.close()
+
+        reopened = self._open(max_bytes=40)
+        self.assertEqual(sorted(reopened.read_many([f"k{index}" for index in range(20)])), ["k16", "k17", "k18", "k19"])
+        self.assertEqual(reopened.read("k16")[0], bytes([16]) * 10)
+
+    def test_truncated_pack_drops_unbacked_entries(self) -> None:
+        cache = self._open()
+        cache.put("a", "", b"aaaa")
+        cache.put("b", "", b"bbbb")
+        cache.close()
+        with open(os.path.join(self._tmp.name, PACK_FILE_NAME), "r+b") as handle:
+            handle.truncate(6)
+
+        reopened = self._open()
+        self.assertEqual(reopened.read("a")[0], b"aaaa")
+        self.assertNotIn("b", reopened)
+
+    def test_legacy_layout_is_discarded(self) -> None:
+        legacy = os.path.join(self._tmp.name, "deadbeef.img")
+        with open(legacy, "wb") as handle:
+            handle.write(b"legacy")
+        db = sqlite3.connect(os.path.join(self._tmp.name, INDEX_FILE_NAME))
+        db.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, url TEXT, size INTEGER, fetched_at REAL, last_access REAL)")
+        db.execute("INSERT INTO entries VALUES ('k', '', 6, 0, 0)")
+        db.commit()
+        db.close()
+
+        cache = self._open()
+        self.assertFalse(os.path.exists(legacy))
+        self.assertEqual(len(cache), 0)
+        cache.put("k", "", b"fresh")
+        self.assertEqual(cache.read("k")[0], b"fresh")
+
+
+if __name__ == "__main__":
+    unittest.main()
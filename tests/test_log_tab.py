@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import unittest
+from datetime import datetime
+
+
+def _entries(*messages: str):
+    from app.ui.log_tab import LogEntry
+
+    now = datetime(2026, 5, 5, 10, 30, 45)
+    return [
+        LogEntry(
+            timestamp=now,
+            timestamp_str="05-05-2026 10:30:45",
+            level="INFO",
+            levelno=20,
+            message=message,
+        )
+        for message in messages
+    ]
+
+
+class LogTableModelTests(unittest.TestCase):
+    def test_ring_buffer_evicts_oldest_entries_in_order(self) -> None:
+        from app.ui.log_tab import LogTableModel
+
+        model = LogTableModel(max_entries=3)
+        model.append_entries(_entries("a", "b"))
+        model.append_entries(_entries("c", "d"))
+        model.append_entries(_entries("e"))
+
+        self.assertEqual(model.rowCount(), 3)
+        self.assertEqual([entry.message for entry in model.entries()], ["c", "d", "e"])
+        self.assertEqual(model.entry(0).message, "c")
+
+    def test_batch_larger_than_capacity_keeps_newest(self) -> None:
+        from app.ui.log_tab import LogTableModel
+
+        model = LogTableModel(max_entries=2)
+        model.append_entries(_entries("a"))
+        model.append_entries(_entries("b", "c", "d"))
+
+        self.assertEqual([entry.message for entry in model.entries()], ["c", "d"])
+
+    def test_set_capacity_and_clear(self) -> None:
+        from app.ui.log_tab import LogTableModel
+
+        model = LogTableModel(max_entries=4)
+        model.append_entries(_entries("a", "b", "c", "d", "e"))
+        model.set_capacity(2)
+        self.assertEqual([entry.message for entry in model.entries()], ["d", "e"])
+
+        model.clear()
+        self.assertEqual(model.rowCount(), 0)
+        model.append_entries(_entries("f"))
+        self.assertEqual(model.entry(0).message, "f")
+
+
+class LogFilterProxyModelTests(unittest.TestCase):
+    def _proxy(self, *messages: str):
+        from app.ui.log_tab import LogFilterProxyModel, LogTableModel
+
+        model = LogTableModel(max_entries=10)
+        model.append_entries(_entries(*messages))
+        proxy = LogFilterProxyModel()
+        proxy.setSourceModel(model)
+        return model, proxy
+
+    def _visible(self, model, proxy) -> list[str]:
+        return [
+            model.entry(proxy.mapToSource(proxy.index(row, 0)).row()).message
+            for row in range(proxy.rowCount())
+        ]
+
+    def test_multi_term_query_requires_every_term(self) -> None:
+        model, proxy = self._proxy("Fetching messages", "Export finished", "Fetching icons")
+        proxy.set_text_filter("fetch icons")
+        self.assertEqual(self._visible(model, proxy), ["Fetching icons"])
+
+    def test_narrowing_query_matches_full_refilter(self) -> None:
+        model, proxy = self._proxy("API request GET", "API error", "Export finished")
+        proxy.set_text_filter("api")
+        proxy.set_text_filter("api req")
+        self.assertEqual(self._visible(model, proxy), ["API request GET"])
+
+        proxy.set_text_filter("api")
+        self.assertEqual(self._visible(model, proxy), ["API request GET", "API error"])
+
+    def test_regex_query(self) -> None:
+        model, proxy = self._proxy("Batch item 1/3", "Batch item 12/30", "Batch started")
+        proxy.set_text_filter(r"/item \d+/3$/")
+        self.assertEqual(self._visible(model, proxy), ["Batch item 1/3"])
+
+
+class QtLogHandlerTests(unittest.TestCase):
+    def test_records_are_buffered_and_signalled_once_per_batch(self) -> None:
+        import logging
+
+        from app.ui.log_tab import QtLogHandler
+
+        handler = QtLogHandler(max_pending=10)
+        signals: list[bool] = []
+        handler.entries_available.connect(lambda: signals.append(True))
+        logger = logging.getLogger("discordsorter.tests.log_tab")
+        logger.propagate = False
+        logger.setLevel(logging.DEBUG)
+        logger.addHandler(handler)
+        try:
+            logger.debug("first %s", 1)
+            try:
+                raise ValueError("boom")
+            except ValueError:
+                logger.exception("second")
+        finally:
+            logger.removeHandler(handler)
+
+        self.assertEqual(len(signals), 1)
+        entries = handler.drain()
+        self.assertEqual([entry.level for entry in entries], ["DEBUG", "ERROR"])
+        self.assertEqual(entries[0].message, "first 1")
+        self.assertIn("ValueError: boom", entries[1].message)
+        self.assertEqual(handler.drain(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
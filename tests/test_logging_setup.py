@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+import logging
+import unittest
+
+
+class LoggingSetupTests(unittest.TestCase):
+    def test_parse_level_spec_ignores_invalid_entries(self) -> None:
+        from app.core.logging_setup import parse_level_spec
+
+        levels = parse_level_spec("api=info, Export=DEBUG,icons=loud,batch,=WARNING")
+
+        self.assertEqual(levels, {"api": logging.INFO, "export": logging.DEBUG})
+
+    def test_apply_subsystem_levels_sets_every_mapped_logger(self) -> None:
+        from app.core.logging_setup import apply_subsystem_levels
+
+        names = ("discordsorter.export", "discordsorter.exporter", "discordsorter.formatter")
+        previous = {name: logging.getLogger(name).level for name in names}
+        try:
+            apply_subsystem_levels({"export": "WARNING"})
+            for name in names:
+                self.assertEqual(logging.getLogger(name).level, logging.WARNING)
+        finally:
+            for name, level in previous.items():
+                logging.getLogger(name).setLevel(level)
+
+    def test_hot_path_sampler_emits_one_in_every_n(self) -> None:
+        from app.core.logging_setup import HotPathSampler
+
+        sampler = HotPathSampler("discordsorter.tests.sampler", every=5)
+        logger = logging.getLogger("discordsorter.tests.sampler")
+        logger.setLevel(logging.DEBUG)
+        with self.assertLogs(logger, level=logging.DEBUG) as captured:
+            for idx in range(12):
+                sampler.debug("API request %s", idx)
+
+        self.assertEqual(len(captured.records), 3)
+        self.assertEqual(sampler.suppressed, 9)
+        self.assertIn("API request 5", captured.records[1].getMessage())
+
+    def test_json_lines_formatter_includes_extra_fields(self) -> None:
+        from app.core.logging_setup import JsonLinesFormatter
+
+        record = logging.LogRecord("discordsorter.api", logging.INFO, __file__, 1, "GET %s", ("/users/@me",), None)
+        record.status_code = 200
+
+        payload = json.loads(JsonLinesFormatter().format(record))
+
+        self.assertEqual(payload["logger"], "discordsorter.api")
+        self.assertEqual(payload["message"], "GET /users/@me")
+        self.assertEqual(payload["status_code"], 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import dataclasses
+import logging
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from app.core.discord_client import DiscordAPIError
+from app.core.message_filters import (
+    FilterSyntaxError,
+    MessageSearchFilter,
+    compile_message_filter,
+    parse_id_list,
+    search_hits,
+    snowflake_from_datetime,
+)
+from app.core.metrics import RequestStats
+from app.core.models import ExportOptions
+from app.workers.export_pipeline import _message_pages, execute_export
+
+
+def _message(message_id: str, *, author: str = "1", content: str = "", **extra) -> dict:
+    return {"id": message_id, "author": {"id": author}, "content": content, **extra}
+
+
+class MessageSearchFilterTests(unittest.TestCase):
+    def test_create_normalizes_ids_has_and_content(self) -> None:
+        search = MessageSearchFilter.create(
+            author_ids="<@123>, 456 123",
+            mention_ids=["789"],
+            has=["File", "link"],
+            content="  release   notes ",
+        )
+
+        self.assertEqual(search.author_ids, ("123", "456"))
+        self.assertEqual(search.mention_ids, ("789",))
+        self.assertEqual(search.has, ("attachment", "link"))
+        self.assertEqual(search.content, "release notes")
+        self.assertTrue(MessageSearchFilter.create().is_empty())
+
+    def test_create_rejects_invalid_values(self) -> None:
+        with self.assertRaises(ValueError):
+            parse_id_list("fish")
+        with self.assertRaises(ValueError):
+            MessageSearchFilter.create(has=["sticker"])
+
+    def test_search_params_map_to_guild_search_endpoint(self) -> None:
+        search = MessageSearchFilter.create(author_ids="1 2", has=["attachment", "embed"], content="hi")
+
+        params = search.search_params(channel_id="9", min_id="10", max_id="20")
+
+        self.assertEqual(params["author_id"], ["1", "2"])
+        self.assertEqual(params["has"], ["file", "embed"])
+        self.assertEqual(params["content"], "hi")
+        self.assertEqual((params["channel_id"], params["min_id"], params["max_id"]), ("9", "10", "20"))
+        self.assertNotIn("mentions", params)
+
+    def test_matches_applies_every_condition(self) -> None:
+        search = MessageSearchFilter.create(author_ids="7", mention_ids="8", has=["link"], content="Deploy")
+        matching = _message(
+            "1", author="7", content="deploy at https://example.com today", mentions=[{"id": "8"}]
+        )
+
+        self.assertTrue(search.matches(matching))
+        self.assertFalse(search.matches({**matching, "author": {"id": "6"}}))
+        self.assertFalse(search.matches({**matching, "mentions": []}))
+        self.assertFalse(search.matches({**matching, "content": "deploy later"}))
+        self.assertFalse(search.matches({**matching, "content": "see https://example.com"}))
+
+    def test_matches_attachment_and_embed(self) -> None:
+        search = MessageSearchFilter.create(has=["attachment", "embed"])
+
+        self.assertTrue(search.matches(_message("1", attachments=[{}], embeds=[{}])))
+        self.assertFalse(search.matches(_message("1", attachments=[{}], embeds=[])))
+
+    def test_search_hits_picks_hit_from_context_groups(self) -> None:
+        payload = {
+            "messages": [
+                [{"id": "5"}, {"id": "6", "hit": True}],
+                [{"id": "9", "hit": True}],
+            ]
+        }
+
+        self.assertEqual([hit["id"] for hit in search_hits(payload)], ["9", "6"])
+        self.assertEqual(search_hits(None), [])
+
+    def test_snowflake_from_datetime(self) -> None:
+        moment = datetime(2015, 1, 1, 0, 0, 1, tzinfo=timezone.utc)
+
+        self.assertEqual(snowflake_from_datetime(moment), str(1000 << 22))
+
+
+class MessageFilterExpressionTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.message = _message(
+            "1",
+            author="7",
+            content="Release notes: https://example.com/v2",
+            type=19,
+            pinned=True,
+            edited_timestamp=None,
+            message_reference={"message_id": "0"},
+            attachments=[{"id": "a"}],
+            embeds=[],
+            reactions=[{"count": 2}, {"count": 1}],
+        )
+
+    def _check(self, expression: str) -> bool:
+        return compile_message_filter(expression)(self.message)
+
+    def test_terms(self) -> None:
+        self.assertTrue(self._check("author:5,7"))
+        self.assertFalse(self._check("from:5"))
+        self.assertTrue(self._check("content:/notes?:/"))
+        self.assertFalse(self._check("content:/release/"))
+        self.assertTrue(self._check("/release/i"))
+        self.assertTrue(self._check('"release notes"'))
+        self.assertTrue(self._check("type:reply"))
+        self.assertTrue(self._check("type:0,19"))
+        self.assertTrue(self._check("is:pinned is:reply -is:edited"))
+        self.assertTrue(self._check("has:attachment has:link has:reaction"))
+        self.assertFalse(self._check("has:embed"))
+        self.assertTrue(self._check("reactions:>=3"))
+        self.assertFalse(self._check("reactions:4"))
+
+    def test_quoted_phrases_and_urls_with_colons_are_content(self) -> None:
+        self.assertTrue(self._check('"https://example.com/v2"'))
+        self.assertTrue(self._check('"Release notes: https"'))
+        self.assertFalse(self._check('"note: missing"'))
+        self.assertTrue(self._check("https://example.com/v2"))
+        self.assertTrue(self._check("(https://example.com/v2 or has:embed) is:pinned"))
+        self.assertFalse(self._check("https://example.com/v3"))
+        self.assertTrue(self._check("content:https://example.com"))
+
+    def test_boolean_operators_and_precedence(self) -> None:
+        self.assertTrue(self._check("author:1 or author:7 and is:pinned"))
+        self.assertFalse(self._check("(author:1 or author:7) and has:embed"))
+        self.assertTrue(self._check("not (has:embed or is:edited)"))
+        self.assertTrue(self._check("AUTHOR:7 AND NOT has:embed"))
+
+    def test_invalid_expressions_raise(self) -> None:
+        for expression in ("", "(author:7", "author:", "colour:red", "and is:pinned", "is:deleted", "content:/[/"):
+            with self.subTest(expression=expression), self.assertRaises(FilterSyntaxError):
+                compile_message_filter(expression)
+
+
+def _timestamp(day: int) -> str:
+    return (datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(days=day)).isoformat()
+
+
+class _PagedClient:
+    def __init__(self, token: str):
+        # Newest first, one message per day, every third message pinned.
+        self.pages = [
+            [
+                _message(str(day), content=f"day {day}", timestamp=_timestamp(day), pinned=day % 3 == 0, attachments=[])
+                for day in range(start, start - 10, -1)
+            ]
+            for start in (39, 29, 19, 9)
+        ]
+        self.calls = 0
+        self.stats = RequestStats()
+
+    def validate_token(self) -> None:
+        return None
+
+    def get_channel_messages(self, channel_id: str, before_id=None, limit: int = 100):
+        self.calls += 1
+        return self.pages[self.calls - 1] if self.calls <= len(self.pages) else []
+
+    def close(self) -> None:
+        return None
+
+
+class FilteredExportTests(unittest.TestCase):
+    def test_predicate_drops_messages_during_fetch_and_keeps_after_stop(self) -> None:
+        clients = []
+
+        def make_client(token: str) -> _PagedClient:
+            clients.append(_PagedClient(token))
+            return clients[-1]
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            options = ExportOptions(
+                channel_id="9",
+                before_dt=None,
+                after_dt=datetime.fromisoformat(_timestamp(25)),
+                export_json=True,
+                export_txt=False,
+                export_attachments=False,
+                include_edits=True,
+                include_pins=True,
+                include_replies=True,
+                output_root=tmpdir,
+                target_kind="dm",
+                dm_name="Fish",
+                guild_id=None,
+                guild_name=None,
+                category_id=None,
+                category_name=None,
+                channel_name=None,
+                export_label="",
+                message_filter="is:pinned",
+            )
+            with patch("app.workers.export_pipeline.DiscordClient", make_client):
+                result = execute_export("token", options)
+
+            with self.assertRaises(FilterSyntaxError), patch("app.workers.export_pipeline.DiscordClient", make_client):
+                execute_export("token", dataclasses.replace(options, message_filter="is:"))
+
+        self.assertEqual([message["id"] for message in result.messages], ["27", "30", "33", "36", "39"])
+        # Page two crosses after_dt, so the fetch stops before pages three and four.
+        self.assertEqual(clients[0].calls, 2)
+        self.assertEqual(len(clients), 1)
+
+
+class _NoSearchClient:
+    def search_guild_messages(self, guild_id: str, params: dict) -> dict:
+        raise DiscordAPIError("Missing Access", 403)
+
+    def get_channel_messages(self, channel_id: str, before_id=None, limit: int = 100):
+        return [_message("2"), _message("1")] if before_id is None else []
+
+
+class MessagePagesTests(unittest.TestCase):
+    def test_forbidden_search_falls_back_to_client_side_paging(self) -> None:
+        options = ExportOptions(
+            channel_id="9",
+            before_dt=None,
+            after_dt=None,
+            export_json=True,
+            export_txt=False,
+            export_attachments=False,
+            include_edits=True,
+            include_pins=True,
+            include_replies=True,
+            output_root=".",
+            target_kind="guild",
+            dm_name=None,
+            guild_id="5",
+            guild_name="Server",
+            category_id=None,
+            category_name=None,
+            channel_name="general",
+            export_label="",
+            search=MessageSearchFilter.create(author_ids="1"),
+        )
+
+        logger = logging.getLogger("discordsorter.export")
+        with self.assertLogs("discordsorter.export", level="WARNING"):
+            pages = list(_message_pages(_NoSearchClient(), options, options.search, logger))
+
+        self.assertEqual(pages, [([_message("2"), _message("1")], False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import unittest
+
+
+def _message(message_id: int, content: str) -> dict:
+    return {
+        "id": str(message_id),
+        "timestamp": "2026-01-10T12:00:00.000000+00:00",
+        "content": content,
+        "author": {"username": "Fish", "discriminator": "1234"},
+        "attachments": [],
+    }
+
+
+class _FakeChannelClient:
+    def __init__(self, messages: list[dict]):
+        self.messages = messages
+        self.calls: list[dict] = []
+
+    def get_channel_messages(self, channel_id: str, before_id=None, limit: int = 100, *, after_id=None):
+        self.calls.append({"after": after_id, "limit": limit})
+        ordered = sorted(self.messages, key=lambda m: int(m["id"]))
+        if after_id is None:
+            return list(reversed(ordered))[:limit]
+        newer = [m for m in ordered if int(m["id"]) > int(after_id)][:limit]
+        return list(reversed(newer))
+
+
+class SyncDaemonTests(unittest.TestCase):
+    def _daemon(self, client, tmpdir: str, **kwargs):
+        from app.workers.sync_daemon import SyncDaemon, WatchedChannel, WatchList
+
+        watch_list = WatchList()
+        watch_list.add(WatchedChannel(channel_id="42", dm_name="Fish"))
+        state_path = os.path.join(tmpdir, "watchlist.json")
+        daemon = SyncDaemon(
+            client,
+            watch_list,
+            state_path=state_path,
+            mirror_root=tmpdir,
+            min_interval=10,
+            max_interval=40,
+            clock=lambda: 1000.0,
+            **kwargs,
+        )
+        return daemon, watch_list, state_path
+
+    def test_new_channel_starts_after_latest_message_and_appends_only_newer(self) -> None:
+        from app.workers.sync_daemon import WatchList
+
+        client = _FakeChannelClient([_message(1, "old"), _message(2, "older latest")])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            daemon, watch_list, state_path = self._daemon(client, tmpdir)
+
+            self.assertEqual(daemon.run_once(), 0)
+            channel = watch_list.channels["42"]
+            self.assertEqual(channel.high_water_id, "2")
+            self.assertEqual(channel.interval_seconds, 15)
+
+            client.messages.extend([_message(3, "new one"), _message(4, "new two")])
+            self.assertEqual(daemon.run_once(), 2)
+            self.assertEqual(channel.high_water_id, "4")
+            self.assertEqual(channel.interval_seconds, 10)
+            self.assertEqual(channel.next_poll_at, 1010.0)
+
+            mirror_dir = os.path.join(tmpdir, "DMs", "Fish [channel_42]")
+            with open(os.path.join(mirror_dir, "messages.jsonl"), "r", encoding="utf-8") as handle:
+                ids = [json.loads(line)["id"] for line in handle]
+            self.assertEqual(ids, ["3", "4"])
+            with open(os.path.join(mirror_dir, "messages.txt"), "r", encoding="utf-8") as handle:
+                text = handle.read()
+            self.assertLess(text.index("new one"), text.index("new two"))
+
+            reloaded = WatchList.load(state_path)
+            self.assertEqual(reloaded.channels["42"].high_water_id, "4")
+            self.assertEqual(reloaded.channels["42"].messages_mirrored, 2)
+
+    def test_replies_without_referenced_message_resolve_from_batch_and_mirror(self) -> None:
+        client = _FakeChannelClient([_message(1, "before watching")])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            daemon, _, _ = self._daemon(client, tmpdir, backfill=True)
+            self.assertEqual(daemon.run_once(), 1)
+
+            same_batch_parent = _message(2, "parent in batch")
+            reply_to_batch = {**_message(3, "reply one"), "message_reference": {"message_id": "2"}}
+            reply_to_mirror = {**_message(4, "reply two"), "message_reference": {"message_id": "1"}}
+            client.messages.extend([same_batch_parent, reply_to_batch, reply_to_mirror])
+            with self.assertNoLogs("discordsorter.formatter", level="WARNING"):
+                self.assertEqual(daemon.run_once(), 3)
+
+            with open(os.path.join(tmpdir, "DMs", "Fish [channel_42]", "messages.txt"), "r", encoding="utf-8") as handle:
+                text = handle.read()
+            self.assertIn("(Replying to Fish#1234: parent in batch)\nreply one", text)
+            self.assertIn("(Replying to Fish#1234: before watching)\nreply two", text)
+            self.assertNotIn("Original message not found", text)
+
+    def test_backfill_pages_forward_through_full_history(self) -> None:
+        client = _FakeChannelClient([_message(idx, f"m{idx}") for idx in range(1, 251)])
+        with tempfile.TemporaryDirectory() as tmpdir:
+            daemon, watch_list, _ = self._daemon(client, tmpdir, backfill=True)
+
+            self.assertEqual(daemon.run_once(), 250)
+
+        self.assertEqual(watch_list.channels["42"].high_water_id, "250")
+        self.assertEqual([call["after"] for call in client.calls], ["0", "100", "200"])
+
+
+if __name__ == "__main__":
+    unittest.main()
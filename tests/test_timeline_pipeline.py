@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import dataclasses
+import gc
+import json
+import logging
+import os
+import tempfile
+import tracemalloc
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.core.discord_client import BASE_URL_ENV
+from app.core.message_filters import MessageSearchFilter
+from app.core.metrics import RequestStats
+from app.core.models import ExportOptions
+from app.workers.batch_pipeline import BatchExportTarget
+from app.workers.export_pipeline import ExportCancelled
+from app.workers.timeline_pipeline import run_timeline_export
+from benchmarks.corpus import CorpusClient, generate_messages
+from tests.fake_discord_server import FakeDiscordServer, FakeDiscordState
+
+
+def _target(channel_id: str, label: str, output_root: str, **overrides) -> BatchExportTarget:
+    options = ExportOptions(
+        channel_id=channel_id,
+        before_dt=None,
+        after_dt=None,
+        export_json=True,
+        export_txt=True,
+        export_attachments=False,
+        include_edits=True,
+        include_pins=True,
+        include_replies=True,
+        output_root=output_root,
+        target_kind="dm",
+        dm_name=label,
+        guild_id=None,
+        guild_name=None,
+        category_id=None,
+        category_name=None,
+        channel_name=None,
+        export_label="",
+    )
+    return BatchExportTarget(stable_id=f"dm:{channel_id}", label=label, options=dataclasses.replace(options, **overrides))
+
+
+class _MultiCorpusClient:
+    def __init__(self, corpora: dict):
+        self._clients = {channel_id: CorpusClient(messages) for channel_id, messages in corpora.items()}
+        self.stats = RequestStats()
+
+    def validate_token(self) -> None:
+        return None
+
+    def get_channel_messages(self, channel_id: str, before_id=None, limit: int = 100, *, after_id=None):
+        self.stats.api_calls += 1
+        return self._clients[channel_id].get_channel_messages(channel_id, before_id, limit, after_id=after_id)
+
+    def close(self) -> None:
+        return None
+
+
+class TimelineExportTests(unittest.TestCase):
+    def test_merges_channels_chronologically_over_http(self) -> None:
+        with FakeDiscordServer() as server, tempfile.TemporaryDirectory() as tmpdir:
+            server.add_channel("10", 250, seconds_between_messages=60)
+            server.add_channel("20", 130, seconds_between_messages=97)
+            server.add_channel("30", 0)
+            targets = [
+                _target("10", "Alpha", tmpdir),
+                _target("20", "Beta", tmpdir, after_dt=datetime(2026, 1, 1, 1, 0, tzinfo=timezone.utc)),
+                _target("30", "Empty", tmpdir),
+            ]
+
+            with patch.dict(os.environ, {BASE_URL_ENV: server.api_base_url}):
+                result = run_timeline_export(server.state.token, targets, output_root=tmpdir, label="Incident 7")
+
+            with open(result.jsonl_path, "r", encoding="utf-8") as handle:
+                records = [json.loads(line) for line in handle]
+            with open(result.txt_path, "r", encoding="utf-8") as handle:
+                text = handle.read()
+            with open(result.metadata_path, "r", encoding="utf-8") as handle:
+                metadata = json.load(handle)
+
+        self.assertIn(os.path.join("Timelines", "timeline_"), result.export_dir)
+        self.assertTrue(result.export_dir.endswith("_incident_7"))
+        # Beta starts at 01:00, i.e. after its first 38 messages (97s apart).
+        self.assertEqual(result.channel_counts, {"Alpha": 250, "Beta": 92, "Empty": 0})
+        timestamps = [record["message"]["timestamp"] for record in records]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertEqual({record["channel"]["label"] for record in records}, {"Alpha", "Beta"})
+        self.assertEqual(text.count("\n\n[Alpha] ") + text.startswith("[Alpha] "), 250)
+        self.assertEqual(text.count("\n\n[Beta] "), 92)
+        self.assertEqual(metadata["message_count"], 342)
+        self.assertEqual([channel["message_count"] for channel in metadata["channels"]], [250, 92, 0])
+
+    def test_guild_channels_use_ascending_search(self) -> None:
+        state = FakeDiscordState()
+        with FakeDiscordServer(state) as server, tempfile.TemporaryDirectory() as tmpdir:
+            server.add_channel("10", 400, attachment_every=10, guild_id="50")
+            server.add_channel("20", 60)
+            search = MessageSearchFilter.create(author_ids="1000", has=["attachment"])
+            targets = [
+                _target("10", "Guild", tmpdir, target_kind="guild", guild_id="50", search=search),
+                _target("20", "DM", tmpdir),
+            ]
+            with patch.dict(os.environ, {BASE_URL_ENV: server.api_base_url}):
+                result = run_timeline_export(state.token, targets, output_root=tmpdir, write_txt=False)
+            with open(result.jsonl_path, "r", encoding="utf-8") as handle:
+                records = [json.loads(line) for line in handle]
+
+        guild = [record["message"] for record in records if record["channel"]["id"] == "10"]
+        # Author 1000 posts every 5th message and attachments land on every 10th.
+        self.assertEqual(result.channel_counts, {"Guild": 40, "DM": 60})
+        self.assertTrue(all(message["author"]["id"] == "1000" and message["attachments"] for message in guild))
+        self.assertEqual([int(message["id"]) for message in guild], sorted(int(message["id"]) for message in guild))
+        self.assertEqual(state.search_requests, 2)
+        self.assertLess(result.performance["api_calls"], 6)
+
+    def test_memory_is_bounded_by_pages_not_history(self) -> None:
+        def peak_for(count: int) -> int:
+            corpora = {str(index): generate_messages(count, seed=index, channel_id=str(index)) for index in range(4)}
+            client = _MultiCorpusClient(corpora)
+            with tempfile.TemporaryDirectory() as tmpdir:
+                targets = [_target(channel_id, f"C{channel_id}", tmpdir) for channel_id in corpora]
+                gc.collect()
+                tracemalloc.start()
+                try:
+                    # Captured log records would grow with history; the reply-miss warnings are not under test.
+                    with patch("app.workers.timeline_pipeline.DiscordClient", lambda token: client), patch(
+                        "app.workers.timeline_pipeline.REPLY_LOOKUP_SIZE", 500
+                    ), patch.object(logging.getLogger("discordsorter.formatter"), "disabled", True):
+                        result = run_timeline_export("token", targets, output_root=tmpdir)
+                    _, peak = tracemalloc.get_traced_memory()
+                finally:
+                    tracemalloc.stop()
+            self.assertEqual(sum(result.channel_counts.values()), 4 * count)
+            return peak
+
+        # Both runs exceed the reply lookup cap, so only page buffers and the capped lookup remain.
+        small = peak_for(500)
+        large = peak_for(2000)
+
+        # Four times the history must not need much more than the same handful of pages.
+        self.assertLess(large, small * 1.5)
+
+    def test_each_channel_keeps_its_own_formatting_options(self) -> None:
+        def message(message_id: int, content: str, **extra) -> dict:
+            return {
+                "id": str(message_id),
+                "timestamp": datetime(2026, 1, 1, 0, message_id, tzinfo=timezone.utc).isoformat(),
+                "content": content,
+                "author": {"username": "Fish", "discriminator": "0"},
+                "pinned": True,
+                "attachments": [],
+                **extra,
+            }
+
+        client = _MultiCorpusClient(
+            {
+                "1": [message(1, "alpha parent"), message(3, "alpha reply", message_reference={"message_id": "1"})],
+                "2": [message(2, "beta parent"), message(4, "beta reply", message_reference={"message_id": "2"})],
+            }
+        )
+        with tempfile.TemporaryDirectory() as tmpdir, patch("app.workers.timeline_pipeline.DiscordClient", lambda token: client):
+            targets = [
+                _target("1", "Alpha", tmpdir),
+                _target("2", "Beta", tmpdir, include_replies=False, include_pins=False),
+            ]
+            result = run_timeline_export("token", targets, output_root=tmpdir, write_jsonl=False)
+            with open(result.txt_path, "r", encoding="utf-8") as handle:
+                blocks = handle.read().split("\n\n")
+
+        self.assertTrue(blocks[0].startswith("[Alpha] [PINNED] "))
+        self.assertIn("(Replying to Fish#0: alpha parent)", blocks[2])
+        self.assertFalse(blocks[1].startswith("[Beta] [PINNED]"))
+        self.assertNotIn("Replying to", blocks[3])
+
+    def test_cancel_stops_the_merge(self) -> None:
+        client = _MultiCorpusClient({"1": generate_messages(500, seed=1)})
+        with tempfile.TemporaryDirectory() as tmpdir, patch(
+            "app.workers.timeline_pipeline.DiscordClient", lambda token: client
+        ):
+            with self.assertRaises(ExportCancelled):
+                run_timeline_export("token", [_target("1", "One", tmpdir)], output_root=tmpdir, cancel_check=lambda: True)
+
+
+if __name__ == "__main__":
+    unittest.main()
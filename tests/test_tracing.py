@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+
+class TracingTests(unittest.TestCase):
+    def tearDown(self) -> None:
+        from app.core import tracing
+
+        if tracing.active_recorder():
+            tracing.stop_trace(os.devnull)
+
+    def test_span_is_noop_without_active_recorder(self) -> None:
+        from app.core import tracing
+
+        with tracing.span("idle", "test", value=1) as args:
+            args["extra"] = True
+        self.assertIsNone(tracing.active_recorder())
+
+    def test_dump_writes_chrome_trace_events_per_thread(self) -> None:
+        from app.core import tracing
+
+        tracing.start_trace()
+
+        def work() -> None:
+            with tracing.span("worker", "test"):
+                pass
+
+        with tracing.span("outer", "test", channel_id="1") as args:
+            args["status"] = 200
+            thread = threading.Thread(target=work, name="trace-worker")
+            thread.start()
+            thread.join()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = tracing.stop_trace(os.path.join(tmpdir, "trace.json"))
+            with open(path, "r", encoding="utf-8") as handle:
+                payload = json.load(handle)
+
+        events = payload["traceEvents"]
+        spans = {event["name"]: event for event in events if event["ph"] == "X"}
+        self.assertEqual(set(spans), {"outer", "worker"})
+        self.assertEqual(spans["outer"]["args"], {"channel_id": "1", "status": 200})
+        self.assertNotEqual(spans["outer"]["tid"], spans["worker"]["tid"])
+        self.assertGreaterEqual(spans["outer"]["dur"], spans["worker"]["dur"])
+        self.assertTrue(any(event["ph"] == "M" for event in events))
+        self.assertIsNone(tracing.active_recorder())
+
+
+if __name__ == "__main__":
+    unittest.main()